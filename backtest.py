@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Historical backtest of the rule-based pulse
+
+Replays main.classify_pulse (the rule behind the fallback analysis) over the daily close history in the
+price store and scores each day's call against the next day's return. Every ticker is evaluated with
+array operations over its whole history and the full threshold x lookback grid at once; tickers are
+spread over a process pool.
+
+Historical headlines are not stored, so news sentiment is held at 0: this measures the momentum side
+of the rule (PULSE_MOMENTUM_THRESHOLD and the lookback), not the news override (PULSE_NEWS_THRESHOLD).
+
+Usage:
+  python backtest.py                                  # every ticker in the local price store
+  python backtest.py --store /data/prices --since 2020-01-01
+  python backtest.py --thresholds 0.25,0.5,0.75,1.0 --lookbacks 2,4,10 --output results.json
+  python backtest.py --synthetic 2000 --synthetic-days 1260   # random-walk data, no store needed
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "backend"))
+import main  # noqa: E402
+
+# The live score averages the returns of the last 5 closes
+LIVE_LOOKBACK = 4
+
+# Per-cell counters summed across tickers
+FIELDS = (
+    "days", "up_days", "down_days",
+    "bullish", "bullish_hits", "bullish_return",
+    "bearish", "bearish_hits", "bearish_return",
+    "neutral", "neutral_abs_return"
+)
+F = {name: i for i, name in enumerate(FIELDS)}
+
+
+def parse_floats(text: str) -> list:
+    return [float(part) for part in text.split(",") if part.strip()]
+
+
+def parse_ints(text: str) -> list:
+    return [int(part) for part in text.split(",") if part.strip()]
+
+
+def evaluate_chunk(root: str, tickers: list, lookbacks: list, thresholds: list, since_day: int) -> np.ndarray:
+    """Counters of shape (lookbacks, thresholds, FIELDS) for a chunk of tickers"""
+    store = main.PriceHistoryStore(root)
+    scores = [[] for _ in lookbacks]
+    outcomes = [[] for _ in lookbacks]
+
+    for ticker in tickers:
+        history = store.read(ticker)
+        history = history[history["day"] >= since_day] if since_day else history
+        if len(history) < 3:
+            continue
+        returns = main.MomentumEngine.returns_matrix(history["close"])[0]
+        valid = np.isfinite(returns)
+        # Prefix sums give every rolling-window mean in O(days)
+        sums = np.concatenate([[0.0], np.cumsum(np.where(valid, returns, 0.0))])
+        counts = np.concatenate([[0], np.cumsum(valid)])
+
+        for li, lookback in enumerate(lookbacks):
+            # Call made at the close of day t from the last `lookback` returns, scored on day t + 1
+            t = np.arange(lookback - 1, len(returns) - 1)
+            complete = (counts[t + 1] - counts[t + 1 - lookback] == lookback) & valid[t + 1]
+            scores[li].append((sums[t + 1] - sums[t + 1 - lookback])[complete] / lookback)
+            outcomes[li].append(returns[t + 1][complete])
+
+    # Every ticker-day of the chunk is classified for every threshold in one broadcast
+    totals = np.zeros((len(lookbacks), len(thresholds), len(FIELDS)))
+    threshold_column = np.asarray(thresholds, dtype=np.float64)[:, None]
+    for li in range(len(lookbacks)):
+        if not scores[li]:
+            continue
+        score = np.concatenate(scores[li])
+        outcome = np.concatenate(outcomes[li])
+        pulse = main.classify_pulse(score[None, :], 0.0, threshold_column)  # (thresholds, days)
+        bullish, bearish, neutral = pulse == 1, pulse == -1, pulse == 0
+        up, down = outcome > 0, outcome < 0
+
+        cell = totals[li]
+        cell[:, F["days"]] = len(outcome)
+        cell[:, F["up_days"]] = up.sum()
+        cell[:, F["down_days"]] = down.sum()
+        cell[:, F["bullish"]] = bullish.sum(axis=1)
+        cell[:, F["bullish_hits"]] = (bullish & up).sum(axis=1)
+        cell[:, F["bullish_return"]] = (bullish * outcome).sum(axis=1)
+        cell[:, F["bearish"]] = bearish.sum(axis=1)
+        cell[:, F["bearish_hits"]] = (bearish & down).sum(axis=1)
+        cell[:, F["bearish_return"]] = (bearish * outcome).sum(axis=1)
+        cell[:, F["neutral"]] = neutral.sum(axis=1)
+        cell[:, F["neutral_abs_return"]] = (neutral * np.abs(outcome)).sum(axis=1)
+    return totals
+
+
+def run_backtest(root: str, tickers: list, lookbacks: list, thresholds: list, since_day: int, workers: int) -> np.ndarray:
+    """Fan ticker chunks out to a process pool and sum their counters"""
+    chunk_size = max(1, min(256, len(tickers) // (workers * 4) or 1))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    totals = np.zeros((len(lookbacks), len(thresholds), len(FIELDS)))
+    if workers <= 1:
+        for chunk in chunks:
+            totals += evaluate_chunk(root, chunk, lookbacks, thresholds, since_day)
+        return totals
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(evaluate_chunk, root, chunk, lookbacks, thresholds, since_day) for chunk in chunks]
+        for future in futures:
+            totals += future.result()
+    return totals
+
+
+def ratio(numerator: float, denominator: float) -> float:
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def summarize(totals: np.ndarray, lookbacks: list, thresholds: list) -> list:
+    """One result per grid cell; baseline_hit_rate is what the same mix of calls would score by chance"""
+    results = []
+    for li, lookback in enumerate(lookbacks):
+        for ti, threshold in enumerate(thresholds):
+            c = totals[li, ti]
+            days = c[F["days"]]
+            calls = c[F["bullish"]] + c[F["bearish"]]
+            hits = c[F["bullish_hits"]] + c[F["bearish_hits"]]
+            p_up, p_down = ratio(c[F["up_days"]], days) or 0.0, ratio(c[F["down_days"]], days) or 0.0
+            baseline = ratio(c[F["bullish"]] * p_up + c[F["bearish"]] * p_down, calls)
+            hit_rate = ratio(hits, calls)
+            results.append({
+                "lookback": lookback,
+                "momentum_threshold": threshold,
+                "days": int(days),
+                "coverage": ratio(calls, days),
+                "hit_rate": hit_rate,
+                "baseline_hit_rate": baseline,
+                "edge": round(hit_rate - baseline, 4) if calls else None,
+                "bullish": {
+                    "calls": int(c[F["bullish"]]),
+                    "hit_rate": ratio(c[F["bullish_hits"]], c[F["bullish"]]),
+                    "avg_next_return": ratio(c[F["bullish_return"]], c[F["bullish"]])
+                },
+                "bearish": {
+                    "calls": int(c[F["bearish"]]),
+                    "hit_rate": ratio(c[F["bearish_hits"]], c[F["bearish"]]),
+                    "avg_next_return": ratio(c[F["bearish_return"]], c[F["bearish"]])
+                },
+                "neutral": {
+                    "days": int(c[F["neutral"]]),
+                    "avg_abs_next_return": ratio(c[F["neutral_abs_return"]], c[F["neutral"]])
+                }
+            })
+    return results
+
+
+def write_synthetic_store(root: str, tickers: int, days: int, seed: int, autocorrelation: float):
+    """Random-walk closes with a little return autocorrelation, so momentum has something to find"""
+    rng = np.random.default_rng(seed)
+    store = main.PriceHistoryStore(root)
+    shocks = rng.normal(0.0003, 0.02, size=(tickers, days))
+    returns = np.empty_like(shocks)
+    returns[:, 0] = shocks[:, 0]
+    for day in range(1, days):
+        returns[:, day] = autocorrelation * returns[:, day - 1] + shocks[:, day]
+    closes = 100.0 * np.cumprod(1.0 + returns, axis=1)
+    first_day = main.PriceHistoryStore.to_day("2015-01-01")
+    day_numbers = list(range(first_day, first_day + days))
+    for i in range(tickers):
+        store.append(f"SYN{i:05d}", day_numbers, closes[i].tolist())
+
+
+def print_results(results: list, min_coverage: float, top: int, live_threshold: float):
+    eligible = [r for r in results if r["hit_rate"] is not None and (r["coverage"] or 0) >= min_coverage]
+    eligible.sort(key=lambda r: (r["edge"], r["hit_rate"]), reverse=True)
+    print(f"\n{'':2}{'lookback':>8} {'threshold':>9} {'coverage':>9} {'hit rate':>9} {'baseline':>9} {'edge':>8} "
+          f"{'bull next':>10} {'bear next':>10}")
+    for r in eligible[:top]:
+        live = "*" if r["lookback"] == LIVE_LOOKBACK and r["momentum_threshold"] == live_threshold else " "
+        print(f"{live:2}{r['lookback']:>8} {r['momentum_threshold']:>9.2f} {r['coverage']:>9.1%} {r['hit_rate']:>9.2%} "
+              f"{r['baseline_hit_rate']:>9.2%} {r['edge']:>+8.2%} "
+              f"{(r['bullish']['avg_next_return'] or 0):>+9.3f}% {(r['bearish']['avg_next_return'] or 0):>+9.3f}%")
+    live = [r for r in results if r["lookback"] == LIVE_LOOKBACK and r["momentum_threshold"] == live_threshold]
+    if live and live[0]["hit_rate"] is not None:
+        r = live[0]
+        print(f"\n* live rule (lookback {LIVE_LOOKBACK}, threshold {live_threshold}): hit rate {r['hit_rate']:.2%} "
+              f"vs baseline {r['baseline_hit_rate']:.2%} on {r['coverage']:.1%} of days")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Backtest the rule-based pulse against next-day returns")
+    parser.add_argument("--store", default=main.price_history.root, help="Price store directory (one .npy per ticker)")
+    parser.add_argument("--tickers", help="Comma-separated tickers (default: every ticker in the store)")
+    parser.add_argument("--since", help="Only use history from this date (YYYY-MM-DD)")
+    parser.add_argument("--thresholds", default="0.1,0.25,0.5,0.75,1.0,1.5,2.0",
+                        help="Momentum thresholds to sweep (%% average daily return)")
+    parser.add_argument("--lookbacks", default="2,3,4,5,10,20", help="Return windows to sweep (trading days)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--min-coverage", type=float, default=0.05, help="Hide cells calling fewer days than this")
+    parser.add_argument("--top", type=int, default=15, help="Rows to print")
+    parser.add_argument("--synthetic", type=int, default=0, help="Backtest N generated random-walk tickers instead")
+    parser.add_argument("--synthetic-days", type=int, default=1260, help="Trading days per generated ticker")
+    parser.add_argument("--autocorrelation", type=float, default=0.05, help="Lag-1 return autocorrelation of generated data")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for generated data")
+    parser.add_argument("--output", help="Write every grid cell to this JSON file")
+    args = parser.parse_args()
+
+    thresholds = parse_floats(args.thresholds)
+    lookbacks = parse_ints(args.lookbacks)
+    live_threshold = main.PULSE_MOMENTUM_THRESHOLD
+    if live_threshold not in thresholds:
+        thresholds.append(live_threshold)
+    if LIVE_LOOKBACK not in lookbacks:
+        lookbacks.append(LIVE_LOOKBACK)
+
+    root = args.store
+    if args.synthetic:
+        root = tempfile.mkdtemp(prefix="marketpulse-backtest-")
+        started = time.perf_counter()
+        write_synthetic_store(root, args.synthetic, args.synthetic_days, args.seed, args.autocorrelation)
+        print(f"Generated {args.synthetic} synthetic tickers x {args.synthetic_days} days in "
+              f"{time.perf_counter() - started:.1f}s ({root})")
+
+    if args.tickers:
+        tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    else:
+        tickers = sorted(os.path.basename(path)[:-4] for path in glob.glob(os.path.join(root, "*.npy")))
+    if not tickers:
+        print(f"No price history found in {root}; run the server for a while, point --store at a store or use --synthetic")
+        return 1
+    since_day = main.PriceHistoryStore.to_day(args.since) if args.since else 0
+
+    print(f"🔁 Backtesting {len(tickers)} tickers: {len(lookbacks)} lookbacks x {len(thresholds)} thresholds, "
+          f"{args.workers} workers")
+    started = time.perf_counter()
+    totals = run_backtest(root, tickers, lookbacks, thresholds, since_day, args.workers)
+    elapsed = time.perf_counter() - started
+
+    results = summarize(totals, lookbacks, thresholds)
+    ticker_days = int(totals[lookbacks.index(LIVE_LOOKBACK), 0, F["days"]])
+    print(f"Evaluated {ticker_days} ticker-days x {len(results)} grid cells in {elapsed:.2f}s "
+          f"({ticker_days * len(results) / elapsed / 1e6:.1f}M calls/s)")
+    print_results(results, args.min_coverage, args.top, live_threshold)
+
+    if args.output:
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "store": root,
+            "tickers": len(tickers),
+            "since": args.since,
+            "duration_s": round(elapsed, 3),
+            "live": {"lookback": LIVE_LOOKBACK, "momentum_threshold": live_threshold},
+            "results": results
+        }
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
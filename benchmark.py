@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Load-test and benchmark suite for the MarketPulse backend
+
+Runs the FastAPI app in-process against local stub servers for Finnhub, Alpha Vantage,
+GNews, NewsAPI and Gemini, so results are reproducible and never touch real APIs.
+
+Scenarios:
+  cold      every request's ticker starts with empty caches and no price history
+  warm      the same traffic after every ticker has been served once
+  stampede  bursts of concurrent requests for one uncached ticker
+
+Usage:
+  python benchmark.py
+  python benchmark.py --concurrency 100 --requests 2000 --tickers 200 --upstream-latency-ms 80
+  python benchmark.py --compare benchmark_results/previous.json
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+from aiohttp import web
+
+SCENARIOS = ("cold", "warm", "stampede")
+
+
+class StubUpstreams:
+    """One aiohttp app serving fake Finnhub, Alpha Vantage, GNews, NewsAPI and Gemini endpoints"""
+
+    def __init__(self, latency_ms: float, llm_latency_ms: float, error_rate: float, seed: int = 7):
+        self.latency = latency_ms / 1000
+        self.llm_latency = llm_latency_ms / 1000
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = {}
+        self.errors = {}
+        self.runner = None
+        self.port = None
+
+    async def _simulate(self, provider: str, latency: float):
+        """Count the call, sleep for a jittered latency and maybe fail it"""
+        self.calls[provider] = self.calls.get(provider, 0) + 1
+        await asyncio.sleep(latency * self.random.uniform(0.8, 1.2))
+        if self.random.random() < self.error_rate:
+            self.errors[provider] = self.errors.get(provider, 0) + 1
+            raise web.HTTPInternalServerError(text="stub error")
+
+    @staticmethod
+    def _closes(ticker: str, days: int) -> list:
+        # Deterministic random walk per ticker
+        walk = random.Random(int(hashlib.md5(ticker.encode()).hexdigest()[:8], 16))
+        price, closes = 100.0, []
+        for _ in range(days):
+            price *= 1 + walk.uniform(-0.03, 0.03)
+            closes.append(round(price, 2))
+        return closes
+
+    @staticmethod
+    def _articles(ticker: str) -> list:
+        return [{
+            "title": f"{ticker} {headline}",
+            "description": f"Benchmark article {i} about {ticker}",
+            "url": f"https://stub.local/{ticker}/{i}"
+        } for i, headline in enumerate(
+            ["beats estimates", "announces partnership", "shares drop on concerns", "holds conference", "growth outlook"]
+        )]
+
+    async def finnhub_candles(self, request: web.Request) -> web.Response:
+        await self._simulate("finnhub", self.latency)
+        start, end = int(request.query["from"]), int(request.query["to"])
+        first = datetime.fromtimestamp(start, timezone.utc).date()
+        days = [first + timedelta(days=i) for i in range((end - start) // 86400 + 1)]
+        days = [day for day in days if day.weekday() < 5]
+        closes = self._closes(request.query["symbol"], len(days))
+        timestamps = [int(datetime(d.year, d.month, d.day, tzinfo=timezone.utc).timestamp()) for d in days]
+        return web.json_response({"s": "ok" if days else "no_data", "c": closes, "t": timestamps})
+
+    async def alpha_vantage_query(self, request: web.Request) -> web.Response:
+        await self._simulate("alpha_vantage", self.latency)
+        today = datetime.now(timezone.utc).date()
+        days = [today - timedelta(days=i) for i in range(140) if (today - timedelta(days=i)).weekday() < 5][:100]
+        closes = self._closes(request.query["symbol"], len(days))
+        series = {day.isoformat(): {"4. close": str(close)} for day, close in zip(sorted(days), closes)}
+        return web.json_response({"Time Series (Daily)": series})
+
+    async def gnews_search(self, request: web.Request) -> web.Response:
+        await self._simulate("gnews", self.latency)
+        return web.json_response({"articles": self._articles(request.query["q"].split()[0])})
+
+    async def newsapi_everything(self, request: web.Request) -> web.Response:
+        await self._simulate("newsapi", self.latency)
+        return web.json_response({"articles": self._articles(request.query["q"].split()[0])})
+
+    async def gemini_generate(self, request: web.Request) -> web.Response:
+        await self._simulate("gemini", self.llm_latency)
+        prompt = (await request.json())["prompt"]
+        answer = "PULSE: bullish\nEXPLANATION: Benchmark analysis with steady momentum and supportive headlines."
+        # Batched prompts list one "=== TICKER ===" header per stock in the requested answer format
+        tickers = re.findall(r"^=== ([A-Z0-9.\-]+) ===$", prompt, re.MULTILINE)
+        if tickers:
+            answer = "\n\n".join(f"=== {ticker} ===\n{answer}" for ticker in tickers)
+        return web.json_response({"text": answer})
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/finnhub/stock/candle", self.finnhub_candles)
+        app.router.add_get("/alphavantage/query", self.alpha_vantage_query)
+        app.router.add_get("/gnews/search", self.gnews_search)
+        app.router.add_get("/newsapi/everything", self.newsapi_everything)
+        app.router.add_post("/gemini/generate", self.gemini_generate)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+        return f"http://127.0.0.1:{self.port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def reset_counts(self):
+        self.calls, self.errors = {}, {}
+
+
+class StubGeminiModel:
+    """Stands in for genai.GenerativeModel, sending prompts to the Gemini stub over HTTP"""
+
+    class _Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session = None
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        async with self.session.post(self.url, json={"prompt": prompt}) as response:
+            response.raise_for_status()
+            return self._Response((await response.json())["text"])
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+def configure_environment(stub_url: str, data_dir: str, args: argparse.Namespace):
+    """Point the backend at the stubs; must run before main is imported"""
+    os.environ.update({
+        "FINNHUB_API_KEY": "bench", "ALPHA_VANTAGE_API_KEY": "bench",
+        "GNEWS_API_KEY": "bench", "NEWS_API_KEY": "bench",
+        "FINNHUB_BASE_URL": f"{stub_url}/finnhub",
+        "ALPHA_VANTAGE_BASE_URL": f"{stub_url}/alphavantage",
+        "GNEWS_BASE_URL": f"{stub_url}/gnews",
+        "NEWSAPI_BASE_URL": f"{stub_url}/newsapi",
+        "MARKETPULSE_DATA_DIR": data_dir,
+        "CACHE_BACKEND": args.cache_backend,
+        # Client-side rate limits would dominate the numbers; the stubs have none
+        "FINNHUB_RATE_PER_MIN": "1000000", "FINNHUB_BURST": "100000",
+        "ALPHA_VANTAGE_RATE_PER_MIN": "1000000", "ALPHA_VANTAGE_BURST": "100000",
+        "GNEWS_RATE_PER_MIN": "1000000", "GNEWS_BURST": "100000",
+        "NEWSAPI_RATE_PER_MIN": "1000000", "NEWSAPI_BURST": "100000",
+        "UPSTREAM_BACKOFF_BASE": "0.01",
+    })
+    os.environ.pop("GEMINI_API_KEY", None)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile: the smallest value with at least q% of the samples at or below it"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+
+async def drive(session: aiohttp.ClientSession, base_url: str, tickers: list, concurrency: int) -> dict:
+    """Issue one request per entry in tickers with at most `concurrency` in flight"""
+    latencies, statuses = [], {}
+    degraded = 0
+    queue = iter(tickers)
+
+    async def worker():
+        nonlocal degraded
+        for ticker in queue:
+            started = time.perf_counter()
+            try:
+                async with session.get(f"{base_url}/api/v1/market-pulse", params={"ticker": ticker}) as response:
+                    body = await response.read()
+                    status = response.status
+                if status == 200 and json.loads(body).get("degraded"):
+                    degraded += 1
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(count for status, count in statuses.items() if status != "200"),
+        "degraded": degraded,
+        "status_codes": statuses,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        }
+    }
+
+
+async def reset_state(main):
+    """Empty every cache layer, the serialized response cache, the LLM memo and the local price history"""
+    # A build still in flight would refill the caches after they are emptied
+    await main.pulse_flight.wait_idle()
+    main.response_cache.clear()
+    await main.cache_backend.clear()
+    await main.llm_memo.clear()
+    for path in glob.glob(os.path.join(main.price_history.root, "*.npy")):
+        os.remove(path)
+
+
+async def run_scenarios(args: argparse.Namespace) -> dict:
+    stubs = StubUpstreams(args.upstream_latency_ms, args.llm_latency_ms, args.error_rate, args.seed)
+    stub_url = await stubs.start()
+    data_dir = tempfile.mkdtemp(prefix="marketpulse-bench-")
+    configure_environment(stub_url, data_dir, args)
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src", "backend"))
+    import main
+    import uvicorn
+
+    model = StubGeminiModel(f"{stub_url}/gemini/generate")
+    main.llm_service.model = model
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    rng = random.Random(args.seed)
+    universe = [f"BM{i:04d}" for i in range(args.tickers)]
+    traffic = [rng.choice(universe) for _ in range(args.requests)]
+
+    results = {}
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        for scenario in args.scenarios:
+            await reset_state(main)
+            if scenario == "warm":
+                # Serve every ticker once so the measured pass is all cache hits
+                await drive(session, base_url, universe, args.concurrency)
+            stubs.reset_counts()
+
+            if scenario == "stampede":
+                rounds = max(1, args.requests // args.concurrency)
+                summaries = []
+                for i in range(rounds):
+                    await reset_state(main)
+                    summaries.append(await drive(session, base_url, [f"ST{i:04d}"] * args.concurrency, args.concurrency))
+                result = merge_summaries(summaries)
+                result["rounds"] = rounds
+            else:
+                result = await drive(session, base_url, traffic, args.concurrency)
+
+            result["upstream_calls"] = dict(stubs.calls)
+            result["upstream_errors"] = dict(stubs.errors)
+            results[scenario] = result
+            print_scenario(scenario, result)
+
+    server.should_exit = True
+    await server_task
+    await model.close()
+    await stubs.stop()
+    return results
+
+
+def merge_summaries(summaries: list) -> dict:
+    """Combine stampede rounds, weighting latency percentiles by request count"""
+    total = sum(s["requests"] for s in summaries)
+    duration = sum(s["duration_s"] for s in summaries)
+    statuses = {}
+    for summary in summaries:
+        for status, count in summary["status_codes"].items():
+            statuses[status] = statuses.get(status, 0) + count
+    latency = {
+        key: round(sum(s["latency_ms"][key] * s["requests"] for s in summaries) / total, 2)
+        for key in ("p50", "p95", "p99")
+    }
+    latency["max"] = max(s["latency_ms"]["max"] for s in summaries)
+    return {
+        "requests": total,
+        "errors": sum(s["errors"] for s in summaries),
+        "degraded": sum(s["degraded"] for s in summaries),
+        "status_codes": statuses,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(total / duration, 1) if duration else 0.0,
+        "latency_ms": latency
+    }
+
+
+def print_scenario(name: str, result: dict):
+    latency = result["latency_ms"]
+    print(
+        f"{name:<9} {result['requests']:>6} req  {result['throughput_rps']:>8.1f} req/s  "
+        f"p50 {latency['p50']:>8.2f}ms  p95 {latency['p95']:>8.2f}ms  p99 {latency['p99']:>8.2f}ms  "
+        f"errors {result['errors']}  degraded {result['degraded']}  upstream {result['upstream_calls']}"
+    )
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: str):
+    """Print the change in throughput and latency against an earlier results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit', 'unknown')}):")
+    for scenario, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(scenario)
+        if not before:
+            continue
+        changes = [f"throughput {pct_change(before['throughput_rps'], result['throughput_rps'])}"]
+        for key in ("p50", "p95", "p99"):
+            changes.append(f"{key} {pct_change(before['latency_ms'][key], result['latency_ms'][key])}")
+        print(f"  {scenario:<9} " + "  ".join(changes))
+
+
+def pct_change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MarketPulse against local stub upstreams")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of cold,warm,stampede")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--tickers", type=int, default=100, help="Distinct tickers in the traffic (cardinality)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=50, help="Mean latency of the price/news stubs")
+    parser.add_argument("--llm-latency-ms", type=float, default=400, help="Mean latency of the Gemini stub")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub calls that return HTTP 500")
+    parser.add_argument("--cache-backend", default="memory", choices=["memory", "sqlite"], help="CACHE_BACKEND to use")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the in-process app server")
+    parser.add_argument("--seed", type=int, default=7, help="Seed for traffic and stub behaviour")
+    parser.add_argument("--output", help="Results file (default: benchmark_results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print(f"🏁 Benchmarking MarketPulse: concurrency={args.concurrency} requests={args.requests} tickers={args.tickers}")
+    scenarios = asyncio.run(run_scenarios(args))
+
+    commit = git_commit()
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": scenarios
+    }
+    output = args.output or os.path.join(
+        "benchmark_results", f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
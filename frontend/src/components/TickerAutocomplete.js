@@ -1,14 +1,21 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Search, TrendingUp, Building2 } from 'lucide-react';
 import Fuse from 'fuse.js';
+import axios from 'axios';
 import { stockTickers, searchAliases } from '../data/stockTickers';
 
+// Pause in typing before the backend search is sent
+const REMOTE_SEARCH_DEBOUNCE_MS = 150;
+
 const TickerAutocomplete = ({ value, onChange, onSubmit, disabled, placeholder }) => {
   const [isOpen, setIsOpen] = useState(false);
   const [filteredResults, setFilteredResults] = useState([]);
   const [selectedIndex, setSelectedIndex] = useState(-1);
   const inputRef = useRef(null);
   const dropdownRef = useRef(null);
+  const latestQuery = useRef('');
+  const remoteTimer = useRef(null);
+  const remoteRequest = useRef(null);
 
   // Configure Fuse.js for fuzzy search
   const fuse = new Fuse(stockTickers, {
@@ -23,16 +30,26 @@ const TickerAutocomplete = ({ value, onChange, onSubmit, disabled, placeholder }
     ignoreLocation: true
   });
 
+  // Drop the scheduled backend search and abort the one in flight, if any
+  const cancelRemoteSearch = () => {
+    clearTimeout(remoteTimer.current);
+    remoteRequest.current?.abort();
+    remoteRequest.current = null;
+  };
+
   // Search function
   const searchTickers = (query) => {
     console.log('Searching for:', query); // Debug log
+    cancelRemoteSearch();
     if (!query || query.length < 1) {
+      latestQuery.current = '';
       setFilteredResults([]);
       setIsOpen(false);
       return;
     }
 
     const queryLower = query.toLowerCase().trim();
+    latestQuery.current = queryLower;
     
     // Check for direct alias match first
     if (searchAliases[queryLower]) {
@@ -64,9 +81,29 @@ const TickerAutocomplete = ({ value, onChange, onSubmit, disabled, placeholder }
     deduped.sort((a, b) => a.score - b.score);
     const finalResults = deduped.slice(0, 8);
     setFilteredResults(finalResults);
-    console.log('Found results:', finalResults.length); // Debug log
+
+    // The backend indexes the full symbol universe; the bundled list above answers instantly meanwhile.
+    // Wait for a pause in typing, so a burst of keystrokes costs one request
+    remoteTimer.current = setTimeout(() => {
+      const controller = new AbortController();
+      remoteRequest.current = controller;
+      axios.get('/api/v1/tickers/search', { params: { q: query.trim(), limit: 8 }, signal: controller.signal })
+        .then(({ data }) => {
+          if (latestQuery.current !== queryLower || data.results.length === 0) return;
+          const remote = data.results.map(item => ({ item, score: 0 }));
+          const remoteSymbols = new Set(data.results.map(item => item.symbol));
+          const merged = [...remote, ...finalResults.filter(result => !remoteSymbols.has(result.item.symbol))];
+          setFilteredResults(merged.slice(0, 8));
+        })
+        .catch(() => {
+          // Aborted by a newer query, or the backend is unreachable: keep the bundled results
+        });
+    }, REMOTE_SEARCH_DEBOUNCE_MS);
   };
 
+  // Nothing may resolve into state after unmount
+  useEffect(() => cancelRemoteSearch, []);
+
   // Handle input changes
   const handleInputChange = (e) => {
     const newValue = e.target.value.toUpperCase();
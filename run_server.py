@@ -1,38 +1,149 @@
 #!/usr/bin/env python3
 """
 MarketPulse API Server Startup Script
+
+Development (default): one auto-reloading uvicorn process.
+Production (--prod): one worker per available CPU, uvloop/httptools when installed,
+worker recycling and a graceful drain of in-flight LLM calls on shutdown.
 """
 
 import sys
 import os
+import argparse
+import importlib.util
 import subprocess
 
+def cgroup_cpu_limit():
+    """CPU quota imposed by the container (cgroup v2 or v1), or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def available_cpus():
+    """CPUs this process may actually use: affinity mask capped by the container quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, int(limit))
+    return max(1, cpus)
+
+def installed(module):
+    return importlib.util.find_spec(module) is not None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Start the MarketPulse API server")
+    parser.add_argument("--prod", action="store_true", help="Production mode: multiple workers, no reload")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "0")),
+                        help="Worker processes in production mode (default: one per available CPU)")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "10000")),
+                        help="Recycle a worker after this many requests (0 disables; needs gunicorn)")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("MAX_REQUESTS_JITTER", "1000")),
+                        help="Random extra requests per worker so they don't all restart together")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="Seconds a stopping worker gets to finish requests and in-flight LLM calls")
+    parser.add_argument("--cache-backend", choices=["memory", "sqlite", "redis"], default=os.getenv("CACHE_BACKEND"),
+                        help="Cache shared by the workers (default: sqlite in production, memory in development)")
+    parser.add_argument("--cache-url", default=os.getenv("CACHE_URL"), help="Redis URL or SQLite path for the cache")
+    return parser.parse_args()
+
+def production_command(args, env):
+    workers = args.workers or available_cpus()
+    # The app drains LLM calls inside the worker's shutdown window, leaving a margin for the rest of cleanup
+    env.setdefault("SHUTDOWN_DRAIN_TIMEOUT", str(max(1, args.graceful_timeout - 5)))
+
+    if env["CACHE_BACKEND"] == "memory" and workers > 1:
+        print(f"Warning: {workers} workers with CACHE_BACKEND=memory each keep and warm their own cache")
+
+    if installed("gunicorn"):
+        # gunicorn restarts recycled workers; UvicornWorker picks uvloop/httptools itself when installed
+        command = [
+            sys.executable, "-m", "gunicorn", "main:app",
+            "--worker-class", "uvicorn.workers.UvicornWorker",
+            "--workers", str(workers),
+            "--bind", f"{args.host}:{args.port}",
+            "--graceful-timeout", str(args.graceful_timeout),
+            "--timeout", str(max(60, args.graceful_timeout * 2))
+        ]
+        if args.max_requests > 0:
+            command += ["--max-requests", str(args.max_requests), "--max-requests-jitter", str(args.max_requests_jitter)]
+        server = "gunicorn + uvicorn workers"
+    else:
+        # uvicorn's own supervisor doesn't replace workers that exit, so recycling is left off here
+        command = [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", args.host,
+            "--port", str(args.port),
+            "--workers", str(workers),
+            "--loop", "uvloop" if installed("uvloop") else "asyncio",
+            "--http", "httptools" if installed("httptools") else "h11",
+            "--timeout-graceful-shutdown", str(args.graceful_timeout),
+            "--no-access-log"
+        ]
+        if args.max_requests > 0:
+            print("Note: install gunicorn to recycle workers after --max-requests")
+        server = "uvicorn"
+
+    print(f"Production mode: {workers} workers via {server}, cache backend {env['CACHE_BACKEND']}, "
+          f"loop {'uvloop' if installed('uvloop') else 'asyncio'}, parser {'httptools' if installed('httptools') else 'h11'}")
+    return command
+
 def main():
+    args = parse_args()
     print("Starting MarketPulse API Server...")
-    
+
     # Add src/backend to Python path
-    backend_path = os.path.join(os.path.dirname(__file__), 'src', 'backend')
+    backend_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'backend')
     sys.path.insert(0, backend_path)
-    
+
     # Change to backend directory
     os.chdir(backend_path)
-    
+
+    env = os.environ.copy()
+    env["CACHE_BACKEND"] = args.cache_backend or ("sqlite" if args.prod else "memory")
+    if args.cache_url:
+        env["CACHE_URL"] = args.cache_url
+
+    if args.prod:
+        command = production_command(args, env)
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn",
+            "main:app",
+            "--reload",
+            "--host", args.host,
+            "--port", str(args.port)
+        ]
+
     try:
         # Start the server
-        subprocess.run([
-            sys.executable, "-m", "uvicorn", 
-            "main:app", 
-            "--reload", 
-            "--host", "0.0.0.0", 
-            "--port", "8000"
-        ])
+        subprocess.run(command, env=env)
     except KeyboardInterrupt:
         print("\nShutting down MarketPulse API Server...")
     except Exception as e:
         print(f"Error starting server: {e}")
         return 1
-    
+
     return 0
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
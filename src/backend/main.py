@@ -1,15 +1,52 @@
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+# Startup report (GET /api/v1/startup): wall time of each third-party import as seen by this module
+MODULE_STARTED = time.perf_counter()
+IMPORT_TIMINGS = {}
+STARTUP_TIMINGS = {}
+
+@contextmanager
+def timed_import(name: str):
+    started = time.perf_counter()
+    yield
+    IMPORT_TIMINGS[name] = round((time.perf_counter() - started) * 1000, 1)
+
+with timed_import("fastapi"):
+    from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+with timed_import("pydantic"):
+    from pydantic import BaseModel
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Dict, Optional
 import asyncio
-import aiohttp
+import bisect
+with timed_import("aiohttp"):
+    import aiohttp
 import os
-from datetime import datetime, timedelta
+import json
+import re
+import threading
+import uuid
+import csv
+import glob
+import gzip
+import hashlib
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import logging
-from cachetools import TTLCache
-import google.generativeai as genai
-from dotenv import load_dotenv
+with timed_import("cachetools"):
+    from cachetools import LRUCache, TLRUCache
+with timed_import("numpy"):
+    import numpy as np
+with timed_import("dotenv"):
+    from dotenv import load_dotenv
+# google.generativeai is heavy and only needed once an LLM call is made; LLMService imports it lazily
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +55,402 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Local state (shared cache database, etc.) lives here unless overridden
+DATA_DIR = os.getenv("MARKETPULSE_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".marketpulse"))
+
+# Identifies this process when it holds a cross-worker lock
+WORKER_ID = f"{os.uname().nodename if hasattr(os, 'uname') else 'host'}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class HTTPClientManager:
+    """Owns the long-lived, pooled aiohttp session shared by all upstream providers"""
+    
+    def __init__(self):
+        self.limit = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+        self.limit_per_host = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20"))
+        self.dns_cache_ttl = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+        self.keepalive_timeout = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+        self.total_timeout = float(os.getenv("HTTP_TOTAL_TIMEOUT", "10"))
+        self.connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def start(self):
+        """Create the shared session (called from the app lifespan)"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            timeout = aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            logger.info(
+                f"HTTP pool ready (limit={self.limit}, per_host={self.limit_per_host}, "
+                f"dns_ttl={self.dns_cache_ttl}s, timeout={self.total_timeout}s)"
+            )
+    
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it lazily when used outside the lifespan"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+    
+    async def close(self):
+        """Close the shared session and its pooled connections"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+http_client = HTTPClientManager()
+
+class Counter:
+    """Monotonic Prometheus counter with labels"""
+    
+    kind = "counter"
+    
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: Dict[tuple, float] = {}
+    
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+    
+    def samples(self) -> List[tuple]:
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+class Histogram:
+    """Prometheus histogram with fixed buckets; observations are a bisect and two adds"""
+    
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (non-cumulative, last = +Inf), sum]
+        self._values: Dict[tuple, list] = {}
+    
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labelnames)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+    
+    def time(self, **labels) -> "_HistogramTimer":
+        """Context manager observing the elapsed wall time of its body"""
+        return _HistogramTimer(self, labels)
+    
+    def samples(self) -> List[tuple]:
+        samples = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                samples.append((f"{self.name}_bucket", key + (le,), cumulative))
+            samples.append((f"{self.name}_count", key, cumulative))
+            samples.append((f"{self.name}_sum", key, total))
+        return samples
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "labels", "started")
+    
+    def __init__(self, histogram: Histogram, labels: Dict):
+        self.histogram = histogram
+        self.labels = labels
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+class MetricsRegistry:
+    """Collects counters and histograms and renders them in the Prometheus text format"""
+    
+    def __init__(self):
+        self._metrics: List[Any] = []
+    
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), **kwargs) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, **kwargs)
+        self._metrics.append(metric)
+        return metric
+    
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            labelnames = metric.labelnames + (("le",) if metric.kind == "histogram" else ())
+            for name, key, value in metric.samples():
+                labels = ",".join(f'{label}="{self._escape(v)}"' for label, v in zip(labelnames, key))
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+STAGE_SECONDS = metrics.histogram(
+    "marketpulse_stage_seconds", "Time spent in each stage of building a pulse", ("stage", "provider")
+)
+CACHE_REQUESTS = metrics.counter(
+    "marketpulse_cache_requests_total", "Cache lookups by layer and result (hit, stale, miss)", ("layer", "result")
+)
+MOCK_FALLBACKS = metrics.counter(
+    "marketpulse_mock_fallbacks_total", "Responses served from generated demo data", ("kind",)
+)
+UPSTREAM_RESPONSES = metrics.counter(
+    "marketpulse_upstream_responses_total", "Upstream API responses by provider and HTTP status", ("provider", "status")
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "marketpulse_circuit_transitions_total", "Circuit breaker state changes by provider and new state", ("provider", "state")
+)
+DEADLINE_EXCEEDED = metrics.counter(
+    "marketpulse_deadline_exceeded_total", "Pulse stages cut short by the request deadline", ("stage",)
+)
+HTTP_REQUESTS = metrics.counter(
+    "marketpulse_http_requests_total", "Requests served by route and status code", ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = metrics.histogram(
+    "marketpulse_http_request_seconds", "Request latency by route", ("method", "route")
+)
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and their latency per route template"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status = {"code": 500}
+        
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+        
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The route template keeps the label set bounded (no raw paths or query strings)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.inc(method=scope["method"], route=route, status=status["code"])
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=scope["method"], route=route)
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one shared in-flight task"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() for key, or await the result of the call already in flight for it"""
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        # Shield so one cancelled waiter (e.g. a disconnected client) doesn't cancel the shared work
+        return await asyncio.shield(task)
+    
+    def in_flight(self, key: str) -> bool:
+        return key in self._inflight
+    
+    async def wait_idle(self):
+        """Wait until every call in flight has finished (successfully or not)"""
+        while self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+    
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved even if every waiter went away
+    
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+class BackgroundRefresher:
+    """Runs stale-while-revalidate refreshes in the background, coalesced per key"""
+    
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        self.scheduled = 0
+        self.skipped = 0
+        self.failed = 0
+        self._tasks: Dict[str, asyncio.Task] = {}
+    
+    def schedule(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        """Start fn() in the background unless key is already refreshing or the pool is full"""
+        if key in self._tasks:
+            return
+        if len(self._tasks) >= self.max_concurrent:
+            self.skipped += 1
+            return
+        self.scheduled += 1
+        task = asyncio.ensure_future(fn())
+        self._tasks[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t))
+    
+    def _finished(self, key: str, task: asyncio.Task):
+        self._tasks.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+            logger.error(f"Background refresh of {key} failed: {task.exception()}")
+    
+    async def close(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "in_flight": len(self._tasks)
+        }
+
+refresher = BackgroundRefresher(int(os.getenv("BACKGROUND_REFRESH_CONCURRENCY", "20")))
+
+class HotTickerScheduler:
+    """Tracks request frequency per ticker and refreshes the hottest ones before their entries expire"""
+    
+    def __init__(self, refresh_fn: Callable[[str, float], Awaitable[int]]):
+        self.refresh_fn = refresh_fn
+        self.top_n = int(os.getenv("HOT_TICKERS_TOP_N", "20"))
+        self.interval = float(os.getenv("HOT_REFRESH_INTERVAL", "30"))
+        self.lead_time = float(os.getenv("HOT_REFRESH_LEAD_TIME", "60"))
+        self.budget_per_minute = int(os.getenv("HOT_REFRESH_BUDGET_PER_MIN", "30"))
+        self.decay = float(os.getenv("HOT_TICKERS_DECAY", "0.8"))
+        self.refreshes = 0
+        self.upstream_calls = 0
+        self.budget_exhausted = 0
+        self._scores: Dict[str, float] = {}
+        # Tickers that must stay fresh regardless of request volume (e.g. WebSocket subscriptions)
+        self.pinned_fn: Optional[Callable[[], List[str]]] = None
+        self._window_start = time.monotonic()
+        self._window_spent = 0
+    
+    def record(self, ticker: str):
+        self._scores[ticker] = self._scores.get(ticker, 0.0) + 1.0
+    
+    def hot_tickers(self) -> List[str]:
+        pinned = list(self.pinned_fn()) if self.pinned_fn else []
+        ranked = sorted(self._scores.items(), key=lambda item: item[1], reverse=True)
+        hot = [ticker for ticker, score in ranked[:self.top_n] if score >= 1.0 and ticker not in pinned]
+        return pinned + hot
+    
+    def _decay(self):
+        """Age request counts so the ranking follows current demand"""
+        self._scores = {t: s * self.decay for t, s in self._scores.items() if s * self.decay >= 0.1}
+    
+    def _budget_left(self) -> int:
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._window_spent = 0
+        return self.budget_per_minute - self._window_spent
+    
+    async def tick(self):
+        """Refresh hot tickers whose entries expire within the lead time, within the upstream budget"""
+        for ticker in self.hot_tickers():
+            if self._budget_left() <= 0:
+                self.budget_exhausted += 1
+                break
+            try:
+                calls = await self.refresh_fn(ticker, self.lead_time)
+            except Exception as e:
+                logger.error(f"Proactive refresh of {ticker} failed: {e}")
+                continue
+            if calls:
+                self.refreshes += 1
+                self.upstream_calls += calls
+                self._window_spent += calls
+        self._decay()
+    
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.tick()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hot_tickers": self.hot_tickers(),
+            "refreshes": self.refreshes,
+            "upstream_calls": self.upstream_calls,
+            "budget_per_minute": self.budget_per_minute,
+            "budget_exhausted": self.budget_exhausted
+        }
+
+async def drain_in_flight(timeout: float):
+    """On shutdown, give queued/in-flight LLM calls and background refreshes time to finish"""
+    deadline = time.monotonic() + timeout
+    while (
+        llm_service.gate.in_flight or llm_service.gate.queued or llm_service.batcher.stats()["pending"]
+        or refresher.stats()["in_flight"]
+    ):
+        if time.monotonic() >= deadline:
+            logger.warning(f"Shutting down with work still in flight after {timeout}s: {llm_service.gate.stats()}")
+            return
+        await asyncio.sleep(0.05)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await http_client.start()
+    # Parse the symbol universe before serving so searches never pay for it
+    await asyncio.to_thread(symbol_index.ensure_loaded)
+    hot_refresh_task = asyncio.create_task(hot_tickers.run())
+    # Health checks are answered while the Gemini SDK loads in the background
+    warm_up_task = asyncio.create_task(llm_service.warm_up())
+    broadcast_task = asyncio.create_task(broadcaster.run())
+    # Workers sharing a cache backend learn about each other's refreshes by polling it
+    poll_task = asyncio.create_task(broadcaster.poll_shared()) if cache_backend.name != "memory" else None
+    STARTUP_TIMINGS["ready_ms"] = round((time.perf_counter() - MODULE_STARTED) * 1000, 1)
+    logger.info(f"Ready in {STARTUP_TIMINGS['ready_ms']}ms (module load {STARTUP_TIMINGS['module_load_ms']}ms)")
+    yield
+    warm_up_task.cancel()
+    hot_refresh_task.cancel()
+    broadcast_task.cancel()
+    if poll_task is not None:
+        poll_task.cancel()
+    await drain_in_flight(float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20")))
+    await refresher.close()
+    await http_client.close()
+    await cache_backend.close()
+    await llm_memo.close()
+    llm_service.gate.close()
+
 # Initialize FastAPI app
-app = FastAPI(title="MarketPulse API", version="1.0.0")
+app = FastAPI(title="MarketPulse API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -29,14 +460,481 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+try:
+    from zoneinfo import ZoneInfo
+    MARKET_TZ = ZoneInfo("America/New_York")
+except Exception:
+    # No tz database available (e.g. slim images without tzdata): assume EST
+    MARKET_TZ = timezone(timedelta(hours=-5))
+
+def seconds_until_market_open(now: Optional[datetime] = None) -> float:
+    """Seconds until the next US regular session opens, or 0 while it is open"""
+    now = (now or datetime.now(timezone.utc)).astimezone(MARKET_TZ)
+    open_time = now.replace(hour=9, minute=30, second=0, microsecond=0)
+    close_time = now.replace(hour=16, minute=0, second=0, microsecond=0)
+    if now.weekday() < 5 and open_time <= now < close_time:
+        return 0.0
+    
+    next_open = open_time if now < open_time else open_time + timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return (next_open - now).total_seconds()
+
+class CacheBackendError(Exception):
+    """Raised when a cache backend cannot serve a command"""
+
+class CacheBackend:
+    """Storage interface behind the cache layers; values must be JSON-serializable"""
+    
+    name = "base"
+    
+    def register(self, namespace: str, maxsize: int):
+        """Declare a namespace and its size bound before first use"""
+    
+    async def get(self, namespace: str, key: str) -> Any:
+        raise NotImplementedError
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        raise NotImplementedError
+    
+    async def set_if_absent(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        """Atomically store value only if key is missing or expired; True if it was stored"""
+        raise NotImplementedError
+    
+    async def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+    
+    async def size(self, namespace: str) -> Optional[int]:
+        return None
+    
+    async def clear(self):
+        raise NotImplementedError
+    
+    async def close(self):
+        pass
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process cache; each namespace is a size-bounded TLRU cache with per-entry expiry"""
+    
+    name = "memory"
+    
+    def __init__(self):
+        self._caches: Dict[str, TLRUCache] = {}
+    
+    def register(self, namespace: str, maxsize: int):
+        # Entries are stored as (value, expires_at) so each write can carry its own TTL
+        self._caches[namespace] = TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: entry[1])
+    
+    async def get(self, namespace: str, key: str) -> Any:
+        entry = self._caches[namespace].get(key)
+        return entry[0] if entry is not None else None
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        self._caches[namespace][key] = (value, time.monotonic() + ttl)
+    
+    async def set_if_absent(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        # Single-threaded event loop: the check and the write cannot interleave
+        if key in self._caches[namespace]:
+            return False
+        await self.set(namespace, key, value, ttl)
+        return True
+    
+    async def delete(self, namespace: str, key: str):
+        self._caches[namespace].pop(key, None)
+    
+    async def size(self, namespace: str) -> Optional[int]:
+        return len(self._caches[namespace])
+    
+    async def clear(self):
+        for entries in self._caches.values():
+            entries.clear()
+
+class SQLiteCacheBackend(CacheBackend):
+    """Cache in a local SQLite database in WAL mode, shared by every worker process on the host"""
+    
+    name = "sqlite"
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._maxsize: Dict[str, int] = {}
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # One dedicated thread owns the connection so the event loop never blocks on disk I/O
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+    
+    def register(self, namespace: str, maxsize: int):
+        self._maxsize[namespace] = maxsize
+    
+    async def _run(self, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+    
+    def _get(self, namespace: str, key: str) -> Any:
+        row = self._conn.execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _set(self, namespace: str, key: str, value: str, ttl: float):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, time.time() + ttl)
+        )
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune(namespace)
+    
+    def _set_if_absent(self, namespace: str, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ? AND expires_at <= ?", (namespace, key, now)
+            )
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, value, now + ttl)
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+    
+    def _prune(self, namespace: str):
+        """Drop expired rows, then the entries closest to expiry beyond the size bound"""
+        self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        maxsize = self._maxsize.get(namespace)
+        if maxsize:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, maxsize)
+            )
+    
+    def _size(self, namespace: str) -> int:
+        return self._conn.execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?", (namespace, time.time())
+        ).fetchone()[0]
+    
+    async def get(self, namespace: str, key: str) -> Any:
+        return await self._run(self._get, namespace, key)
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        await self._run(self._set, namespace, key, json.dumps(value), ttl)
+    
+    async def set_if_absent(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        return await self._run(self._set_if_absent, namespace, key, json.dumps(value), ttl)
+    
+    async def delete(self, namespace: str, key: str):
+        await self._run(self._conn.execute, "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+    
+    async def size(self, namespace: str) -> Optional[int]:
+        return await self._run(self._size, namespace)
+    
+    async def clear(self):
+        await self._run(self._conn.execute, "DELETE FROM cache")
+    
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
+
+class RedisCacheBackend(CacheBackend):
+    """Cache on any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly), e.g. a sidecar or shared service"""
+    
+    name = "redis"
+    
+    def __init__(self, url: str):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.prefix = os.getenv("CACHE_KEY_PREFIX", "marketpulse")
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock: Optional[asyncio.Lock] = None
+    
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+    
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+        return b"".join(parts)
+    
+    async def _read_reply(self) -> Any:
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise CacheBackendError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [await self._read_reply() for _ in range(length)]
+        raise CacheBackendError(f"Unexpected Redis reply: {line!r}")
+    
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            await self._roundtrip("AUTH", self.password)
+        if self.db:
+            await self._roundtrip("SELECT", self.db)
+    
+    async def _roundtrip(self, *args) -> Any:
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await self._read_reply()
+    
+    async def _command(self, *args) -> Any:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            try:
+                if self._writer is None or self._writer.is_closing():
+                    await self._connect()
+                return await self._roundtrip(*args)
+            except BaseException:
+                # Broken, or abandoned between write and read (e.g. a cancelled caller): a reply may still be
+                # in flight and would be read by the next command, so drop the connection; the next command reconnects
+                if self._writer is not None:
+                    self._writer.close()
+                self._writer = None
+                raise
+    
+    async def get(self, namespace: str, key: str) -> Any:
+        data = await self._command("GET", self._key(namespace, key))
+        return json.loads(data) if data is not None else None
+    
+    async def set(self, namespace: str, key: str, value: Any, ttl: float):
+        await self._command("SET", self._key(namespace, key), json.dumps(value), "PX", max(1, int(ttl * 1000)))
+    
+    async def set_if_absent(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        reply = await self._command(
+            "SET", self._key(namespace, key), json.dumps(value), "PX", max(1, int(ttl * 1000)), "NX"
+        )
+        return reply == "OK"
+    
+    async def delete(self, namespace: str, key: str):
+        await self._command("DEL", self._key(namespace, key))
+    
+    async def clear(self):
+        cursor = "0"
+        while True:
+            cursor, keys = await self._command("SCAN", cursor, "MATCH", f"{self.prefix}:*", "COUNT", 500)
+            if keys:
+                await self._command("DEL", *keys)
+            cursor = cursor.decode()
+            if cursor == "0":
+                break
+    
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+def create_cache_backend() -> CacheBackend:
+    """Build the cache backend selected by CACHE_BACKEND (memory, sqlite or redis)"""
+    kind = os.getenv("CACHE_BACKEND", "memory").lower()
+    if kind == "sqlite":
+        return SQLiteCacheBackend(os.getenv("CACHE_URL") or os.path.join(DATA_DIR, "cache.db"))
+    if kind == "redis":
+        return RedisCacheBackend(os.getenv("CACHE_URL") or "redis://localhost:6379/0")
+    if kind != "memory":
+        logger.warning(f"Unknown CACHE_BACKEND '{kind}', using in-memory cache")
+    return MemoryCacheBackend()
+
+class CacheEntry:
+    """Cached value plus the freshness metadata needed for stale-while-revalidate"""
+    
+    __slots__ = ("value", "stored_at", "ttl")
+    
+    def __init__(self, value: Any, stored_at: float, ttl: float):
+        self.value = value
+        self.stored_at = stored_at
+        self.ttl = ttl
+    
+    @property
+    def expires_at(self) -> float:
+        return self.stored_at + self.ttl
+    
+    @property
+    def stale(self) -> bool:
+        return time.time() >= self.expires_at
+
+class CacheLayer:
+    """Named cache layer with its own size bound, TTL and stale window, plus hit/miss counters"""
+    
+    def __init__(
+        self,
+        name: str,
+        backend: CacheBackend,
+        maxsize: int,
+        ttl: float,
+        ttl_fn: Optional[Callable[[], float]] = None,
+        stale_ttl: float = 0
+    ):
+        self.name = name
+        self.backend = backend
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.ttl_fn = ttl_fn
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._listeners: List[Callable[[str, str], None]] = []
+        backend.register(name, maxsize)
+    
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """Call listener(layer_name, key) whenever this process writes a fresh entry"""
+        self._listeners.append(listener)
+    
+    def current_ttl(self) -> float:
+        """TTL to apply to an entry written now"""
+        return self.ttl_fn() if self.ttl_fn else self.ttl
+    
+    async def _read(self, key: str) -> Optional[CacheEntry]:
+        try:
+            raw = await self.backend.get(self.name, key)
+        except Exception as e:
+            # A cache outage degrades to a miss rather than failing the request
+            self.errors += 1
+            logger.error(f"Cache backend error reading {self.name}/{key}: {e}")
+            return None
+        return CacheEntry(raw["value"], raw["stored_at"], raw["ttl"]) if raw is not None else None
+    
+    async def get_entry(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry if it is fresh or still inside its stale window"""
+        entry = await self._read(key)
+        if entry is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(layer=self.name, result="miss")
+        elif entry.stale:
+            self.stale_hits += 1
+            CACHE_REQUESTS.inc(layer=self.name, result="stale")
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.inc(layer=self.name, result="hit")
+        return entry
+    
+    async def get(self, key: str) -> Any:
+        """Return the value only if it is still fresh"""
+        entry = await self.get_entry(key)
+        return entry.value if entry is not None and not entry.stale else None
+    
+    async def peek(self, key: str) -> Optional[CacheEntry]:
+        """Read an entry without touching the hit/miss counters"""
+        return await self._read(key)
+    
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value for the layer's TTL, or for ttl seconds when given"""
+        ttl = self.current_ttl() if ttl is None else ttl
+        raw = {"value": value, "stored_at": time.time(), "ttl": ttl}
+        try:
+            # Keep the entry in the backend for its stale window as well
+            await self.backend.set(self.name, key, raw, ttl + self.stale_ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache backend error writing {self.name}/{key}: {e}")
+        for listener in self._listeners:
+            listener(self.name, key)
+    
+    async def contains(self, key: str) -> bool:
+        """True if the key can be served right now, fresh or stale"""
+        return await self._read(key) is not None
+    
+    async def acquire(self, key: str, ttl: float) -> bool:
+        """Take a short-lived lock shared by every process using this backend"""
+        try:
+            return await self.backend.set_if_absent(self.name, f"lock:{key}", WORKER_ID, ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Cache backend error locking {self.name}/{key}: {e}")
+            return True
+    
+    async def release(self, key: str):
+        try:
+            await self.backend.delete(self.name, f"lock:{key}")
+        except Exception as e:
+            logger.error(f"Cache backend error unlocking {self.name}/{key}: {e}")
+    
+    async def stats(self) -> Dict[str, Any]:
+        try:
+            size = await self.backend.size(self.name)
+        except Exception:
+            size = None
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "ttl": round(self.current_ttl()),
+            "stale_ttl": round(self.stale_ttl),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "errors": self.errors
+        }
+
+# Per-signal cache layers, each with its own size bound and TTL
+cache_backend = create_cache_backend()
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "60"))
+
+def price_cache_ttl() -> float:
+    """Prices are short-lived intraday and valid until the next open once the market has closed"""
+    return max(PRICE_CACHE_TTL, seconds_until_market_open())
+
+price_cache = CacheLayer(
+    "prices", cache_backend, int(os.getenv("PRICE_CACHE_SIZE", "2000")), PRICE_CACHE_TTL, price_cache_ttl,
+    stale_ttl=float(os.getenv("PRICE_CACHE_STALE_TTL", "120"))
+)
+news_cache = CacheLayer(
+    "news", cache_backend, int(os.getenv("NEWS_CACHE_SIZE", "2000")), float(os.getenv("NEWS_CACHE_TTL", "900")),
+    stale_ttl=float(os.getenv("NEWS_CACHE_STALE_TTL", "900"))
+)
+analysis_cache = CacheLayer(
+    "analysis", cache_backend, int(os.getenv("ANALYSIS_CACHE_SIZE", "2000")), float(os.getenv("ANALYSIS_CACHE_TTL", "1800")),
+    stale_ttl=float(os.getenv("ANALYSIS_CACHE_STALE_TTL", "1800"))
+)
+cache_layers = [price_cache, news_cache, analysis_cache]
 
-# TTL Cache for API responses (10 minutes)
-cache = TTLCache(maxsize=100, ttl=600)
+# Batch endpoint limits
+BATCH_MAX_TICKERS = int(os.getenv("BATCH_MAX_TICKERS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "10"))
 
-# Configure Gemini API
+# Latency budget of a market-pulse request (overridable per request, capped at the max); prices and news share the
+# first DEADLINE_DATA_SHARE of it, the LLM gets whatever is left minus a reserve for assembling the response
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", "6000"))
+REQUEST_DEADLINE_MAX_MS = float(os.getenv("REQUEST_DEADLINE_MAX_MS", "30000"))
+DEADLINE_DATA_SHARE = float(os.getenv("DEADLINE_DATA_SHARE", "0.5"))
+DEADLINE_RESERVE_MS = float(os.getenv("DEADLINE_RESERVE_MS", "50"))
+
+# Gemini API key; the SDK itself is configured when the model is first built
 gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
 
 # Pydantic models
 class NewsItem(BaseModel):
@@ -47,6 +945,7 @@ class NewsItem(BaseModel):
 class MomentumData(BaseModel):
     returns: List[float]
     score: float
+    windows: Optional[Dict[str, Optional[float]]] = None
 
 class MarketPulseResponse(BaseModel):
     ticker: str
@@ -55,123 +954,664 @@ class MarketPulseResponse(BaseModel):
     news: List[NewsItem]
     pulse: str
     llm_explanation: str
+    sources: Optional[Dict[str, str]] = None
+    degraded: bool = False
+    degraded_stages: List[str] = []
+
+class BatchPulseRequest(BaseModel):
+    tickers: List[str]
+
+class BatchPulseItem(BaseModel):
+    ticker: str
+    result: Optional[MarketPulseResponse] = None
+    error: Optional[str] = None
+
+class BatchPulseResponse(BaseModel):
+    count: int
+    errors: int
+    results: List[BatchPulseItem]
+
+class SectorMember(BaseModel):
+    ticker: str
+    name: str
+    score: float
+    pulse: Optional[str] = None
+
+class SectorPulseResponse(BaseModel):
+    sector: str
+    as_of: str
+    members: List[str]
+    pulse: str
+    llm_explanation: str
+    stats: Dict[str, Any]
+    leaders: List[SectorMember]
+    laggards: List[SectorMember]
+    sources: Optional[Dict[str, str]] = None
+
+class ProviderError(Exception):
+    """Raised when an upstream provider cannot serve a request"""
+    
+    def __init__(self, provider: str, message: str, status: Optional[int] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status = status
+
+class LocalRateLimitError(ProviderError):
+    """Raised when our own token bucket for a provider is empty; says nothing about the provider's health"""
+
+class CircuitOpenError(ProviderError):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """
+    Per-provider breaker: closed until the failure rate over a sliding window crosses the threshold, then
+    open (calls fail instantly) for a cool-down that doubles on every failed probe, then half-open while a
+    few probe calls decide whether to close it again
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.failure_rate = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+        self.min_calls = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+        self.window = float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+        self.open_seconds = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+        self.max_open_seconds = float(os.getenv("BREAKER_MAX_OPEN_SECONDS", "300"))
+        self.max_probes = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+        self.state = "closed"
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._open_until = 0.0
+        self._reopenings = 0
+        self._probes = 0
+    
+    def _transition(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit for {self.name} {self.state} -> {state}")
+            self.state = state
+            CIRCUIT_TRANSITIONS.inc(provider=self.name, state=state)
+    
+    def _prune(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+    
+    def _open(self, now: float):
+        self.opened += 1
+        cool_down = min(self.max_open_seconds, self.open_seconds * (2 ** self._reopenings))
+        self._open_until = now + cool_down
+        self._probes = 0
+        self._transition("open")
+    
+    def available(self) -> bool:
+        """Whether a call could go through right now (without reserving a probe slot)"""
+        if self.state == "open":
+            return time.monotonic() >= self._open_until
+        if self.state == "half_open":
+            return self._probes < self.max_probes
+        return True
+    
+    def allow(self) -> bool:
+        """Admit a call, reserving a probe slot when half-open; False means fail fast"""
+        if self.state == "open" and time.monotonic() >= self._open_until:
+            self._transition("half_open")
+        if self.state == "open" or (self.state == "half_open" and self._probes >= self.max_probes):
+            self.rejected += 1
+            return False
+        if self.state == "half_open":
+            self._probes += 1
+        return True
+    
+    def record_success(self):
+        now = time.monotonic()
+        if self.state == "half_open":
+            # The probe got through: start over with a clean window
+            self._outcomes.clear()
+            self._reopenings = 0
+            self._probes = 0
+            self._transition("closed")
+            return
+        self._outcomes.append((now, False))
+        self._prune(now)
+    
+    def record_failure(self):
+        now = time.monotonic()
+        if self.state == "half_open":
+            self._reopenings += 1
+            self._open(now)
+            return
+        self._outcomes.append((now, True))
+        self._prune(now)
+        if self.state == "closed" and len(self._outcomes) >= self.min_calls:
+            if sum(failed for _, failed in self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._open(now)
+    
+    def release(self):
+        """A call ended without a verdict on the provider (cancelled, throttled locally)"""
+        if self.state == "half_open" and self._probes > 0:
+            self._probes -= 1
+    
+    async def call(self, fn: Callable[[], Awaitable[Any]], is_failure: Callable[[Exception], Optional[bool]]) -> Any:
+        """Run fn() through the breaker; is_failure(e) says whether an exception counts against the provider"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, "circuit open, skipping call")
+        verdict = None
+        try:
+            result = await fn()
+            verdict = False
+            return result
+        except Exception as e:
+            verdict = is_failure(e)
+            raise
+        finally:
+            self.settle(verdict)
+    
+    def settle(self, failed: Optional[bool]):
+        """Record an admitted call's outcome: True failed, False succeeded, None no verdict"""
+        if failed is True:
+            self.record_failure()
+        elif failed is False:
+            self.record_success()
+        else:
+            self.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        failures = sum(failed for _, failed in self._outcomes)
+        return {
+            "state": self.state,
+            "error_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+            "calls_in_window": len(self._outcomes),
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": round(max(0.0, self._open_until - time.monotonic()), 1) if self.state == "open" else 0.0
+        }
+
+def provider_status(clients: List[Any]) -> str:
+    """Health of a failover chain: mock (none configured), configured, degraded (some open) or unavailable"""
+    if not clients:
+        return "mock"
+    available = sum(client.breaker.available() for client in clients)
+    if available == len(clients):
+        return "configured"
+    return "degraded" if available else "unavailable"
+
+class TokenBucket:
+    """Token-bucket rate limiter sized to a provider's quota"""
+    
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self, max_wait: float) -> bool:
+        """Take one token, waiting up to max_wait seconds for it; False if the quota is exhausted"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            wait = (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+class ProviderClient:
+    """Rate-limited JSON client for one upstream provider with 429-aware retries"""
+    
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+    # Responses that say the provider (or our access to it) is down, as opposed to a bad request
+    OUTAGE_STATUS = RETRYABLE_STATUS | {401, 403}
+    
+    def __init__(self, name: str, http: HTTPClientManager, rate_per_minute: float, burst: int):
+        self.name = name
+        self.http = http
+        prefix = name.upper()
+        self.limiter = TokenBucket(
+            float(os.getenv(f"{prefix}_RATE_PER_MIN", str(rate_per_minute))),
+            int(os.getenv(f"{prefix}_BURST", str(burst)))
+        )
+        self.max_retries = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+        self.backoff_base = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+        self.backoff_max = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+        self.max_wait = float(os.getenv("UPSTREAM_RATE_LIMIT_MAX_WAIT", "2"))
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled = 0
+        self.breaker = CircuitBreaker(name)
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Exponential backoff with full jitter, never shorter than the server's Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+    
+    async def get_json(
+        self, url: str, params: Dict, fixture_key: Optional[str] = None, parse: Optional[Callable[[Any], Any]] = None
+    ) -> Any:
+        """GET url and decode JSON, retrying 429/5xx and transport errors; raises ProviderError
+        
+        parse extracts what the caller needs from the decoded body; a body that isn't JSON or doesn't have the
+        expected shape raises ProviderError and counts against the circuit like any other failed call.
+        With a fixture_key, PROVIDER_MODE=record saves the response body and replay serves it without the network
+        """
+        if fixture_key is not None and fixtures.replaying:
+            return self._decode(await fixtures.replay(self.name, fixture_key), parse)
+        return await self.breaker.call(lambda: self._fetch(url, params, fixture_key, parse), self._is_outage)
+    
+    def _is_outage(self, error: Exception) -> Optional[bool]:
+        if isinstance(error, LocalRateLimitError):
+            return None
+        if isinstance(error, ProviderError):
+            return error.status is None or error.status in self.OUTAGE_STATUS
+        return True
+    
+    async def _fetch(self, url: str, params: Dict, fixture_key: Optional[str], parse: Optional[Callable[[Any], Any]]) -> Any:
+        return self._decode(await self._request(url, params, fixture_key), parse)
+    
+    def _decode(self, body: str, parse: Optional[Callable[[Any], Any]]) -> Any:
+        try:
+            data = json.loads(body)
+            return parse(data) if parse is not None else data
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            self.failures += 1
+            raise ProviderError(self.name, f"malformed response: {type(e).__name__}: {e}"[:200])
+    
+    async def _request(self, url: str, params: Dict, fixture_key: Optional[str]) -> str:
+        """The response body of a 200, after rate limiting and retries"""
+        for attempt in range(self.max_retries + 1):
+            if not await self.limiter.acquire(self.max_wait):
+                self.throttled += 1
+                raise LocalRateLimitError(self.name, "local rate limit reached")
+            
+            retry_after = None
+            self.requests += 1
+            try:
+                session = await self.http.get_session()
+                started = time.perf_counter()
+                async with session.get(url, params=params) as response:
+                    UPSTREAM_RESPONSES.inc(provider=self.name, status=response.status)
+                    if response.status == 200:
+                        body = await response.text()
+                        if fixture_key is not None and fixtures.recording:
+                            await fixtures.record(self.name, fixture_key, body, time.perf_counter() - started)
+                        return body
+                    if response.status not in self.RETRYABLE_STATUS:
+                        error_text = await response.text()
+                        self.failures += 1
+                        raise ProviderError(self.name, f"HTTP {response.status}: {error_text[:200]}", response.status)
+                    retry_after = response.headers.get("Retry-After")
+                    error = ProviderError(self.name, f"HTTP {response.status}", response.status)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                UPSTREAM_RESPONSES.inc(provider=self.name, status=type(e).__name__)
+                error = ProviderError(self.name, f"{type(e).__name__}: {e}")
+            
+            delay = self._backoff(attempt, retry_after)
+            if attempt == self.max_retries or delay > self.backoff_max:
+                # Out of attempts, or the server wants us gone longer than we are willing to wait
+                self.failures += 1
+                raise error
+            self.retries += 1
+            logger.warning(f"{error}; retrying in {delay:.2f}s (attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled": self.throttled,
+            "tokens": round(self.limiter.tokens, 2),
+            "circuit": self.breaker.state
+        }
+
+class FixtureStore:
+    """Recorded upstream responses for PROVIDER_MODE=record/replay: one gzipped file per date, provider and key"""
+    
+    MODES = ("live", "record", "replay")
+    
+    def __init__(self, mode: str, root: str, latency_scale: float = 0.0, replay_date: Optional[str] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown PROVIDER_MODE '{mode}' (expected one of {', '.join(self.MODES)})")
+        self.mode = mode
+        self.root = root
+        self.latency_scale = latency_scale
+        self.replay_date = replay_date
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = 0
+    
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+    
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+    
+    @staticmethod
+    def prompt_key(prompt: str) -> str:
+        """LLM fixtures are keyed by the prompt, which replayed inputs reproduce exactly"""
+        return hashlib.sha256(prompt.encode()).hexdigest()[:32]
+    
+    def _path(self, date: str, provider: str, key: str) -> str:
+        return os.path.join(self.root, date, provider, f"{key.replace('/', '_')}.json.gz")
+    
+    def _write(self, path: str, fixture: Dict):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(fixture, f)
+        os.replace(tmp_path, path)
+    
+    def _read(self, provider: str, key: str) -> Optional[Dict]:
+        if self.replay_date:
+            candidates = [self._path(self.replay_date, provider, key)]
+        else:
+            # Newest recording of this key wins
+            candidates = sorted(glob.glob(self._path("*", provider, key)), reverse=True)
+        for path in candidates:
+            if os.path.exists(path):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    return json.load(f)
+        return None
+    
+    async def record(self, provider: str, key: str, body: str, latency: float):
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        fixture = {"provider": provider, "key": key, "date": date, "latency": round(latency, 4), "body": body}
+        try:
+            await asyncio.to_thread(self._write, self._path(date, provider, key), fixture)
+            self.recorded += 1
+        except OSError as e:
+            logger.error(f"Could not record {provider} fixture for {key}: {e}")
+    
+    async def replay(self, provider: str, key: str) -> str:
+        """Return the recorded response body, after the recorded latency times the scale; never touches the network"""
+        fixture = await asyncio.to_thread(self._read, provider, key)
+        if fixture is None:
+            self.missing += 1
+            raise ProviderError(provider, f"no recorded fixture for {key}")
+        self.replayed += 1
+        if self.latency_scale > 0:
+            await asyncio.sleep(fixture["latency"] * self.latency_scale)
+        return fixture["body"]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "missing": self.missing
+        }
+
+fixtures = FixtureStore(
+    os.getenv("PROVIDER_MODE", "live").lower(),
+    os.getenv("FIXTURE_DIR") or os.path.join(DATA_DIR, "fixtures"),
+    latency_scale=float(os.getenv("REPLAY_LATENCY_SCALE", "0")),
+    replay_date=os.getenv("REPLAY_DATE") or None
+)
+
+ALLOW_MOCK_DATA = os.getenv("ALLOW_MOCK_DATA", "true").lower() in ("1", "true", "yes")
+
+class PriceHistoryStore:
+    """Local daily close history, one memory-mappable NumPy file per ticker"""
+    
+    dtype = np.dtype([("day", "<i4"), ("close", "<f8")])  # day = days since the Unix epoch (UTC)
+    
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        # Appends run on worker threads; one lock per ticker keeps a read-merge-write from losing another's candles
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+    
+    def _path(self, ticker: str) -> str:
+        safe = "".join(c if c.isalnum() or c in ".-_" else "_" for c in ticker)
+        return os.path.join(self.root, f"{safe}.npy")
+    
+    @staticmethod
+    def to_day(value) -> int:
+        """Convert a Unix timestamp or a YYYY-MM-DD string to an epoch day number"""
+        if isinstance(value, str):
+            return (datetime.strptime(value, "%Y-%m-%d").date() - datetime(1970, 1, 1).date()).days
+        return int(value) // 86400
+    
+    def read(self, ticker: str) -> np.ndarray:
+        """Stored history sorted by day (memory-mapped, read-only); empty if the ticker is unknown"""
+        try:
+            return np.load(self._path(ticker), mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return np.empty(0, dtype=self.dtype)
+    
+    def last_day(self, ticker: str) -> Optional[int]:
+        history = self.read(ticker)
+        return int(history["day"][-1]) if len(history) else None
+    
+    def append(self, ticker: str, days: List[int], closes: List[float]) -> np.ndarray:
+        """Merge new candles into the history; a re-fetched day (e.g. today's partial bar) replaces the stored one"""
+        if not days:
+            return self.read(ticker)
+        new = np.empty(len(days), dtype=self.dtype)
+        new["day"] = days
+        new["close"] = closes
+        with self._locks_guard:
+            lock = self._locks.setdefault(ticker, threading.Lock())
+        with lock:
+            existing = np.array(self.read(ticker))
+            merged = np.concatenate([existing[~np.isin(existing["day"], new["day"])], new])
+            merged = merged[np.argsort(merged["day"], kind="stable")]
+            
+            # Write to a uniquely named temp file and swap it in so concurrent readers never see a partial file
+            path = self._path(ticker)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, merged)
+            os.replace(tmp_path, path)
+        return merged
+    
+    async def read_async(self, ticker: str) -> np.ndarray:
+        return await asyncio.to_thread(lambda: np.array(self.read(ticker)))
+    
+    async def append_async(self, ticker: str, days: List[int], closes: List[float]) -> np.ndarray:
+        return await asyncio.to_thread(self.append, ticker, days, closes)
 
 class StockDataService:
     """Service for fetching stock price data"""
     
-    def __init__(self):
+    def __init__(self, http: HTTPClientManager, cache: CacheLayer, history: PriceHistoryStore):
+        self.http = http
+        self.cache = cache
+        self.history = history
+        self.backfill_days = int(os.getenv("PRICE_HISTORY_BACKFILL_DAYS", "120"))
         self.finnhub_key = os.getenv("FINNHUB_API_KEY")
         self.alpha_vantage_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+        # Overridable so tests and benchmarks can point at local stub servers
+        self.finnhub_url = os.getenv("FINNHUB_BASE_URL", "https://finnhub.io/api/v1").rstrip("/")
+        self.alpha_vantage_url = os.getenv("ALPHA_VANTAGE_BASE_URL", "https://www.alphavantage.co").rstrip("/")
+        # Defaults match the free tiers: Finnhub 60 calls/min, Alpha Vantage 5 calls/min
+        self.finnhub = ProviderClient("finnhub", http, rate_per_minute=60, burst=10)
+        self.alpha_vantage = ProviderClient("alpha_vantage", http, rate_per_minute=5, burst=1)
+        self.flight = SingleFlight("stock")
+        self.source_counts: Dict[str, int] = {}
     
     async def get_stock_data(self, ticker: str) -> Dict:
-        """Fetch last 5 days of stock data"""
-        if self.finnhub_key:
-            return await self._fetch_finnhub_data(ticker)
-        elif self.alpha_vantage_key:
-            return await self._fetch_alpha_vantage_data(ticker)
+        """Fetch last 5 days of stock data, sharing one upstream call per ticker"""
+        entry = await self.cache.get_entry(ticker)
+        if entry is not None:
+            if entry.stale:
+                refresher.schedule(f"stock:{ticker}", lambda: self.refresh(ticker))
+            return entry.value
+        return await self.refresh(ticker)
+    
+    async def refresh(self, ticker: str) -> Dict:
+        """Re-fetch a ticker's prices and update the cache"""
+        return await self.flight.do(ticker, lambda: self._load_stock_data(ticker))
+    
+    async def _load_stock_data(self, ticker: str) -> Dict:
+        data = await self._fetch_stock_data(ticker)
+        await self.cache.set(ticker, data)
+        return data
+    
+    def providers(self) -> List[tuple]:
+        """Configured providers in failover order, as (source, client, fetch)"""
+        # Replays need no keys: a provider without a fixture simply fails over
+        chain = []
+        if self.finnhub_key or fixtures.replaying:
+            chain.append(("finnhub", self.finnhub, self._fetch_finnhub_data))
+        if self.alpha_vantage_key or fixtures.replaying:
+            chain.append(("alpha_vantage", self.alpha_vantage, self._fetch_alpha_vantage_data))
+        return chain
+    
+    def _provider_chain(self) -> List[tuple]:
+        """Providers to try, in failover order; those with an open circuit are skipped without waiting on them"""
+        return [(source, fetch) for source, client, fetch in self.providers() if client.breaker.available()]
+    
+    async def _fetch_stock_data(self, ticker: str) -> Dict:
+        """Walk the failover chain: Finnhub -> Alpha Vantage -> last-known history -> mock"""
+        data = None
+        for source, fetch in self._provider_chain():
+            try:
+                with STAGE_SECONDS.time(stage="stock_fetch", provider=source):
+                    data = await fetch(ticker)
+                break
+            except ProviderError as e:
+                if e.status == 403:
+                    logger.error(f"{e} - verify the {source} API key in the .env file")
+                else:
+                    logger.error(f"Stock provider failed for {ticker}: {e}")
+        
+        if data is None:
+            return await self.fallback(ticker)
+        
+        data["source"] = source
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        return data
+    
+    async def fallback(self, ticker: str) -> Dict:
+        """Prices without asking a provider: last-known history, then mock; raises ProviderError if neither is available"""
+        history = await self.history.read_async(ticker)
+        if len(history) >= 2:
+            logger.warning(f"Serving last-known prices for {ticker}")
+            data, source = self._from_history(history), "last_known"
+        elif ALLOW_MOCK_DATA:
+            data, source = await self._get_mock_stock_data(ticker), "mock"
+            MOCK_FALLBACKS.inc(kind="prices")
         else:
-            # Fallback to mock data for demo purposes
-            return await self._get_mock_stock_data(ticker)
+            raise ProviderError("stock", f"no price data available for {ticker}")
+        
+        data["source"] = source
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        return data
+    
+    def _from_history(self, history: np.ndarray) -> Dict:
+        """Build the stock payload from stored history: last 5 closes plus longer-window momentum"""
+        closes = [float(c) for c in history["close"][-5:]]
+        window_stats = momentum_engine.compute(history["close"][-(max(momentum_engine.windows) + 1):])
+        windows = {}
+        for window in momentum_engine.windows:
+            value = float(window_stats[f"momentum_{window}d"][0])
+            windows[f"{window}d"] = None if np.isnan(value) else round(value, 2)
+        return {
+            "returns": MomentumEngine.daily_returns(closes),
+            "prices": closes,
+            "windows": windows
+        }
     
     async def _fetch_finnhub_data(self, ticker: str) -> Dict:
         """Fetch data from Finnhub API"""
-        try:
-            # Calculate date range (last 10 days to ensure we get 5 trading days)
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=10)
-            
-            url = "https://finnhub.io/api/v1/stock/candle"
-            params = {
-                "symbol": ticker,
-                "resolution": "D",
-                "from": int(start_date.timestamp()),
-                "to": int(end_date.timestamp()),
-                "token": self.finnhub_key
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("s") == "ok" and data.get("c"):
-                            # Get last 5 closing prices
-                            closes = data["c"][-5:]
-                            returns = []
-                            
-                            # Calculate daily returns
-                            for i in range(1, len(closes)):
-                                daily_return = (closes[i] - closes[i-1]) / closes[i-1]
-                                returns.append(round(daily_return * 100, 2))  # Convert to percentage
-                            
-                            return {
-                                "returns": returns,
-                                "prices": closes
-                            }
-                    elif response.status == 403:
-                        logger.error(f"Finnhub API error: 403 Forbidden - Invalid or expired API key for ticker {ticker}")
-                        logger.info("Please verify your Finnhub API key in the .env file")
-                    elif response.status == 429:
-                        logger.error(f"Finnhub API error: 429 Rate limit exceeded for ticker {ticker}")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Finnhub API error {response.status} for ticker {ticker}: {error_text}")
-                    
-                    return await self._get_mock_stock_data(ticker)
-                    
-        except Exception as e:
-            logger.error(f"Error fetching Finnhub data: {e}")
-            return await self._get_mock_stock_data(ticker)
+        # Only ask for candles since the last stored day (re-fetching it in case it was a partial bar);
+        # an unknown ticker gets a one-off backfill that covers the longest momentum window
+        history = await self.history.read_async(ticker)
+        end_date = datetime.now(timezone.utc)
+        if len(history):
+            start_ts = int(history["day"][-1]) * 86400
+        else:
+            start_ts = int((end_date - timedelta(days=self.backfill_days)).timestamp())
+        
+        url = f"{self.finnhub_url}/stock/candle"
+        params = {
+            "symbol": ticker,
+            "resolution": "D",
+            "from": start_ts,
+            "to": int(end_date.timestamp()),
+            "token": self.finnhub_key
+        }
+        
+        status, days, closes = await self.finnhub.get_json(url, params, fixture_key=ticker, parse=self._parse_finnhub)
+        if days:
+            history = await self.history.append_async(ticker, days, closes)
+        
+        # "no_data" just means nothing new since the last stored day
+        if len(history) < 2:
+            raise ProviderError("finnhub", f"no candles for {ticker} (status {status})")
+        return self._from_history(history)
+    
+    @staticmethod
+    def _parse_finnhub(data: Dict) -> tuple:
+        """(status, days, closes) from a candle response"""
+        if data.get("s") != "ok" or not data.get("c"):
+            return data.get("s"), [], []
+        days = [PriceHistoryStore.to_day(t) for t in data["t"]]
+        closes = [float(c) for c in data["c"]]
+        if len(days) != len(closes):
+            raise ValueError(f"{len(days)} timestamps for {len(closes)} closes")
+        return "ok", days, closes
     
     async def _fetch_alpha_vantage_data(self, ticker: str) -> Dict:
         """Fetch data from Alpha Vantage API"""
-        try:
-            url = "https://www.alphavantage.co/query"
-            params = {
-                "function": "TIME_SERIES_DAILY",
-                "symbol": ticker,
-                "apikey": self.alpha_vantage_key,
-                "outputsize": "compact"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        time_series = data.get("Time Series (Daily)", {})
-                        
-                        if time_series:
-                            # Get last 5 days of data
-                            sorted_dates = sorted(time_series.keys(), reverse=True)[:5]
-                            closes = []
-                            
-                            for date in reversed(sorted_dates):
-                                close_price = float(time_series[date]["4. close"])
-                                closes.append(close_price)
-                            
-                            # Calculate returns
-                            returns = []
-                            for i in range(1, len(closes)):
-                                daily_return = (closes[i] - closes[i-1]) / closes[i-1]
-                                returns.append(round(daily_return * 100, 2))
-                            
-                            return {
-                                "returns": returns,
-                                "prices": closes
-                            }
-                    
-                    logger.error(f"Alpha Vantage API error: {response.status}")
-                    return await self._get_mock_stock_data(ticker)
-                    
-        except Exception as e:
-            logger.error(f"Error fetching Alpha Vantage data: {e}")
-            return await self._get_mock_stock_data(ticker)
+        # Alpha Vantage has no date-range filter; "compact" (100 days) is its smallest payload,
+        # so only the days after the last stored one are merged into the history
+        last_day = await asyncio.to_thread(self.history.last_day, ticker)
+        url = f"{self.alpha_vantage_url}/query"
+        params = {
+            "function": "TIME_SERIES_DAILY",
+            "symbol": ticker,
+            "apikey": self.alpha_vantage_key,
+            "outputsize": "compact"
+        }
+        
+        bars, reason, throttled = await self.alpha_vantage.get_json(
+            url, params, fixture_key=ticker, parse=self._parse_alpha_vantage
+        )
+        if not bars:
+            raise ProviderError("alpha_vantage", f"{reason or 'empty time series'}"[:200], 429 if throttled else None)
+        
+        days, closes = [], []
+        for day, close in bars:
+            if last_day is None or day >= last_day:
+                days.append(day)
+                closes.append(close)
+        
+        history = await self.history.append_async(ticker, days, closes)
+        if len(history) < 2:
+            raise ProviderError("alpha_vantage", f"not enough history for {ticker}")
+        return self._from_history(history)
+    
+    @staticmethod
+    def _parse_alpha_vantage(data: Dict) -> tuple:
+        """([(day, close)] oldest first, error text, throttled) from a daily time series response"""
+        time_series = data.get("Time Series (Daily)") or {}
+        bars = sorted((PriceHistoryStore.to_day(date), float(bar["4. close"])) for date, bar in time_series.items())
+        # Quota and key errors come back as 200 with a "Note"/"Information"/"Error Message" body
+        reason = data.get("Note") or data.get("Information") or data.get("Error Message")
+        return bars, reason, "Note" in data
     
     async def _get_mock_stock_data(self, ticker: str) -> Dict:
         """Generate mock data for demo purposes"""
-        import random
-        
-        # Generate realistic mock returns
-        returns = [round(random.uniform(-3.0, 3.0), 2) for _ in range(4)]
+        # Generate realistic mock returns, seeded so a ticker's demo data is stable for the day
+        rng = random.Random(f"{ticker}:{datetime.now(timezone.utc).date()}")
+        returns = [round(rng.uniform(-3.0, 3.0), 2) for _ in range(4)]
         prices = [100.0]  # Starting price
         
         # Calculate prices from returns
@@ -188,80 +1628,115 @@ class StockDataService:
 class NewsService:
     """Service for fetching news data"""
     
-    def __init__(self):
+    def __init__(self, http: HTTPClientManager, cache: CacheLayer):
+        self.http = http
+        self.cache = cache
         self.gnews_key = os.getenv("GNEWS_API_KEY")
         self.news_api_key = os.getenv("NEWS_API_KEY")
+        self.gnews_url = os.getenv("GNEWS_BASE_URL", "https://gnews.io/api/v4").rstrip("/")
+        self.newsapi_url = os.getenv("NEWSAPI_BASE_URL", "https://newsapi.org/v2").rstrip("/")
+        # GNews allows about one request per second; NewsAPI has no per-second limit
+        self.gnews = ProviderClient("gnews", http, rate_per_minute=60, burst=1)
+        self.newsapi = ProviderClient("newsapi", http, rate_per_minute=60, burst=5)
+        self.flight = SingleFlight("news")
+        self.source_counts: Dict[str, int] = {}
+        self._last_known = LRUCache(maxsize=int(os.getenv("NEWS_LAST_KNOWN_SIZE", "2000")))
     
     async def get_news(self, ticker: str) -> List[Dict]:
-        """Fetch latest news for a ticker"""
-        if self.gnews_key:
-            return await self._fetch_gnews_data(ticker)
-        elif self.news_api_key:
-            return await self._fetch_newsapi_data(ticker)
+        """Fetch latest news for a ticker, sharing one upstream call per ticker"""
+        entry = await self.cache.get_entry(ticker)
+        if entry is not None:
+            if entry.stale:
+                refresher.schedule(f"news:{ticker}", lambda: self.refresh(ticker))
+            return entry.value
+        return await self.refresh(ticker)
+    
+    async def refresh(self, ticker: str) -> List[Dict]:
+        """Re-fetch a ticker's news and update the cache"""
+        return await self.flight.do(ticker, lambda: self._load_news(ticker))
+    
+    async def _load_news(self, ticker: str) -> List[Dict]:
+        news = await self._fetch_news(ticker)
+        await self.cache.set(ticker, news)
+        return news
+    
+    def providers(self) -> List[tuple]:
+        """Configured providers in failover order, as (source, client, fetch)"""
+        chain = []
+        if self.gnews_key or fixtures.replaying:
+            chain.append(("gnews", self.gnews, self._fetch_gnews_data))
+        if self.news_api_key or fixtures.replaying:
+            chain.append(("newsapi", self.newsapi, self._fetch_newsapi_data))
+        return chain
+    
+    def _provider_chain(self) -> List[tuple]:
+        """Providers to try, in failover order; those with an open circuit are skipped without waiting on them"""
+        return [(source, fetch) for source, client, fetch in self.providers() if client.breaker.available()]
+    
+    async def _fetch_news(self, ticker: str) -> List[Dict]:
+        """Walk the failover chain: GNews -> NewsAPI -> last-known articles -> mock"""
+        articles = None
+        for source, fetch in self._provider_chain():
+            try:
+                with STAGE_SECONDS.time(stage="news_fetch", provider=source):
+                    articles = await fetch(ticker)
+                self._last_known[ticker] = articles
+                break
+            except ProviderError as e:
+                logger.error(f"News provider failed for {ticker}: {e}")
+        
+        if articles is None:
+            return await self.fallback(ticker)
+        
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        # Each article records which source actually served it
+        return [dict(article, source=source) for article in articles]
+    
+    async def fallback(self, ticker: str) -> List[Dict]:
+        """News without asking a provider: last-known articles, then mock; raises ProviderError if neither is available"""
+        if ticker in self._last_known:
+            logger.warning(f"Serving last-known news for {ticker}")
+            articles, source = self._last_known[ticker], "last_known"
+        elif ALLOW_MOCK_DATA:
+            articles, source = await self._get_mock_news_data(ticker), "mock"
+            MOCK_FALLBACKS.inc(kind="news")
         else:
-            # Fallback to mock data
-            return await self._get_mock_news_data(ticker)
+            raise ProviderError("news", f"no news available for {ticker}")
+        
+        self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        return [dict(article, source=source) for article in articles]
+    
+    @staticmethod
+    def _parse_articles(data: Dict) -> List[Dict]:
+        articles = data.get("articles", [])
+        return [{
+            "title": article["title"],
+            "description": article.get("description") or "",
+            "url": article["url"]
+        } for article in articles[:5]]
     
     async def _fetch_gnews_data(self, ticker: str) -> List[Dict]:
         """Fetch data from GNews API"""
-        try:
-            url = "https://gnews.io/api/v4/search"
-            params = {
-                "q": f"{ticker} stock",
-                "token": self.gnews_key,
-                "lang": "en",
-                "max": 5
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        articles = data.get("articles", [])
-                        
-                        return [{
-                            "title": article["title"],
-                            "description": article.get("description", ""),
-                            "url": article["url"]
-                        } for article in articles[:5]]
-                    
-                    logger.error(f"GNews API error: {response.status}")
-                    return await self._get_mock_news_data(ticker)
-                    
-        except Exception as e:
-            logger.error(f"Error fetching GNews data: {e}")
-            return await self._get_mock_news_data(ticker)
+        url = f"{self.gnews_url}/search"
+        params = {
+            "q": f"{ticker} stock",
+            "token": self.gnews_key,
+            "lang": "en",
+            "max": 5
+        }
+        return await self.gnews.get_json(url, params, fixture_key=ticker, parse=self._parse_articles)
     
     async def _fetch_newsapi_data(self, ticker: str) -> List[Dict]:
         """Fetch data from NewsAPI"""
-        try:
-            url = "https://newsapi.org/v2/everything"
-            params = {
-                "q": f"{ticker} stock OR {ticker} earnings",
-                "apiKey": self.news_api_key,
-                "language": "en",
-                "sortBy": "publishedAt",
-                "pageSize": 5
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        articles = data.get("articles", [])
-                        
-                        return [{
-                            "title": article["title"],
-                            "description": article.get("description", ""),
-                            "url": article["url"]
-                        } for article in articles[:5]]
-                    
-                    logger.error(f"NewsAPI error: {response.status}")
-                    return await self._get_mock_news_data(ticker)
-                    
-        except Exception as e:
-            logger.error(f"Error fetching NewsAPI data: {e}")
-            return await self._get_mock_news_data(ticker)
+        url = f"{self.newsapi_url}/everything"
+        params = {
+            "q": f"{ticker} stock OR {ticker} earnings",
+            "apiKey": self.news_api_key,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": 5
+        }
+        return await self.newsapi.get_json(url, params, fixture_key=ticker, parse=self._parse_articles)
     
     async def _get_mock_news_data(self, ticker: str) -> List[Dict]:
         """Generate mock news data"""
@@ -296,6 +1771,77 @@ class NewsService:
         logger.info(f"Using mock news data for ticker: {ticker}")
         return mock_news[:5]
 
+class MomentumEngine:
+    """Vectorized momentum statistics over a (tickers x days) close-price matrix"""
+    
+    def __init__(self, windows=None):
+        if windows is None:
+            windows = [int(w) for w in os.getenv("MOMENTUM_WINDOWS", "5,20,60").split(",") if w.strip()]
+        self.windows = tuple(windows)
+    
+    @staticmethod
+    def returns_matrix(prices) -> np.ndarray:
+        """Daily percentage returns; NaN prices (e.g. left-padding of shorter histories) give NaN returns"""
+        prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = (prices[:, 1:] - prices[:, :-1]) / prices[:, :-1] * 100.0
+        returns[~np.isfinite(returns)] = np.nan
+        return returns
+    
+    @classmethod
+    def daily_returns(cls, closes: List[float]) -> List[float]:
+        """Single-ticker daily returns in percent, rounded for the API response"""
+        if len(closes) < 2:
+            return []
+        return [round(float(r), 2) for r in cls.returns_matrix(closes)[0]]
+    
+    def compute(self, prices) -> Dict[str, np.ndarray]:
+        """Momentum, volatility and up/down-day statistics for every row of a price matrix"""
+        return self.compute_from_returns(self.returns_matrix(prices))
+    
+    def compute_from_returns(self, returns) -> Dict[str, np.ndarray]:
+        """Same statistics for a (tickers x days) matrix of percentage returns, NaN where missing"""
+        returns = np.atleast_2d(np.asarray(returns, dtype=np.float64))
+        valid = ~np.isnan(returns)
+        filled = np.where(valid, returns, 0.0)
+        counts = valid.sum(axis=1)
+        safe_counts = np.maximum(counts, 1)
+        
+        mean = filled.sum(axis=1) / safe_counts
+        variance = (np.where(valid, returns - mean[:, None], 0.0) ** 2).sum(axis=1) / safe_counts
+        highest = np.where(valid, returns, -np.inf).max(axis=1, initial=-np.inf)
+        lowest = np.where(valid, returns, np.inf).min(axis=1, initial=np.inf)
+        has_data = counts > 0
+        
+        stats = {
+            "returns": returns,
+            "count": counts,
+            "score": np.where(has_data, mean, 0.0),
+            "volatility": np.where(has_data, np.sqrt(variance), 0.0),
+            "volatility_range": np.where(has_data, highest - lowest, 0.0),
+            "up_days": (filled > 0).sum(axis=1),
+            "down_days": (filled < 0).sum(axis=1)
+        }
+        
+        # Window momentum is NaN when a ticker has fewer returns than the window
+        for window in self.windows:
+            tail_valid = valid[:, -window:]
+            tail_sum = filled[:, -window:].sum(axis=1)
+            complete = tail_valid.sum(axis=1) == window
+            stats[f"momentum_{window}d"] = np.where(complete, tail_sum / window, np.nan)
+        return stats
+    
+    def summarize(self, returns: List[float]) -> Dict[str, float]:
+        """Plain-Python statistics for a single ticker's returns (used for prompts and fallbacks)"""
+        stats = self.compute_from_returns([returns] if returns else np.empty((1, 0)))
+        return {
+            "score": float(stats["score"][0]),
+            "up_days": int(stats["up_days"][0]),
+            "down_days": int(stats["down_days"][0]),
+            "volatility": float(stats["volatility"][0]),
+            "volatility_range": float(stats["volatility_range"][0])
+        }
+
 class MomentumCalculator:
     """Calculate momentum score from price returns"""
     
@@ -308,75 +1854,979 @@ class MomentumCalculator:
         if not returns:
             return 0.0
         
-        # Simple average momentum score
-        avg_return = sum(returns) / len(returns)
-        return round(avg_return, 2)
+        # Simple average momentum score, computed by the vectorized engine
+        avg_return = momentum_engine.summarize(returns)["score"]
+        score = round(avg_return, 2)
+        # Small negative averages round to -0.0, which would serialize as "-0.0"
+        return score if score != 0 else 0.0
+
+# Pulse codes used by classify_pulse
+PULSE_LABELS = {1: "bullish", 0: "neutral", -1: "bearish"}
+PULSE_MOMENTUM_THRESHOLD = float(os.getenv("PULSE_MOMENTUM_THRESHOLD", "0.5"))
+PULSE_NEWS_THRESHOLD = float(os.getenv("PULSE_NEWS_THRESHOLD", "1"))
+
+def classify_pulse(score, news_sentiment, momentum_threshold=PULSE_MOMENTUM_THRESHOLD, news_threshold=PULSE_NEWS_THRESHOLD) -> np.ndarray:
+    """
+    Rule-based pulse as codes (1 bullish, 0 neutral, -1 bearish), vectorized over any broadcastable inputs
+    
+    Momentum beyond the threshold decides unless the news disagrees; inside it, strong news can tip the call
+    """
+    score = np.asarray(score, dtype=np.float64)
+    news = np.asarray(news_sentiment, dtype=np.float64)
+    conditions = [
+        (score > momentum_threshold) & (news >= 0),
+        (score < -momentum_threshold) & (news <= 0),
+        (np.abs(score) <= momentum_threshold) & (np.abs(news) <= news_threshold),
+        news > news_threshold,  # Strong positive news can override weak negative momentum
+        news < -news_threshold  # Strong negative news can override weak positive momentum
+    ]
+    return np.select(conditions, [1, -1, 0, 1, -1], default=0)
+
+class SentimentScorer:
+    """Keyword news sentiment with one compiled, word-boundary matcher over a configurable lexicon"""
+    
+    DEFAULT_LEXICON = {
+        "positive": ["beat", "strong", "growth", "rise", "gain", "up", "increase", "launch", "partnership", "deal",
+                     "profit", "revenue"],
+        "negative": ["miss", "fall", "drop", "decline", "loss", "down", "concern", "challenge", "risk", "cut", "lower"],
+        # Words the rule-based explanation calls out as notable developments
+        "significant": ["beat", "strong", "growth", "launch", "deal", "miss", "fall", "decline", "concern"]
+    }
+    VOWELS = "aeiou"
+    
+    def __init__(self, lexicon: Optional[Dict[str, List[str]]] = None):
+        lexicon = lexicon or self.DEFAULT_LEXICON
+        self.polarity: Dict[str, int] = {}
+        for word in lexicon.get("positive", []):
+            self.polarity[word.lower()] = 1
+        for word in lexicon.get("negative", []):
+            self.polarity[word.lower()] = -1
+        self.significant = {word.lower() for word in lexicon.get("significant", [])}
+        # Every inflected form maps back to its keyword; a keyword spelled like another's inflection stays itself
+        self._stems = {form: stem for stem in self.polarity for form in self._inflections(stem)}
+        self._stems.update({stem: stem for stem in self.polarity})
+        # Candidate words start with a keyword (minus a final e); the form table decides whether they are inflections
+        prefixes = sorted({stem[:-1] if stem.endswith("e") else stem for stem in self.polarity}, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(re.escape(prefix) for prefix in prefixes) + r")\w*")
+    
+    @classmethod
+    def _inflections(cls, stem: str) -> List[str]:
+        """Simple inflections so "beats", "lowered", "rising" (dropped e) and "dropped" (doubled consonant) hit their stem"""
+        forms = [stem + suffix for suffix in ("", "s", "es", "d", "ed", "ing")]
+        if stem.endswith("e"):
+            forms.append(stem[:-1] + "ing")
+        if len(stem) >= 3 and stem[-1] not in cls.VOWELS + "wxy" and stem[-2] in cls.VOWELS and stem[-3] not in cls.VOWELS:
+            forms += [stem + stem[-1] + "ed", stem + stem[-1] + "ing"]
+        return forms
+    
+    @classmethod
+    def from_env(cls) -> "SentimentScorer":
+        """Load the lexicon from SENTIMENT_LEXICON_PATH (JSON with positive/negative/significant lists) if set"""
+        path = os.getenv("SENTIMENT_LEXICON_PATH")
+        if not path:
+            return cls()
+        try:
+            with open(path) as f:
+                return cls(json.load(f))
+        except Exception as e:
+            logger.error(f"Could not load sentiment lexicon {path}, using the default: {e}")
+            return cls()
+    
+    @staticmethod
+    def _text(news: Dict) -> str:
+        return (news["title"] + " " + (news.get("description") or "")).lower().replace("\n", " ")
+    
+    def match_headlines(self, news_items: List[Dict]) -> List[Dict[str, Any]]:
+        """Keywords found in each headline (title + description), scanning all of them in one pass"""
+        texts = [self._text(news) for news in news_items]
+        starts, offset = [], 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        
+        found = [set() for _ in texts]
+        stems = self._stems
+        for match in self._pattern.finditer("\n".join(texts)):
+            stem = stems.get(match.group())
+            if stem is not None:
+                found[bisect.bisect_right(starts, match.start()) - 1].add(stem)
+        
+        results = []
+        for words in found:
+            positive = sorted(w for w in words if self.polarity[w] > 0)
+            negative = sorted(w for w in words if self.polarity[w] < 0)
+            results.append({
+                "score": len(positive) - len(negative),
+                "positive": positive,
+                "negative": negative,
+                "significant": [w for w in positive + negative if w in self.significant]
+            })
+        return results
+    
+    def score_headlines(self, news_items: List[Dict]) -> int:
+        """Net sentiment of a set of headlines: each keyword counts once per headline"""
+        return sum(result["score"] for result in self.match_headlines(news_items))
+    
+    def score_batch(self, news_sets: List[List[Dict]]) -> List[int]:
+        """Net sentiment for several tickers' headlines with a single scan"""
+        flat = [news for news_items in news_sets for news in news_items]
+        scores = [result["score"] for result in self.match_headlines(flat)]
+        totals, i = [], 0
+        for news_items in news_sets:
+            totals.append(sum(scores[i:i + len(news_items)]))
+            i += len(news_items)
+        return totals
+
+class SymbolIndex:
+    """Symbol universe (symbol, name, sector, size) loaded once from CSV into prefix and trigram indexes"""
+    
+    GENERIC_CONTEXT = {"sector": "General Market", "size": "Mid Cap"}
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Row i of each column belongs to symbols[i]; symbols are sorted so prefixes are a bisect range
+        self.symbols: List[str] = []
+        self.names: List[str] = []
+        self.sectors: List[str] = []
+        self.sizes: List[str] = []
+        # Sorted (word, row) pairs over name words and aliases, for "starts with" name matches
+        self._words: List[str] = []
+        self._word_rows: List[int] = []
+        # Trigram -> sorted rows whose normalized name (or alias) contains it, for substring matches
+        self._trigrams: Dict[str, Any] = {}
+        self._search_text: List[str] = []
+        # Lower-cased sector -> member rows, large caps first
+        self._sector_rows: Dict[str, List[int]] = {}
+        self.load_ms = 0.0
+        self.searches = 0
+    
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(re.sub(r"[^0-9a-z]+", " ", text.lower()).split())
+    
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+    
+    def _load(self):
+        started = time.perf_counter()
+        rows = {}
+        try:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for record in csv.DictReader(f):
+                    symbol = (record.get("symbol") or "").strip().upper()
+                    if symbol:
+                        rows[symbol] = record
+        except OSError as e:
+            logger.error(f"Could not load symbol universe {self.path}, using generic company context: {e}")
+        
+        words, trigrams = [], {}
+        for i, symbol in enumerate(sorted(rows)):
+            record = rows[symbol]
+            name = (record.get("name") or "").strip() or symbol
+            aliases = [alias for alias in (record.get("aliases") or "").split(";") if alias.strip()]
+            self.symbols.append(symbol)
+            self.names.append(name)
+            self.sectors.append((record.get("sector") or "").strip())
+            self.sizes.append((record.get("size") or "").strip())
+            
+            text = " | ".join(self._normalize(part) for part in [name] + aliases)
+            self._search_text.append(text)
+            for word in set(text.split()) - {"|"}:
+                words.append((word, i))
+            # Rows arrive in order, so every posting list is built already sorted
+            for gram in {text[start:start + 3] for start in range(len(text) - 2)}:
+                trigrams.setdefault(gram, []).append(i)
+        
+        for row, sector in enumerate(self.sectors):
+            if sector:
+                self._sector_rows.setdefault(sector.lower(), []).append(row)
+        for rows in self._sector_rows.values():
+            rows.sort(key=lambda row: self.sizes[row] != "Large Cap")
+        
+        words.sort()
+        self._words = [word for word, _ in words]
+        self._word_rows = [row for _, row in words]
+        self._trigrams = {gram: array("I", rows) for gram, rows in trigrams.items()}
+        self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Loaded {len(self.symbols)} symbols from {self.path} in {self.load_ms}ms")
+    
+    def _entry(self, row: int) -> Dict[str, str]:
+        return {"symbol": self.symbols[row], "name": self.names[row], "sector": self.sectors[row], "size": self.sizes[row]}
+    
+    def get(self, symbol: str) -> Optional[Dict[str, str]]:
+        """Exact symbol lookup"""
+        self.ensure_loaded()
+        row = bisect.bisect_left(self.symbols, symbol)
+        if row < len(self.symbols) and self.symbols[row] == symbol:
+            return self._entry(row)
+        return None
+    
+    def company_context(self, ticker: str) -> Dict[str, str]:
+        """Name, sector and size for the LLM prompt, with a generic context for unknown tickers"""
+        entry = self.get(ticker)
+        if entry is None:
+            return {"name": f"{ticker} Corporation", **self.GENERIC_CONTEXT}
+        return {
+            "name": entry["name"],
+            "sector": entry["sector"] or self.GENERIC_CONTEXT["sector"],
+            "size": entry["size"] or self.GENERIC_CONTEXT["size"]
+        }
+    
+    def list_sectors(self) -> Dict[str, int]:
+        """Sector name -> number of member symbols"""
+        self.ensure_loaded()
+        return {self.sectors[rows[0]]: len(rows) for rows in self._sector_rows.values()}
+    
+    def sector_members(self, sector: str) -> List[str]:
+        """Member symbols of a sector (case-insensitive), large caps first"""
+        self.ensure_loaded()
+        return [self.symbols[row] for row in self._sector_rows.get(sector.strip().lower(), [])]
+    
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, str]]:
+        """
+        Rank symbols for an autocomplete query: exact symbol, symbol prefix, name/alias word prefix,
+        then name/alias substring (queries of 3+ characters)
+        """
+        self.ensure_loaded()
+        self.searches += 1
+        rows: List[int] = []
+        seen = set()
+        
+        def add(row: int) -> bool:
+            if row not in seen:
+                seen.add(row)
+                rows.append(row)
+            return len(rows) >= limit
+        
+        symbol = query.strip().upper()
+        if symbol:
+            start = bisect.bisect_left(self.symbols, symbol)
+            for row in range(start, len(self.symbols)):
+                if not self.symbols[row].startswith(symbol) or add(row):
+                    break
+        
+        text = self._normalize(query)
+        if text and len(rows) < limit:
+            # The first word picks the candidates from the sorted word list; the full text must then match
+            first = text.split()[0]
+            start = bisect.bisect_left(self._words, first)
+            for i in range(start, len(self._words)):
+                if not self._words[i].startswith(first):
+                    break
+                row = self._word_rows[i]
+                if (" " + text) in (" " + self._search_text[row]) and add(row):
+                    break
+        
+        if len(text) >= 3 and len(rows) < limit:
+            postings = [self._trigrams.get(text[i:i + 3]) for i in range(len(text) - 2)]
+            if all(posting is not None for posting in postings):
+                postings.sort(key=len)
+                candidates = set(postings[0])
+                for posting in postings[1:]:
+                    candidates.intersection_update(posting)
+                for row in sorted(candidates):
+                    if text in self._search_text[row] and add(row):
+                        break
+        
+        return [self._entry(row) for row in rows[:limit]]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "loaded": self._loaded,
+            "symbols": len(self.symbols),
+            "load_ms": self.load_ms,
+            "searches": self.searches
+        }
+
+class LLMResultMemo:
+    """Content-addressed, disk-persisted LRU memo of LLM analyses keyed by a hash of the prompt inputs"""
+    
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-memo")
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memo (key TEXT PRIMARY KEY, value TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memo_last_used ON memo (last_used)")
+    
+    @staticmethod
+    def fingerprint(ticker: str, momentum_data: Dict, news_data: List[Dict]) -> str:
+        """Stable hash of what the prompt is built from: rounded returns, score and the set of headlines"""
+        payload = {
+            "ticker": ticker,
+            "returns": [round(r, 1) for r in momentum_data["returns"]],
+            "score": round(momentum_data["score"], 2),
+            "news": sorted([news["title"], news["url"]] for news in news_data[:5])
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    
+    @staticmethod
+    def sector_fingerprint(sector: str, stats: Dict) -> str:
+        """Stable hash of a sector summary's inputs: momentum to 0.1%, breadth, sentiment, pulses and leaders"""
+        payload = {
+            "sector": sector.lower(),
+            "avg_score": round(stats["avg_score"], 1),
+            "median_score": round(stats["median_score"], 1),
+            "breadth": [stats["members"], stats["advancers"], stats["decliners"]],
+            "news_sentiment": stats["news_sentiment"],
+            "pulse_counts": stats["pulse_counts"],
+            "leaders": [member["ticker"] for member in stats["leaders"]],
+            "laggards": [member["ticker"] for member in stats["laggards"]]
+        }
+        return "sector:" + hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    
+    async def _run(self, fn: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+    
+    def _get(self, key: str) -> Optional[Dict]:
+        row = self._conn.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE memo SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+    
+    def _put(self, key: str, value: str):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO memo (key, value, last_used) VALUES (?, ?, ?)", (key, value, time.time())
+        )
+        self._writes += 1
+        if self._writes % 50 == 0:
+            # Evict the least recently used entries beyond the size bound
+            self._conn.execute(
+                "DELETE FROM memo WHERE key IN (SELECT key FROM memo ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+    
+    async def get(self, key: str) -> Optional[Dict]:
+        try:
+            value = await self._run(self._get, key)
+        except Exception as e:
+            logger.error(f"LLM memo read failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    async def put(self, key: str, value: Dict):
+        try:
+            await self._run(self._put, key, json.dumps(value))
+        except Exception as e:
+            logger.error(f"LLM memo write failed: {e}")
+    
+    async def clear(self):
+        await self._run(self._conn.execute, "DELETE FROM memo")
+    
+    async def close(self):
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "max_entries": self.max_entries
+        }
+
+class LLMCallGate:
+    """Concurrency cap, per-call deadline and optional p95 hedging for LLM calls"""
+    
+    def __init__(self, max_concurrency: int, timeout: float, hedge: bool, hedge_min_samples: int = 20):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Blocking SDK calls get their own bounded pool instead of the loop's default executor
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="llm")
+        self._latencies = deque(maxlen=200)
+        self._threads: Dict[asyncio.Task, Any] = {}
+        self.queued = 0
+        self.in_flight = 0
+        self.abandoned = 0
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    def _percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        return float(np.percentile(np.fromiter(self._latencies, dtype=float), q))
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before firing a hedged duplicate, once enough latencies are known"""
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return self._percentile(95)
+    
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the concurrency slots, recording the latency when the body succeeds
+        
+        A blocking call started with run_blocking keeps the slot until its thread returns, even if the caller
+        timed out or lost a hedge, so in_flight and queue_depth reflect the pool's real load
+        """
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        task = asyncio.current_task()
+        try:
+            yield
+            elapsed = time.perf_counter() - started
+            self._latencies.append(elapsed)
+            STAGE_SECONDS.observe(elapsed, stage="llm_call", provider="gemini")
+        finally:
+            thread = self._threads.pop(task, None)
+            if thread is not None and not thread.done():
+                self.abandoned += 1
+                loop = asyncio.get_running_loop()
+                thread.add_done_callback(lambda _: self._thread_done(loop))
+            else:
+                self.in_flight -= 1
+                self._semaphore.release()
+    
+    def _thread_done(self, loop: asyncio.AbstractEventLoop):
+        # Runs on the worker thread; the slot is released on the loop that handed it out
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._release_abandoned)
+    
+    def _release_abandoned(self):
+        self.abandoned -= 1
+        self.in_flight -= 1
+        self._semaphore.release()
+    
+    async def run_blocking(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a blocking SDK call on the gate's pool, tied to the caller's slot"""
+        thread = self.executor.submit(fn, *args)
+        self._threads[asyncio.current_task()] = thread
+        return await asyncio.wrap_future(thread)
+    
+    async def _attempt(self, fn: Callable[[], Awaitable[str]]) -> str:
+        async with self.slot():
+            return await fn()
+    
+    async def call(self, fn: Callable[[], Awaitable[str]]) -> str:
+        """Run fn under the cap; raises asyncio.TimeoutError once the deadline passes"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        self.calls += 1
+        primary = asyncio.create_task(self._attempt(fn))
+        pending = {primary}
+        hedge_delay = self.hedge_delay()
+        last_error: Optional[BaseException] = None
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=min(hedge_delay, self.timeout))
+                if not done and loop.time() < deadline:
+                    self.hedges += 1
+                    pending.add(asyncio.create_task(self._attempt(fn)))
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+            if last_error is not None and not pending:
+                self.errors += 1
+                raise last_error
+            self.timeouts += 1
+            raise asyncio.TimeoutError(f"LLM call exceeded {self.timeout}s")
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def close(self):
+        self.executor.shutdown(wait=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self._percentile(50), self._percentile(95)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout,
+            "hedging": self.hedge,
+            "queue_depth": self.queued,
+            "in_flight": self.in_flight,
+            "abandoned": self.abandoned,
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+        }
+
+class LLMBatcher:
+    """Collects pending analyses for a short window (or up to N tickers) and sends one combined LLM call"""
+    
+    def __init__(self, service: "LLMService", max_batch: int, window: float):
+        self.service = service
+        self.max_batch = max_batch
+        self.window = window
+        self.batches = 0
+        self.batched_requests = 0
+        self.section_retries = 0
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: set = set()
+    
+    async def submit(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((ticker, momentum_data, news_data, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+    
+    async def _run(self, batch: List[tuple]):
+        requests = [(ticker, momentum_data, news_data) for ticker, momentum_data, news_data, _ in batch]
+        results: List[Optional[Dict]] = []
+        try:
+            if len(batch) == 1:
+                results = [await self.service._analyze_single(*requests[0])]
+            else:
+                results = await self._run_combined(requests)
+        except Exception as e:
+            logger.error(f"LLM batch of {len(batch)} tickers failed: {e}")
+        finally:
+            # Every waiter gets an answer, even if the batch failed or was cancelled part-way
+            for i, (ticker, momentum_data, news_data, future) in enumerate(batch):
+                if future.done():
+                    continue
+                analysis = results[i] if i < len(results) else None
+                if analysis is not None:
+                    future.set_result(analysis)
+                    continue
+                try:
+                    future.set_result(self.service._get_fallback_analysis(ticker, momentum_data, news_data))
+                except Exception as e:
+                    future.set_exception(e)
+    
+    async def _run_combined(self, requests: List[tuple]) -> List[Dict]:
+        tickers = [ticker for ticker, _, _ in requests]
+        self.batches += 1
+        self.batched_requests += len(requests)
+        try:
+            with STAGE_SECONDS.time(stage="prompt_build", provider="gemini"):
+                prompt = self.service._create_batch_prompt(requests)
+            response_text = await self.service._generate(prompt)
+        except asyncio.TimeoutError:
+            # Retrying each ticker would only wait out the deadline again
+            logger.error(f"Batched LLM call for {len(requests)} tickers timed out, using rule-based analysis")
+            return [self.service._get_fallback_analysis(*request) for request in requests]
+        except Exception as e:
+            # A transport or API failure would hit every per-ticker retry too, multiplying the load on a failing upstream
+            logger.error(f"Batched LLM call for {len(requests)} tickers failed: {e}, using rule-based analysis")
+            return [self.service._get_fallback_analysis(*request) for request in requests]
+        try:
+            parsed = self.service._parse_batch_llm_response(response_text, tickers)
+        except Exception as e:
+            logger.error(f"Could not parse batched LLM response for {len(requests)} tickers: {e}")
+            parsed = {ticker: None for ticker in tickers}
+        
+        # Only the tickers whose section could not be parsed are retried on their own
+        retry_indexes = [i for i, ticker in enumerate(tickers) if parsed[ticker] is None]
+        self.section_retries += len(retry_indexes)
+        retried = await asyncio.gather(*[self.service._analyze_single(*requests[i]) for i in retry_indexes])
+        results = []
+        for ticker in tickers:
+            analysis = parsed[ticker]
+            results.append(dict(analysis, source="gemini") if analysis else None)
+        for i, analysis in zip(retry_indexes, retried):
+            results[i] = analysis
+        return results
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch,
+            "window_ms": round(self.window * 1000),
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+            "section_retries": self.section_retries,
+            "pending": len(self._pending)
+        }
 
 class LLMService:
     """Service for LLM analysis"""
     
-    def __init__(self):
-        self.model = None
-        if gemini_api_key:
-            try:
-                # Updated model name for current API
-                self.model = genai.GenerativeModel('gemini-1.5-flash')
-            except Exception as e:
-                logger.error(f"Error initializing Gemini: {e}")
+    EXPLANATION_MARKER = re.compile(r"EXPLANATION[\s*]*:[\s*]*", re.IGNORECASE)
+    
+    def __init__(self, cache: CacheLayer, memo: LLMResultMemo):
+        self.cache = cache
+        self.memo = memo
+        self.flight = SingleFlight("analysis")
+        self.lock_ttl = float(os.getenv("ANALYSIS_LOCK_TTL", "30"))
+        # A rule-based stand-in for a failed LLM call is only cached briefly, so the LLM is retried soon
+        self.fallback_ttl = float(os.getenv("ANALYSIS_FALLBACK_TTL", "60"))
+        self.batcher = LLMBatcher(
+            self,
+            max_batch=int(os.getenv("LLM_BATCH_MAX", "8")),
+            window=float(os.getenv("LLM_BATCH_WINDOW_MS", "50")) / 1000
+        )
+        self.gate = LLMCallGate(
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "8")),
+            hedge=os.getenv("LLM_HEDGE", "false").lower() == "true"
+        )
+        self.breaker = CircuitBreaker("gemini")
+        self._model = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """The Gemini model, built on first use (warm_up() does it off the event loop at startup)"""
+        if not self._model_loaded:
+            self._build_model()
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._model_loaded = True
+    
+    def _build_model(self):
+        with self._model_lock:
+            if self._model_loaded:
+                return
+            if gemini_api_key:
+                with timed_import("google.generativeai"):
+                    import google.generativeai as genai
+                genai.configure(api_key=gemini_api_key)
                 try:
-                    # Fallback to alternative model name
-                    self.model = genai.GenerativeModel('gemini-1.5-pro')
-                except Exception as e2:
-                    logger.error(f"Error with fallback model: {e2}")
+                    # Updated model name for current API
+                    self._model = genai.GenerativeModel('gemini-1.5-flash')
+                except Exception as e:
+                    logger.error(f"Error initializing Gemini: {e}")
+                    try:
+                        # Fallback to alternative model name
+                        self._model = genai.GenerativeModel('gemini-1.5-pro')
+                    except Exception as e2:
+                        logger.error(f"Error with fallback model: {e2}")
+            self._model_loaded = True
+    
+    async def ensure_model(self):
+        """Build the model in a worker thread so the SDK import never blocks the event loop"""
+        if not self._model_loaded:
+            await asyncio.to_thread(self._build_model)
+        return self._model
     
-    async def analyze_market_pulse(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
-        """Analyze market data and return pulse with explanation"""
+    async def warm_up(self):
+        started = time.perf_counter()
+        try:
+            await self.ensure_model()
+        except Exception as e:
+            logger.error(f"LLM warm-up failed: {e}")
+        STARTUP_TIMINGS["llm_warmup_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    async def get_analysis(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
+        """Return the cached analysis for a ticker, running the LLM only when it has expired"""
+        entry = await self.cache.get_entry(ticker)
+        if entry is not None:
+            if entry.stale:
+                refresher.schedule(f"analysis:{ticker}", lambda: self.refresh(ticker, momentum_data, news_data))
+            return entry.value
+        return await self.refresh(ticker, momentum_data, news_data)
+    
+    async def refresh(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
+        """Re-run the analysis for a ticker and update the cache"""
+        return await self.flight.do(ticker, lambda: self._load_analysis(ticker, momentum_data, news_data))
+    
+    async def stream_analysis(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> AsyncIterator[Dict]:
+        """Yield {"delta": text} chunks of the explanation as the LLM writes it, then {"final": analysis}
+        
+        The streamed call runs under the same single-flight and cross-replica lock as get_analysis, so concurrent
+        streams and plain requests for a ticker share one LLM call (joiners get the whole analysis at the end)
+        """
+        await self.ensure_model()
+        entry = await self.cache.get_entry(ticker)
+        if (entry is not None or fixtures.replaying or not hasattr(self.model, "generate_content_async")
+                or self.flight.in_flight(ticker)):
+            # Cached, replayed, rule-based, sync-only or already running: nothing to stream, it arrives whole
+            yield {"final": await self.get_analysis(ticker, momentum_data, news_data)}
+            return
+        
+        deltas: asyncio.Queue = asyncio.Queue()
+        load = asyncio.ensure_future(
+            self.flight.do(ticker, lambda: self._load_analysis(ticker, momentum_data, news_data, deltas.put_nowait))
+        )
+        try:
+            while not load.done():
+                next_delta = asyncio.ensure_future(deltas.get())
+                await asyncio.wait({next_delta, load}, return_when=asyncio.FIRST_COMPLETED)
+                if next_delta.done():
+                    yield {"delta": next_delta.result()}
+                else:
+                    next_delta.cancel()
+            while not deltas.empty():
+                yield {"delta": deltas.get_nowait()}
+        finally:
+            # A client that disconnects leaves the shared load running; it still fills the cache
+            load.add_done_callback(lambda task: task.cancelled() or task.exception())
+        yield {"final": load.result()}
+    
+    async def _analyze_streaming(
+        self, ticker: str, momentum_data: Dict, news_data: List[Dict], on_delta: Callable[[str], None]
+    ) -> Dict:
+        """One streamed LLM call, handing explanation text to on_delta as it arrives; rule-based on error"""
+        text = ""
+        explanation_at = None
+        try:
+            with STAGE_SECONDS.time(stage="prompt_build", provider="gemini"):
+                prompt = self._create_analysis_prompt(ticker, momentum_data, news_data)
+            async for chunk in self._stream_generate(prompt):
+                text += chunk
+                if explanation_at is None:
+                    marker = self.EXPLANATION_MARKER.search(text)
+                    if marker is None:
+                        continue
+                    explanation_at = marker.end()
+                if len(text) > explanation_at:
+                    on_delta(text[explanation_at:])
+                    explanation_at = len(text)
+            return dict(self._parse_llm_response(text), source="gemini")
+        except Exception as e:
+            logger.error(f"Error streaming LLM analysis for {ticker}: {e}")
+            return self._get_fallback_analysis(ticker, momentum_data, news_data)
+    
+    async def _stream_generate(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text chunks from the model's streaming API under the call gate, deadline and breaker"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("gemini", "circuit open, skipping call")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.gate.timeout
+        self.gate.calls += 1
+        verdict = None
+        try:
+            async with self.gate.slot():
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(prompt, stream=True), self.gate.timeout
+                )
+                chunks = response.__aiter__()
+                started, text = time.perf_counter(), ""
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    text += chunk.text
+                    yield chunk.text
+                if fixtures.recording:
+                    await fixtures.record("gemini", FixtureStore.prompt_key(prompt), text, time.perf_counter() - started)
+            verdict = False
+        except asyncio.TimeoutError:
+            self.gate.timeouts += 1
+            verdict = True
+            raise
+        except Exception:
+            verdict = True
+            raise
+        finally:
+            # A consumer that stops reading early (GeneratorExit) leaves no verdict
+            self.breaker.settle(verdict)
+    
+    async def _load_analysis(
+        self, ticker: str, momentum_data: Dict, news_data: List[Dict], on_delta: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        # With a shared backend, only one replica runs the LLM for a ticker; the others wait for its result
+        if not await self.cache.acquire(ticker, self.lock_ttl):
+            analysis = await self._wait_for_analysis(ticker)
+            if analysis is not None:
+                return analysis
+        try:
+            analysis = await self.analyze_market_pulse(ticker, momentum_data, news_data, on_delta)
+            await self.cache.set(ticker, analysis, self._cache_ttl(analysis))
+        finally:
+            await self.cache.release(ticker)
+        return analysis
+    
+    def _cache_ttl(self, analysis: Dict) -> Optional[float]:
+        """Short TTL for rules standing in for a configured LLM; the layer's TTL otherwise"""
+        if analysis.get("source") == "rules" and (self._model is not None or fixtures.replaying):
+            return self.fallback_ttl
+        return None
+    
+    async def _wait_for_analysis(self, ticker: str) -> Optional[Dict]:
+        """Poll the shared cache while another worker holds the analysis lock"""
+        deadline = time.monotonic() + self.lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+            analysis = await self.cache.get(ticker)
+            if analysis is not None:
+                return analysis
+        return None
+    
+    async def analyze_market_pulse(
+        self, ticker: str, momentum_data: Dict, news_data: List[Dict], on_delta: Optional[Callable[[str], None]] = None
+    ) -> Dict:
+        """Analyze market data and return pulse with explanation; with on_delta, the explanation is streamed to it"""
         
-        if not self.model:
+        if not await self.ensure_model() and not fixtures.replaying:
             return self._get_fallback_analysis(ticker, momentum_data, news_data)
         
+        # Unchanged inputs reuse the earlier LLM answer, even across restarts
+        fingerprint = LLMResultMemo.fingerprint(ticker, momentum_data, news_data)
+        memoized = await self.memo.get(fingerprint)
+        if memoized is not None:
+            return memoized
+        
+        if on_delta is not None:
+            analysis = await self._analyze_streaming(ticker, momentum_data, news_data, on_delta)
+        elif self.batcher.max_batch > 1:
+            # Concurrent analyses are micro-batched into one combined LLM call
+            analysis = await self.batcher.submit(ticker, momentum_data, news_data)
+        else:
+            analysis = await self._analyze_single(ticker, momentum_data, news_data)
+        
+        if analysis.get("source") == "gemini":
+            await self.memo.put(fingerprint, analysis)
+        return analysis
+    
+    async def _analyze_single(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
+        """One LLM call for one ticker, falling back to the rule-based analysis on error"""
         try:
             # Create prompt for LLM
-            prompt = self._create_analysis_prompt(ticker, momentum_data, news_data)
+            with STAGE_SECONDS.time(stage="prompt_build", provider="gemini"):
+                prompt = self._create_analysis_prompt(ticker, momentum_data, news_data)
             
             # Generate response
-            response = await asyncio.to_thread(self.model.generate_content, prompt)
+            response_text = await self._generate(prompt)
             
             # Parse response
-            return self._parse_llm_response(response.text)
+            analysis = self._parse_llm_response(response_text)
+            analysis["source"] = "gemini"
+            return analysis
             
         except Exception as e:
             logger.error(f"Error calling LLM: {e}")
             return self._get_fallback_analysis(ticker, momentum_data, news_data)
     
+    async def summarize_sector(self, sector: str, stats: Dict) -> Dict:
+        """One LLM call summarizing a sector from its aggregate statistics, memoized like ticker analyses"""
+        if not await self.ensure_model() and not fixtures.replaying:
+            return self._get_sector_fallback(sector, stats)
+        
+        fingerprint = LLMResultMemo.sector_fingerprint(sector, stats)
+        memoized = await self.memo.get(fingerprint)
+        if memoized is not None:
+            return memoized
+        
+        try:
+            with STAGE_SECONDS.time(stage="prompt_build", provider="gemini"):
+                prompt = self._create_sector_prompt(sector, stats)
+            analysis = dict(self._parse_llm_response(await self._generate(prompt)), source="gemini")
+        except Exception as e:
+            logger.error(f"Error calling LLM for sector {sector}: {e}")
+            return self._get_sector_fallback(sector, stats)
+        
+        await self.memo.put(fingerprint, analysis)
+        return analysis
+    
+    async def _generate(self, prompt: str) -> str:
+        """Send one prompt to the model and return the response text; fails fast while Gemini's circuit is open"""
+        return await self.breaker.call(lambda: self.gate.call(lambda: self._call_model(prompt)), lambda e: True)
+    
+    async def _call_model(self, prompt: str) -> str:
+        if fixtures.replaying:
+            return await fixtures.replay("gemini", FixtureStore.prompt_key(prompt))
+        
+        started = time.perf_counter()
+        if hasattr(self.model, "generate_content_async"):
+            response = await self.model.generate_content_async(prompt)
+        else:
+            response = await self.gate.run_blocking(self.model.generate_content, prompt)
+        if fixtures.recording:
+            await fixtures.record("gemini", FixtureStore.prompt_key(prompt), response.text, time.perf_counter() - started)
+        return response.text
+    
     def _create_analysis_prompt(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> str:
         """Create enhanced, contextual prompt for LLM analysis"""
         
+        # Get company context (basic company info based on ticker)
+        company_context = self._get_company_context(ticker)
+        ticker_sections = self._create_ticker_sections(ticker, momentum_data, news_data)
+        
+        prompt = f"""
+You are a senior financial analyst providing market sentiment analysis for {ticker} ({company_context['name']}).
+
+{ticker_sections}
+
+MARKET CONTEXT:
+Consider broader market conditions, sector performance, and company-specific factors.
+
+Provide your analysis in this EXACT format:
+
+PULSE: [bullish/neutral/bearish]
+EXPLANATION: [Provide a nuanced, 2-3 sentence analysis that feels conversational and insightful. Reference specific patterns, news themes, and market context. Avoid generic statements.]
+
+{self.PROMPT_GUIDELINES}
+"""
+        return prompt
+    
+    PROMPT_GUIDELINES = """Guidelines:
+- Be specific about WHY you reached this conclusion
+- Mention concrete numbers and patterns you observed
+- Consider both technical momentum AND fundamental news
+- Sound like an experienced analyst, not a robot
+- Make it unique to this specific ticker and situation"""
+    
+    def _create_ticker_sections(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> str:
+        """Technical, fundamental and news sections for one ticker, shared by single and batched prompts"""
+        
         returns_str = ", ".join([f"{r:+.1f}%" for r in momentum_data["returns"]])
         score = momentum_data["score"]
         
         # Analyze return patterns for more context
-        positive_days = sum(1 for r in momentum_data["returns"] if r > 0)
-        negative_days = len(momentum_data["returns"]) - positive_days
-        volatility = max(momentum_data["returns"]) - min(momentum_data["returns"])
+        pattern = momentum_engine.summarize(momentum_data["returns"])
+        positive_days = pattern["up_days"]
+        negative_days = pattern["down_days"]
+        volatility = pattern["volatility_range"]
         
         # Extract key themes from news
         news_analysis = []
-        sentiment_keywords = {
-            'positive': ['beat', 'strong', 'growth', 'rise', 'gain', 'up', 'increase', 'launch', 'partnership', 'deal'],
-            'negative': ['miss', 'fall', 'drop', 'decline', 'loss', 'down', 'concern', 'challenge', 'risk'],
-            'neutral': ['report', 'announce', 'update', 'meeting', 'conference', 'quarter']
-        }
-        
-        news_sentiment_score = 0
-        for news in news_data[:5]:
-            title_desc = (news['title'] + ' ' + news.get('description', '')).lower()
-            for word in sentiment_keywords['positive']:
-                if word in title_desc:
-                    news_sentiment_score += 1
-            for word in sentiment_keywords['negative']:
-                if word in title_desc:
-                    news_sentiment_score -= 1
+        news_sentiment_score = sentiment_scorer.score_headlines(news_data[:5])
         
         # Create detailed news summary
         for i, news in enumerate(news_data[:3], 1):
@@ -386,13 +2836,9 @@ class LLMService:
         
         news_text = "\n".join(news_analysis)
         
-        # Get company context (basic company info based on ticker)
         company_context = self._get_company_context(ticker)
         
-        prompt = f"""
-You are a senior financial analyst providing market sentiment analysis for {ticker} ({company_context['name']}).
-
-TECHNICAL ANALYSIS:
+        return f"""TECHNICAL ANALYSIS:
 - Daily returns (last 4 days): {returns_str}
 - Average momentum: {score:+.2f}%
 - Trading pattern: {positive_days} up days, {negative_days} down days
@@ -405,66 +2851,93 @@ FUNDAMENTAL CONTEXT:
 - News sentiment score: {news_sentiment_score:+d} (positive/negative themes)
 
 RECENT NEWS ANALYSIS:
-{news_text}
+{news_text}"""
+    
+    def _create_batch_prompt(self, requests: List[tuple]) -> str:
+        """Combine several (ticker, momentum_data, news_data) requests into one prompt with per-ticker sections"""
+        sections = []
+        for ticker, momentum_data, news_data in requests:
+            company_context = self._get_company_context(ticker)
+            sections.append(
+                f"=== {ticker} ({company_context['name']}) ===\n"
+                f"{self._create_ticker_sections(ticker, momentum_data, news_data)}"
+            )
+        tickers = ", ".join(ticker for ticker, _, _ in requests)
+        answer_format = "\n\n".join(
+            f"=== {ticker} ===\nPULSE: [bullish/neutral/bearish]\nEXPLANATION: [2-3 sentence analysis]"
+            for ticker, _, _ in requests
+        )
+        joined_sections = "\n\n".join(sections)
+        
+        return f"""
+You are a senior financial analyst providing market sentiment analysis for {len(requests)} stocks: {tickers}.
+Analyze each stock independently using only the data in its own section.
+
+{joined_sections}
 
 MARKET CONTEXT:
 Consider broader market conditions, sector performance, and company-specific factors.
 
-Provide your analysis in this EXACT format:
+Provide your analysis for EVERY ticker, in this EXACT format and order, with a header line per ticker:
+
+{answer_format}
+
+For each EXPLANATION, provide a nuanced, conversational analysis that references specific patterns, news themes, and market context.
+
+{self.PROMPT_GUIDELINES}
+"""
+    
+    def _create_sector_prompt(self, sector: str, stats: Dict) -> str:
+        """Prompt for a sector summary, built from aggregates rather than per-member sections"""
+        
+        def describe(members: List[Dict]) -> str:
+            return ", ".join(
+                f"{m['ticker']} ({m['name']}) {m['score']:+.2f}%" + (f" [{m['pulse']}]" if m.get("pulse") else "")
+                for m in members
+            )
+        
+        pulse_counts = ", ".join(f"{count} {pulse}" for pulse, count in stats["pulse_counts"].items())
+        
+        return f"""
+You are a senior financial analyst summarizing the {sector} sector from statistics over {stats['members']} member stocks.
+
+SECTOR MOMENTUM:
+- Average momentum: {stats['avg_score']:+.2f}% (median {stats['median_score']:+.2f}%)
+- Breadth: {stats['advancers']} advancing, {stats['decliners']} declining
+- Average volatility range: {stats['avg_volatility_range']:.1f}%
+
+SECTOR NEWS AND ANALYST VIEW:
+- Combined news sentiment score: {stats['news_sentiment']:+d} (positive/negative themes across members)
+- Existing per-stock pulses: {pulse_counts}
+
+LEADERS: {describe(stats['leaders']) or 'none'}
+LAGGARDS: {describe(stats['laggards']) or 'none'}
+
+Provide your analysis of the sector as a whole in this EXACT format:
 
 PULSE: [bullish/neutral/bearish]
-EXPLANATION: [Provide a nuanced, 2-3 sentence analysis that feels conversational and insightful. Reference specific patterns, news themes, and market context. Avoid generic statements.]
+EXPLANATION: [2-3 sentence sector view. Reference breadth, dispersion between leaders and laggards, and news themes.]
 
-Guidelines:
-- Be specific about WHY you reached this conclusion
-- Mention concrete numbers and patterns you observed
-- Consider both technical momentum AND fundamental news
-- Sound like an experienced analyst, not a robot
-- Make it unique to this specific ticker and situation
+{self.PROMPT_GUIDELINES}
 """
-        return prompt
     
     def _get_company_context(self, ticker: str) -> Dict[str, str]:
         """Get basic company context for better LLM analysis"""
-        # This could be expanded with a real company database
-        company_db = {
-            'AAPL': {'name': 'Apple Inc.', 'sector': 'Technology', 'size': 'Large Cap'},
-            'MSFT': {'name': 'Microsoft Corporation', 'sector': 'Technology', 'size': 'Large Cap'},
-            'GOOGL': {'name': 'Alphabet Inc.', 'sector': 'Technology', 'size': 'Large Cap'},
-            'NVDA': {'name': 'NVIDIA Corporation', 'sector': 'Semiconductors', 'size': 'Large Cap'},
-            'TSLA': {'name': 'Tesla Inc.', 'sector': 'Automotive/Energy', 'size': 'Large Cap'},
-            'AMZN': {'name': 'Amazon.com Inc.', 'sector': 'E-commerce/Cloud', 'size': 'Large Cap'},
-            'META': {'name': 'Meta Platforms Inc.', 'sector': 'Social Media', 'size': 'Large Cap'},
-            'NFLX': {'name': 'Netflix Inc.', 'sector': 'Streaming/Media', 'size': 'Large Cap'},
-            'AMD': {'name': 'Advanced Micro Devices', 'sector': 'Semiconductors', 'size': 'Large Cap'},
-            'BABA': {'name': 'Alibaba Group', 'sector': 'E-commerce', 'size': 'Large Cap'},
-        }
-        
-        return company_db.get(ticker, {
-            'name': f'{ticker} Corporation',
-            'sector': 'General Market',
-            'size': 'Mid Cap'
-        })
+        return symbol_index.company_context(ticker)
     
     def _parse_llm_response(self, response_text: str) -> Dict:
         """Parse LLM response to extract pulse and explanation"""
         try:
-            lines = response_text.strip().split('\n')
-            pulse = "neutral"
-            explanation = "Unable to determine market pulse from available data."
+            parsed = self._parse_llm_section(response_text)
+            pulse = parsed["pulse"] if parsed else "neutral"
+            explanation = parsed["explanation"] if parsed else "Unable to determine market pulse from available data."
             
-            for line in lines:
-                if line.startswith("PULSE:"):
-                    pulse_text = line.replace("PULSE:", "").strip().lower()
-                    if "bullish" in pulse_text:
-                        pulse = "bullish"
-                    elif "bearish" in pulse_text:
-                        pulse = "bearish"
-                    else:
-                        pulse = "neutral"
-                
-                elif line.startswith("EXPLANATION:"):
-                    explanation = line.replace("EXPLANATION:", "").strip()
+            # Keep a pulse that was given without an explanation
+            if not parsed:
+                for line in response_text.strip().split('\n'):
+                    label, _, value = self._strip_markup(line).partition(":")
+                    if label.upper() == "PULSE":
+                        pulse = self._normalize_pulse(value)
             
             return {"pulse": pulse, "explanation": explanation}
             
@@ -472,53 +2945,81 @@ Guidelines:
             logger.error(f"Error parsing LLM response: {e}")
             return {"pulse": "neutral", "explanation": "Analysis unavailable due to parsing error."}
     
+    @staticmethod
+    def _strip_markup(line: str) -> str:
+        """Drop markdown decoration models like to add around labels (**PULSE:**, - PULSE:, ## PULSE:)"""
+        return line.strip().lstrip("#*->• ").replace("**", "").strip()
+    
+    @staticmethod
+    def _normalize_pulse(text: str) -> str:
+        text = text.strip().lower()
+        if "bullish" in text:
+            return "bullish"
+        elif "bearish" in text:
+            return "bearish"
+        return "neutral"
+    
+    def _parse_llm_section(self, text: str) -> Optional[Dict]:
+        """Strictly parse one PULSE/EXPLANATION block; None unless both fields are present"""
+        pulse = None
+        explanation_lines: List[str] = []
+        in_explanation = False
+        for raw_line in text.strip().split('\n'):
+            line = self._strip_markup(raw_line)
+            label, _, value = line.partition(":")
+            if label.upper() == "PULSE":
+                pulse = self._normalize_pulse(value)
+                in_explanation = False
+            elif label.upper() == "EXPLANATION":
+                explanation_lines = [value.strip()] if value.strip() else []
+                in_explanation = True
+            elif in_explanation and line:
+                # Explanations sometimes wrap onto following lines
+                explanation_lines.append(line)
+        
+        explanation = " ".join(explanation_lines).strip()
+        if pulse is None or not explanation:
+            return None
+        return {"pulse": pulse, "explanation": explanation}
+    
+    def _parse_batch_llm_response(self, response_text: str, tickers: List[str]) -> Dict[str, Optional[Dict]]:
+        """Split a batched response on its '=== TICKER ===' headers and parse each section independently"""
+        results: Dict[str, Optional[Dict]] = {ticker: None for ticker in tickers}
+        header = re.compile(r"^[\s#*]*=+\s*([A-Za-z0-9.\-]+)[^=\n]*=+[\s*]*$", re.MULTILINE)
+        matches = list(header.finditer(response_text))
+        for i, match in enumerate(matches):
+            ticker = match.group(1).upper()
+            if ticker not in results or results[ticker] is not None:
+                continue
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(response_text)
+            results[ticker] = self._parse_llm_section(response_text[match.end():end])
+        return results
+    
     def _get_fallback_analysis(self, ticker: str, momentum_data: Dict, news_data: List[Dict]) -> Dict:
         """Provide enhanced fallback analysis when LLM is unavailable"""
         score = momentum_data["score"]
         returns = momentum_data["returns"]
         
         # Enhanced pattern analysis
-        positive_days = sum(1 for r in returns if r > 0)
-        negative_days = len(returns) - positive_days
-        volatility = max(returns) - min(returns) if returns else 0
+        pattern = momentum_engine.summarize(returns)
+        positive_days = pattern["up_days"]
+        negative_days = pattern["down_days"]
+        volatility = pattern["volatility_range"]
         
         # Analyze news sentiment
-        news_keywords = {
-            'positive': ['beat', 'strong', 'growth', 'rise', 'gain', 'up', 'increase', 'launch', 'partnership', 'deal', 'profit', 'revenue'],
-            'negative': ['miss', 'fall', 'drop', 'decline', 'loss', 'down', 'concern', 'challenge', 'risk', 'cut', 'lower']
-        }
-        
-        news_sentiment = 0
+        matches = sentiment_scorer.match_headlines(news_data[:3])
+        news_sentiment = sum(match["score"] for match in matches)
         significant_news = []
-        for news in news_data[:3]:
-            title_desc = (news['title'] + ' ' + news.get('description', '')).lower()
-            for word in news_keywords['positive']:
-                if word in title_desc:
-                    news_sentiment += 1
-                    if word in ['beat', 'strong', 'growth', 'launch', 'deal']:
-                        significant_news.append(f"positive {word}")
-            for word in news_keywords['negative']:
-                if word in title_desc:
-                    news_sentiment -= 1
-                    if word in ['miss', 'fall', 'decline', 'concern']:
-                        significant_news.append(f"negative {word}")
+        for match in matches:
+            significant_news.extend(
+                f"{'positive' if word in match['positive'] else 'negative'} {word}" for word in match["significant"]
+            )
         
         # Get company context
         company_context = self._get_company_context(ticker)
         
-        # Rule-based pulse determination with more nuance
-        if score > 0.5 and news_sentiment >= 0:
-            pulse = "bullish"
-        elif score < -0.5 and news_sentiment <= 0:
-            pulse = "bearish"
-        elif abs(score) <= 0.5 and abs(news_sentiment) <= 1:
-            pulse = "neutral"
-        elif news_sentiment > 1:  # Strong positive news can override weak negative momentum
-            pulse = "bullish"
-        elif news_sentiment < -1:  # Strong negative news can override weak positive momentum
-            pulse = "bearish"
-        else:
-            pulse = "neutral"
+        # Rule-based pulse determination with more nuance (the same rule backtest.py evaluates)
+        pulse = PULSE_LABELS[int(classify_pulse(score, news_sentiment))]
         
         # Generate contextual explanation
         explanations = {
@@ -546,91 +3047,987 @@ Guidelines:
         base_explanation = explanations[pulse][hash(ticker) % len(explanations[pulse])]
         enhanced_explanation = f"{base_explanation} with {vol_desc} volatility and {news_desc} news flow."
         
-        return {"pulse": pulse, "explanation": enhanced_explanation}
+        return {"pulse": pulse, "explanation": enhanced_explanation, "source": "rules"}
+    
+    def _get_sector_fallback(self, sector: str, stats: Dict) -> Dict:
+        """Rule-based sector pulse: average momentum confirmed by breadth, with news breaking ties"""
+        score = stats["avg_score"]
+        breadth = stats["advancers"] - stats["decliners"]
+        news_sentiment = stats["news_sentiment"]
+        
+        if score > 0.5 and breadth >= 0:
+            pulse = "bullish"
+        elif score < -0.5 and breadth <= 0:
+            pulse = "bearish"
+        elif news_sentiment > stats["members"]:
+            pulse = "bullish"
+        elif news_sentiment < -stats["members"]:
+            pulse = "bearish"
+        else:
+            pulse = "neutral"
+        
+        movers = [
+            f"{label} " + ", ".join(f"{m['ticker']} {m['score']:+.1f}%" for m in stats[key])
+            for label, key in (("leaders", "leaders"), ("laggards", "laggards")) if stats[key]
+        ]
+        news_desc = "supportive" if news_sentiment > 0 else "concerning" if news_sentiment < 0 else "mixed"
+        explanation = (
+            f"{sector} has {stats['advancers']} of {stats['members']} members advancing with {score:+.1f}% "
+            f"average momentum; {', '.join(movers)}, with {news_desc} news flow."
+        )
+        return {"pulse": pulse, "explanation": explanation, "source": "rules"}
 
 # Initialize services
-stock_service = StockDataService()
-news_service = NewsService()
+price_history = PriceHistoryStore(os.getenv("PRICE_STORE_DIR") or os.path.join(DATA_DIR, "prices"))
+stock_service = StockDataService(http_client, price_cache, price_history)
+news_service = NewsService(http_client, news_cache)
+momentum_engine = MomentumEngine()
 momentum_calculator = MomentumCalculator()
-llm_service = LLMService()
+sentiment_scorer = SentimentScorer.from_env()
+symbol_index = SymbolIndex(
+    os.getenv("SYMBOL_UNIVERSE_PATH") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "symbols.csv")
+)
+llm_memo = LLMResultMemo(
+    os.getenv("LLM_MEMO_PATH") or os.path.join(DATA_DIR, "llm_memo.db"),
+    int(os.getenv("LLM_MEMO_MAX_ENTRIES", "5000"))
+)
+llm_service = LLMService(analysis_cache, llm_memo)
 
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "MarketPulse API is running", "version": "1.0.0"}
 
-@app.get("/api/v1/market-pulse", response_model=MarketPulseResponse)
-async def get_market_pulse(ticker: str = Query(..., description="Stock ticker symbol (e.g., AAPL, MSFT)")):
-    """
-    Get market pulse analysis for a stock ticker
+pulse_flight = SingleFlight("market_pulse")
+
+class EncodedResponse:
+    """A pulse serialized once: JSON bytes, compressed variants, a strong ETag and an expiry"""
     
-    Returns momentum analysis, news sentiment, and AI-powered pulse prediction
-    """
+    __slots__ = ("pulse", "body", "encoded", "etag", "expires_at")
     
-    # Check cache first
-    cache_key = f"pulse_{ticker.upper()}"
-    if cache_key in cache:
-        logger.info(f"Returning cached data for {ticker}")
-        return cache[cache_key]
+    def __init__(self, pulse: MarketPulseResponse, body: bytes, encoded: Dict[str, bytes], etag: str, expires_at: float):
+        self.pulse = pulse
+        self.body = body
+        self.encoded = encoded
+        self.etag = etag
+        self.expires_at = expires_at
     
-    try:
-        # Validate ticker format
-        ticker = ticker.upper().strip()
-        if not ticker or len(ticker) > 10:
-            raise HTTPException(status_code=400, detail="Invalid ticker format")
-        
-        logger.info(f"Fetching market pulse for {ticker}")
-        
-        # Fetch data concurrently
-        stock_task = stock_service.get_stock_data(ticker)
-        news_task = news_service.get_news(ticker)
+    @property
+    def max_age(self) -> int:
+        return max(0, int(self.expires_at - time.time()))
+
+class ResponseCache:
+    """Per-process cache of final pulse responses, so hits skip validation, serialization and compression"""
+    
+    def __init__(self, maxsize: int, min_compress_size: int = 512):
+        self.min_compress_size = min_compress_size
+        self.compressors: Dict[str, Callable[[bytes], bytes]] = {"gzip": lambda body: gzip.compress(body, 6)}
+        try:
+            import brotli
+            self.compressors["br"] = lambda body: brotli.compress(body, quality=5)
+        except ImportError:
+            pass  # brotli is optional; gzip covers every browser
+        self._entries = TLRUCache(maxsize=maxsize, ttu=lambda _key, entry, now: now + entry.max_age)
+        self.not_modified = 0
+    
+    async def freshness(self, ticker: str) -> float:
+        """Seconds until the first of the ticker's cache layers goes stale (0 if any is missing or stale)"""
+        entries = [await layer.peek(ticker) for layer in cache_layers]
+        if any(entry is None or entry.stale for entry in entries):
+            return 0.0
+        return min(entry.expires_at for entry in entries) - time.time()
+    
+    def get(self, ticker: str) -> Optional[EncodedResponse]:
+        entry = self._entries.get(ticker)
+        if entry is not None and entry.max_age <= 0:
+            entry = None
+        CACHE_REQUESTS.inc(layer="response", result="hit" if entry is not None else "miss")
+        return entry
+    
+    async def encode(self, ticker: str, pulse: MarketPulseResponse) -> EncodedResponse:
+        """Serialize and compress a pulse, caching the result for as long as its inputs stay fresh"""
+        # Callers coalesced onto one build get the same pulse object: encode it once
+        cached = self._entries.get(ticker)
+        if cached is not None and cached.pulse is pulse:
+            return cached
+        with STAGE_SECONDS.time(stage="serialization", provider=""):
+            body = pulse.model_dump_json().encode()
+            encoded = {}
+            if len(body) >= self.min_compress_size:
+                encoded = {name: compress(body) for name, compress in self.compressors.items()}
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        # A degraded pulse is served once and never cached: the work it cut short is still filling the layers
+        freshness = 0.0 if pulse.degraded else await self.freshness(ticker)
+        entry = EncodedResponse(pulse, body, encoded, etag, time.time() + freshness)
+        if entry.max_age > 0:
+            self._entries[ticker] = entry
+        return entry
+    
+    def respond(self, request: Request, entry: EncodedResponse) -> Response:
+        """304 when the client already holds this ETag, otherwise the best encoding it accepts"""
+        max_age = entry.max_age
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={max_age}" if max_age > 0 else "no-cache",
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # Weak validators match too: the body is identical byte for byte in every encoding
+            tags = set()
+            for tag in if_none_match.split(","):
+                tag = tag.strip()
+                tags.add(tag[2:] if tag.startswith("W/") else tag)
+            if entry.etag in tags or "*" in tags:
+                self.not_modified += 1
+                return Response(status_code=304, headers=headers)
         
-        stock_data, news_data = await asyncio.gather(stock_task, news_task)
+        accepted = set()
+        for part in request.headers.get("accept-encoding", "").split(","):
+            coding, _, params = part.partition(";")
+            # "gzip;q=0" means the client refuses gzip
+            if not re.fullmatch(r"\s*q\s*=\s*0(\.0{0,3})?\s*", params, re.IGNORECASE):
+                accepted.add(coding.strip().lower())
+        for name in ("br", "gzip"):
+            if name in entry.encoded and name in accepted:
+                headers["Content-Encoding"] = name
+                return Response(content=entry.encoded[name], media_type="application/json", headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "encodings": ["identity"] + list(self.compressors),
+            "not_modified": self.not_modified
+        }
+
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_SIZE", "1000")))
+
+class RequestDeadline:
+    """A request's latency budget and the pulse stages that overran their share of it"""
+    
+    DATA_STAGES = ("prices", "news")
+    
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expired: List[str] = []
+    
+    @classmethod
+    def from_request(cls, request: Request, deadline_ms: Optional[float] = None) -> "RequestDeadline":
+        """Budget from ?deadline_ms=, else the X-Request-Deadline-Ms header, else REQUEST_DEADLINE_MS"""
+        if deadline_ms is None:
+            header = request.headers.get("x-request-deadline-ms")
+            try:
+                deadline_ms = float(header) if header else REQUEST_DEADLINE_MS
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid X-Request-Deadline-Ms header")
+        if not deadline_ms > 0:
+            raise HTTPException(status_code=400, detail="Request deadline must be a positive number of milliseconds")
+        return cls(min(deadline_ms, REQUEST_DEADLINE_MAX_MS) / 1000)
+    
+    def time_left(self, stage: str) -> float:
+        """Seconds the stage may still take: data stages end at their share, the LLM at the budget minus the reserve"""
+        if stage in self.DATA_STAGES:
+            ends_at = self.budget * DEADLINE_DATA_SHARE
+        else:
+            ends_at = self.budget - DEADLINE_RESERVE_MS / 1000
+        return max(0.0, ends_at - (time.monotonic() - self.started))
+    
+    def expire(self, stage: str):
+        self.expired.append(stage)
+        DEADLINE_EXCEEDED.inc(stage=stage)
+        logger.warning(f"{stage} stage overran the {self.budget * 1000:.0f}ms request deadline")
+    
+    async def wait_for_pulse(self, ticker: str, shared: "asyncio.Future[MarketPulseResponse]") -> MarketPulseResponse:
+        """Wait on a shared pulse build up to each stage's cut-off, degrading only this caller's pulse
         
-        # Calculate momentum score
+        The build itself is never cancelled: it keeps filling the cache layers for the next request
+        """
+        done, _ = await asyncio.wait({shared}, timeout=self.time_left("prices"))
+        if not done:
+            # Layers already written (fresh or stale) are as good as what the build will use
+            price_entry, news_entry = await stock_service.cache.peek(ticker), await news_service.cache.peek(ticker)
+            stock_data = price_entry.value if price_entry is not None else None
+            news_data = news_entry.value if news_entry is not None else None
+            if stock_data is None:
+                self.expire("prices")
+            if news_data is None:
+                self.expire("news")
+            if not self.expired:
+                done, _ = await asyncio.wait({shared}, timeout=self.time_left("analysis"))
+                if not done:
+                    self.expire("analysis")
+            if not done:
+                return await degraded_pulse(ticker, stock_data, news_data, self.expired)
+        return shared.result()
+
+async def fetch_pulse_inputs(ticker: str) -> tuple:
+    """Fetch prices and news concurrently and score momentum; returns (stock_data, news_data, momentum_data)"""
+    stock_data, news_data = await asyncio.gather(stock_service.get_stock_data(ticker), news_service.get_news(ticker))
+    
+    # Calculate momentum score
+    returns = stock_data["returns"]
+    momentum_score = momentum_calculator.calculate_momentum_score(returns)
+    return stock_data, news_data, {"returns": returns, "score": momentum_score}
+
+def assemble_pulse(
+    ticker: str, stock_data: Dict, news_data: List[Dict], momentum_data: Dict, analysis: Dict,
+    degraded_stages: Optional[List[str]] = None
+) -> MarketPulseResponse:
+    return MarketPulseResponse(
+        ticker=ticker,
+        as_of=datetime.now().strftime("%Y-%m-%d"),
+        momentum=MomentumData(returns=momentum_data["returns"], score=momentum_data["score"], windows=stock_data.get("windows")),
+        news=[NewsItem(**item) for item in news_data],
+        pulse=analysis["pulse"],
+        llm_explanation=analysis["explanation"],
+        sources={
+            "prices": stock_data.get("source", "unknown"),
+            "news": news_data[0].get("source", "unknown") if news_data else "none",
+            "analysis": analysis.get("source", "unknown")
+        },
+        degraded=bool(degraded_stages),
+        degraded_stages=degraded_stages or []
+    )
+
+async def build_market_pulse(ticker: str) -> MarketPulseResponse:
+    """Assemble a pulse from the price, news and analysis cache layers, filling whichever have expired"""
+    logger.info(f"Fetching market pulse for {ticker}")
+    
+    # Fetch data concurrently
+    stock_data, news_data, momentum_data = await fetch_pulse_inputs(ticker)
+    
+    # Get LLM analysis
+    analysis = await llm_service.get_analysis(ticker, momentum_data, news_data)
+    
+    # Build response
+    response = assemble_pulse(ticker, stock_data, news_data, momentum_data, analysis)
+    
+    logger.info(f"Successfully generated market pulse for {ticker}")
+    return response
+
+async def degraded_pulse(
+    ticker: str, stock_data: Optional[Dict], news_data: Optional[List[Dict]], expired: List[str]
+) -> MarketPulseResponse:
+    """A pulse from whatever is at hand when stages overran the deadline: last-known (or mock) prices, last-known
+    (or mock, or no) news and the rule-based analysis, which is never cached"""
+    if stock_data is None:
+        stock_data = await stock_service.fallback(ticker)
+    if news_data is None:
+        try:
+            news_data = await news_service.fallback(ticker)
+        except ProviderError:
+            news_data = []
+    returns = stock_data["returns"]
+    momentum_data = {"returns": returns, "score": momentum_calculator.calculate_momentum_score(returns)}
+    analysis = llm_service._get_fallback_analysis(ticker, momentum_data, news_data)
+    return assemble_pulse(ticker, stock_data, news_data, momentum_data, analysis, expired)
+
+def normalize_ticker(ticker: str) -> str:
+    """Normalize a ticker symbol, raising a 400 if it is malformed"""
+    ticker = ticker.upper().strip()
+    if not ticker or len(ticker) > 10:
+        raise HTTPException(status_code=400, detail="Invalid ticker format")
+    return ticker
+
+async def refresh_hot_ticker(ticker: str, lead_time: float) -> int:
+    """Refresh the layers of a ticker that expire within lead_time; returns the upstream calls made"""
+    horizon = time.time() + lead_time
+    entries = [await layer.peek(ticker) for layer in cache_layers]
+    if any(entry is None for entry in entries):
+        # Not cached (or already evicted): let the next request decide whether it is still wanted
+        return 0
+    price_entry, news_entry, analysis_entry = entries
+    
+    calls = 0
+    stock_data, news_data = price_entry.value, news_entry.value
+    if price_entry.expires_at <= horizon:
+        stock_data = await stock_service.refresh(ticker)
+        calls += 1
+    if news_entry.expires_at <= horizon:
+        news_data = await news_service.refresh(ticker)
+        calls += 1
+    if analysis_entry.expires_at <= horizon:
         returns = stock_data["returns"]
-        momentum_score = momentum_calculator.calculate_momentum_score(returns)
+        momentum_data = {"returns": returns, "score": momentum_calculator.calculate_momentum_score(returns)}
+        await llm_service.refresh(ticker, momentum_data, news_data)
+        calls += 1
+    return calls
+
+hot_tickers = HotTickerScheduler(refresh_hot_ticker)
+
+class PulseSubscriber:
+    """One WebSocket connection: its subscriptions and a latest-wins outbox drained by a sender task"""
+    
+    def __init__(self, websocket: WebSocket, send_timeout: float, max_pending_control: int):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.max_pending_control = max_pending_control
+        self.tickers: set = set()
+        self.superseded = 0
+        self.dropped = 0
+        # Keyed by ticker, so a slow client only ever holds the newest pulse per ticker (bounded by its subscriptions);
+        # control replies get unique "#seq" keys and are capped separately
+        self._outbox: Dict[str, str] = {}
+        self._ready = asyncio.Event()
+        self._control_seq = 0
+        self._pending_control = 0
+        self.tasks: set = set()
+    
+    def offer(self, key: str, message: str):
+        if key in self._outbox:
+            self.superseded += 1
+            del self._outbox[key]
+        self._outbox[key] = message
+        self._ready.set()
+    
+    def send_control(self, payload: Dict):
+        if self._pending_control >= self.max_pending_control:
+            # A client sending requests faster than it reads replies loses the oldest unsent ones
+            oldest = next(key for key in self._outbox if key.startswith("#"))
+            del self._outbox[oldest]
+            self._pending_control -= 1
+            self.dropped += 1
+        self._control_seq += 1
+        self._pending_control += 1
+        self.offer(f"#{self._control_seq}", json.dumps(payload))
+    
+    async def send_loop(self):
+        """Write queued messages in order; a client that can't keep up within send_timeout, or whose socket fails,
+        is disconnected"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._outbox:
+                key = next(iter(self._outbox))
+                message = self._outbox.pop(key)
+                if key.startswith("#"):
+                    self._pending_control -= 1
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(message), self.send_timeout)
+                except asyncio.TimeoutError:
+                    logger.warning("Closing WebSocket that stopped reading")
+                    await self._close(1013)
+                    return
+                except Exception as e:
+                    logger.warning(f"Closing WebSocket after a failed send: {e}")
+                    await self._close(1011)
+                    return
+    
+    async def _close(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # already closed by the client or the server
+
+class PulseBroadcaster:
+    """Pushes a ticker's pulse to every subscriber when its data is refreshed, computed and serialized once"""
+    
+    def __init__(self):
+        self.max_subscriptions = int(os.getenv("WS_MAX_SUBSCRIPTIONS", "50"))
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+        self.debounce = float(os.getenv("WS_PUBLISH_DEBOUNCE_MS", "250")) / 1000
+        self.max_pending_control = int(os.getenv("WS_MAX_PENDING_CONTROL", "100"))
+        self.poll_interval = float(os.getenv("WS_SHARED_POLL_SECONDS", "5"))
+        self._versions: Dict[str, tuple] = {}
+        self._subscribers: Dict[str, set] = {}
+        self._connections: set = set()
+        self._dirty: set = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_body: Dict[str, str] = {}
+        self.published = 0
+        self.deliveries = 0
+        self.failed = 0
+    
+    def tickers(self) -> List[str]:
+        return list(self._subscribers)
+    
+    def connect(self, subscriber: PulseSubscriber):
+        self._connections.add(subscriber)
+    
+    def subscribe(self, subscriber: PulseSubscriber, tickers: List[str]):
+        for ticker in tickers:
+            subscriber.tickers.add(ticker)
+            self._subscribers.setdefault(ticker, set()).add(subscriber)
+    
+    def unsubscribe(self, subscriber: PulseSubscriber, tickers: List[str]):
+        for ticker in tickers:
+            subscriber.tickers.discard(ticker)
+            subscribers = self._subscribers.get(ticker)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[ticker]
+                    self._last_body.pop(ticker, None)
+                    self._versions.pop(ticker, None)
+    
+    def disconnect(self, subscriber: PulseSubscriber):
+        self.unsubscribe(subscriber, list(subscriber.tickers))
+        self._connections.discard(subscriber)
+        for task in subscriber.tasks:
+            task.cancel()
+    
+    def notify(self, layer: str, ticker: str):
+        """Cache-layer listener: a subscribed ticker got fresh data"""
+        if ticker in self._subscribers:
+            self._dirty.add(ticker)
+            if self._wakeup is not None:
+                self._wakeup.set()
+    
+    @staticmethod
+    def _message(ticker: str, body: str) -> str:
+        return f'{{"type": "pulse", "ticker": {json.dumps(ticker)}, "data": {body}}}'
+    
+    async def send_current(self, subscriber: PulseSubscriber, ticker: str):
+        """Initial pulse for a new subscription"""
+        try:
+            pulse = await pulse_flight.do(ticker, lambda: build_market_pulse(ticker))
+            body = pulse.model_dump_json()
+            # Filling a cold ticker writes its layers; don't echo that back as a refresh
+            self._last_body.setdefault(ticker, body)
+            subscriber.offer(ticker, self._message(ticker, body))
+        except Exception as e:
+            logger.error(f"Could not build initial pulse for {ticker}: {e}")
+            subscriber.send_control({"type": "error", "ticker": ticker, "detail": str(e)})
+    
+    async def _publish(self, ticker: str):
+        try:
+            pulse = await pulse_flight.do(ticker, lambda: build_market_pulse(ticker))
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Could not publish pulse for {ticker}: {e}")
+            return
+        body = pulse.model_dump_json()
+        # Several layers refreshing together would otherwise push the same pulse repeatedly
+        if self._last_body.get(ticker) == body:
+            return
+        self._last_body[ticker] = body
+        message = self._message(ticker, body)
+        self.published += 1
+        for subscriber in list(self._subscribers.get(ticker, ())):
+            subscriber.offer(ticker, message)
+            self.deliveries += 1
+    
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            await self._wakeup.wait()
+            # Let the other layers of the same refresh land before building the pulse
+            await asyncio.sleep(self.debounce)
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, set()
+            await asyncio.gather(*[self._publish(ticker) for ticker in dirty])
+    
+    async def poll_shared(self):
+        """With a shared cache backend, other workers' refreshes never reach this process's listeners: compare each
+        subscribed ticker's layer write times instead and publish the ones that moved"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for ticker in list(self._subscribers):
+                try:
+                    entries = [await layer.peek(ticker) for layer in cache_layers]
+                except Exception as e:
+                    logger.error(f"Could not poll shared cache for {ticker}: {e}")
+                    continue
+                version = tuple(entry.stored_at if entry is not None else None for entry in entries)
+                previous = self._versions.get(ticker)
+                self._versions[ticker] = version
+                if previous is not None and version != previous and ticker in self._subscribers:
+                    self.notify("shared", ticker)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._connections),
+            "subscribed_tickers": len(self._subscribers),
+            "published": self.published,
+            "deliveries": self.deliveries,
+            "superseded": sum(subscriber.superseded for subscriber in self._connections),
+            "dropped_control": sum(subscriber.dropped for subscriber in self._connections),
+            "failed": self.failed
+        }
+
+broadcaster = PulseBroadcaster()
+for layer in cache_layers:
+    layer.add_listener(broadcaster.notify)
+hot_tickers.pinned_fn = broadcaster.tickers
+
+class SectorPulseService:
+    """Sector pulse from batched member momentum and one summarizing LLM call, updated member by member"""
+    
+    def __init__(self, cache: CacheLayer, max_members: int):
+        self.cache = cache
+        self.max_members = max_members
+        self.flight = SingleFlight("sector")
+        # Sector key -> members whose cache layers were written since the sector result was computed
+        self._dirty: Dict[str, set] = {}
+        self.builds = 0
+        self.incremental_updates = 0
+        self.members_refetched = 0
+    
+    def notify(self, layer: str, ticker: str):
+        """Cache-layer listener: mark the ticker's sector for an incremental update if it is being tracked"""
+        entry = symbol_index.get(ticker)
+        if entry is not None:
+            dirty = self._dirty.get(entry["sector"].lower())
+            if dirty is not None:
+                dirty.add(ticker)
+    
+    async def get_pulse(self, sector: str) -> SectorPulseResponse:
+        key = sector.strip().lower()
+        members = symbol_index.sector_members(key)[:self.max_members]
+        if not members:
+            raise HTTPException(status_code=404, detail=f"Unknown sector: {sector}")
+        entry = await self.cache.get_entry(key)
+        if entry is not None and not self._dirty.get(key) and entry.value["response"]["members"] == members:
+            # Start tracking refreshes even if another worker computed the cached result
+            self._dirty.setdefault(key, set())
+            return SectorPulseResponse(**entry.value["response"])
+        previous = entry.value["rows"] if entry is not None and not entry.stale else None
+        return await self.flight.do(key, lambda: self._build(key, members, previous))
+    
+    async def _build(self, key: str, members: List[str], previous: Optional[Dict[str, Dict]]) -> SectorPulseResponse:
+        dirty = self._dirty.get(key, set())
+        rows = {ticker: previous[ticker] for ticker in members if previous and ticker in previous}
+        stale = [ticker for ticker in members if ticker not in rows or ticker in dirty]
+        if previous is None:
+            self.builds += 1
+        else:
+            self.incremental_updates += 1
+        self.members_refetched += len(stale)
         
-        # Get LLM analysis
-        momentum_data = {"returns": returns, "score": momentum_score}
-        analysis = await llm_service.analyze_market_pulse(ticker, momentum_data, news_data)
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        fetched = await asyncio.gather(*[self._fetch_member(ticker, semaphore) for ticker in stale])
+        fresh = [(ticker, result) for ticker, result in zip(stale, fetched) if result is not None]
+        # Headlines of every refetched member are scored in one pass
+        sentiments = sentiment_scorer.score_batch([news_data[:5] for _, (_, news_data, _) in fresh])
+        for (ticker, (returns, _, pulse)), sentiment in zip(fresh, sentiments):
+            rows[ticker] = {"returns": returns, "sentiment": sentiment, "pulse": pulse}
+        # A member that fails to refetch keeps its previous row, if it had one
+        if not rows:
+            raise ProviderError("sector", f"no member data available for {key}")
         
-        # Build response
-        response = MarketPulseResponse(
-            ticker=ticker,
+        stats = self._aggregate(rows)
+        stats["unavailable"] = len(members) - len(rows)
+        sector = symbol_index.get(members[0])["sector"]
+        summary = await llm_service.summarize_sector(sector, stats)
+        response = SectorPulseResponse(
+            sector=sector,
             as_of=datetime.now().strftime("%Y-%m-%d"),
-            momentum=MomentumData(returns=returns, score=momentum_score),
-            news=[NewsItem(**item) for item in news_data],
-            pulse=analysis["pulse"],
-            llm_explanation=analysis["explanation"]
+            members=members,
+            pulse=summary["pulse"],
+            llm_explanation=summary["explanation"],
+            stats={name: value for name, value in stats.items() if name not in ("leaders", "laggards")},
+            leaders=stats["leaders"],
+            laggards=stats["laggards"],
+            sources={"analysis": summary.get("source", "unknown")}
         )
+        await self.cache.set(key, {"response": response.model_dump(), "rows": rows})
+        # Writes made while the build was fetching are mostly its own cold fills, already included;
+        # dropping them avoids an immediate second pass, and the sector TTL bounds anything missed
+        self._dirty[key] = set()
+        return response
+    
+    async def _fetch_member(self, ticker: str, semaphore: asyncio.Semaphore) -> Optional[tuple]:
+        """(returns, news, cached pulse) for a member from its cache layers; the LLM is never called per member"""
+        try:
+            async with semaphore:
+                stock_data, news_data = await asyncio.gather(
+                    stock_service.get_stock_data(ticker), news_service.get_news(ticker)
+                )
+        except Exception as e:
+            logger.warning(f"Skipping {ticker} in sector pulse: {e}")
+            return None
+        analysis = await analysis_cache.peek(ticker)
+        return stock_data["returns"], news_data, analysis.value["pulse"] if analysis is not None else None
+    
+    @staticmethod
+    def _aggregate(rows: Dict[str, Dict]) -> Dict[str, Any]:
+        """Sector statistics from one vectorized momentum pass over every member's returns"""
+        tickers = sorted(rows)
+        width = max(len(rows[ticker]["returns"]) for ticker in tickers)
+        matrix = np.full((len(tickers), max(width, 1)), np.nan)
+        for i, ticker in enumerate(tickers):
+            returns = rows[ticker]["returns"]
+            if returns:
+                matrix[i, matrix.shape[1] - len(returns):] = returns
+        member_stats = momentum_engine.compute_from_returns(matrix)
+        scores = member_stats["score"]
         
-        # Cache the response
-        cache[cache_key] = response
+        def member(i: int) -> Dict[str, Any]:
+            ticker = tickers[i]
+            return {
+                "ticker": ticker,
+                "name": symbol_index.company_context(ticker)["name"],
+                "score": round(float(scores[i]), 2),
+                "pulse": rows[ticker]["pulse"]
+            }
         
-        logger.info(f"Successfully generated market pulse for {ticker}")
-        return response
+        order = [int(i) for i in np.argsort(-scores, kind="stable")]
+        # Small sectors split their members rather than listing one as both leader and laggard
+        top = min(3, (len(tickers) + 1) // 2)
+        pulses = [rows[ticker]["pulse"] for ticker in tickers]
+        return {
+            "members": len(tickers),
+            "avg_score": round(float(scores.mean()), 2),
+            "median_score": round(float(np.median(scores)), 2),
+            "advancers": int((scores > 0).sum()),
+            "decliners": int((scores < 0).sum()),
+            "avg_volatility_range": round(float(member_stats["volatility_range"].mean()), 2),
+            "news_sentiment": sum(rows[ticker]["sentiment"] for ticker in tickers),
+            "pulse_counts": {pulse: pulses.count(pulse) for pulse in ("bullish", "neutral", "bearish")},
+            "leaders": [member(i) for i in order[:top]],
+            "laggards": [member(i) for i in order[top:][::-1][:3]]
+        }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tracked_sectors": len(self._dirty),
+            "pending_members": sum(len(dirty) for dirty in self._dirty.values()),
+            "builds": self.builds,
+            "incremental_updates": self.incremental_updates,
+            "members_refetched": self.members_refetched,
+            "coalescing": self.flight.stats()
+        }
+
+sector_cache = CacheLayer(
+    "sector", cache_backend, int(os.getenv("SECTOR_CACHE_SIZE", "200")), float(os.getenv("SECTOR_CACHE_TTL", "900"))
+)
+sector_service = SectorPulseService(sector_cache, int(os.getenv("SECTOR_MAX_MEMBERS", "25")))
+for layer in cache_layers:
+    layer.add_listener(sector_service.notify)
+
+async def get_pulse(ticker: str, deadline: Optional[RequestDeadline] = None) -> MarketPulseResponse:
+    """Serve a normalized ticker from the cache layers or from a coalesced computation"""
+    hot_tickers.record(ticker)
+    # Concurrent misses for the same ticker share a single computation; each caller's deadline applies to its own wait
+    shared = asyncio.ensure_future(pulse_flight.do(ticker, lambda: build_market_pulse(ticker)))
+    if deadline is None:
+        return await shared
+    # Mark a failure as retrieved when this caller has already given up on it
+    shared.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return await deadline.wait_for_pulse(ticker, shared)
+
+@app.get("/api/v1/market-pulse", response_model=MarketPulseResponse)
+async def get_market_pulse(
+    request: Request,
+    ticker: str = Query(..., description="Stock ticker symbol (e.g., AAPL, MSFT)"),
+    deadline_ms: Optional[float] = Query(None, description="Latency budget in milliseconds (default REQUEST_DEADLINE_MS)")
+):
+    """
+    Get market pulse analysis for a stock ticker
+    
+    Returns momentum analysis, news sentiment, and AI-powered pulse prediction.
+    Responses carry an ETag (send If-None-Match for a 304) and a Cache-Control max-age matching the cached data.
+    Stages that overrun the deadline (deadline_ms or X-Request-Deadline-Ms) are replaced by fallbacks and the
+    response is marked degraded
+    """
+    
+    # Validate ticker format
+    ticker = normalize_ticker(ticker)
+    deadline = RequestDeadline.from_request(request, deadline_ms)
+    
+    # Pre-serialized, pre-compressed bytes from an earlier request
+    encoded = response_cache.get(ticker)
+    if encoded is not None:
+        hot_tickers.record(ticker)
+        return response_cache.respond(request, encoded)
+    
+    try:
+        pulse = await get_pulse(ticker, deadline)
         
     except HTTPException:
         raise
+    except ProviderError as e:
+        logger.error(f"No data source available for {ticker}: {e}")
+        raise HTTPException(status_code=503, detail=f"Upstream data unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating market pulse for {ticker}: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    # Serialized here rather than by FastAPI, once per cache lifetime
+    return response_cache.respond(request, await response_cache.encode(ticker, pulse))
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.get("/api/v1/market-pulse/stream")
+async def stream_market_pulse(ticker: str = Query(..., description="Stock ticker symbol (e.g., AAPL, MSFT)")):
+    """
+    Stream a market pulse as Server-Sent Events
+    
+    Sends `momentum` and `news` as soon as upstream data is in, `explanation` deltas while the LLM
+    writes, then the full `pulse`; failures arrive as an `error` event
+    """
+    ticker = normalize_ticker(ticker)
+    hot_tickers.record(ticker)
+    
+    async def events():
+        try:
+            stock_data, news_data, momentum_data = await fetch_pulse_inputs(ticker)
+            yield sse_event("momentum", MomentumData(
+                returns=momentum_data["returns"], score=momentum_data["score"], windows=stock_data.get("windows")
+            ).model_dump())
+            yield sse_event("news", [NewsItem(**item).model_dump() for item in news_data])
+            
+            analysis = None
+            async for update in llm_service.stream_analysis(ticker, momentum_data, news_data):
+                if "delta" in update:
+                    yield sse_event("explanation", {"delta": update["delta"]})
+                else:
+                    analysis = update["final"]
+            
+            yield sse_event("pulse", assemble_pulse(ticker, stock_data, news_data, momentum_data, analysis).model_dump())
+        except ProviderError as e:
+            logger.error(f"No data source available for {ticker}: {e}")
+            yield sse_event("error", {"status": 503, "detail": f"Upstream data unavailable: {str(e)}"})
+        except Exception as e:
+            logger.error(f"Error streaming market pulse for {ticker}: {e}")
+            yield sse_event("error", {"status": 500, "detail": f"Internal server error: {str(e)}"})
+    
+    # Disable proxy buffering so each event reaches the client as soon as it is written
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/api/v1/ws")
+async def pulse_websocket(websocket: WebSocket):
+    """
+    Subscribe to live pulses
+    
+    Send {"action": "subscribe" | "unsubscribe", "tickers": [...]}; the server replies with the current
+    subscription set, sends each new ticker's pulse, then pushes a fresh pulse whenever its data is refreshed
+    """
+    await websocket.accept()
+    subscriber = PulseSubscriber(websocket, broadcaster.send_timeout, broadcaster.max_pending_control)
+    broadcaster.connect(subscriber)
+    sender = asyncio.create_task(subscriber.send_loop())
+    # However the sender stops, the connection no longer gets pushes
+    sender.add_done_callback(lambda _: broadcaster.disconnect(subscriber))
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+                action = message.get("action")
+                tickers = [normalize_ticker(str(t)) for t in message.get("tickers", [])]
+            except WebSocketDisconnect:
+                raise
+            except HTTPException as e:
+                subscriber.send_control({"type": "error", "detail": e.detail})
+                continue
+            except Exception:
+                if sender.done():
+                    break  # the sender closed a connection that stopped reading
+                subscriber.send_control({"type": "error", "detail": "Expected a JSON object with action and tickers"})
+                continue
+            
+            if action == "subscribe":
+                new = [t for t in dict.fromkeys(tickers) if t not in subscriber.tickers]
+                if len(subscriber.tickers) + len(new) > broadcaster.max_subscriptions:
+                    subscriber.send_control({
+                        "type": "error",
+                        "detail": f"Too many subscriptions (max {broadcaster.max_subscriptions} per connection)"
+                    })
+                    continue
+                broadcaster.subscribe(subscriber, new)
+                subscriber.send_control({"type": "subscribed", "tickers": sorted(subscriber.tickers)})
+                for ticker in new:
+                    task = asyncio.create_task(broadcaster.send_current(subscriber, ticker))
+                    subscriber.tasks.add(task)
+                    task.add_done_callback(subscriber.tasks.discard)
+            elif action == "unsubscribe":
+                broadcaster.unsubscribe(subscriber, tickers)
+                subscriber.send_control({"type": "subscribed", "tickers": sorted(subscriber.tickers)})
+            elif action == "ping":
+                subscriber.send_control({"type": "pong"})
+            else:
+                subscriber.send_control({"type": "error", "detail": f"Unknown action: {action}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcaster.disconnect(subscriber)
+        sender.cancel()
+
+async def _batch_item(ticker: str, semaphore: asyncio.Semaphore) -> BatchPulseItem:
+    """Resolve one batch entry, turning failures into a per-ticker error"""
+    try:
+        ticker = normalize_ticker(ticker)
+        if all([await layer.contains(ticker) for layer in cache_layers]):
+            # Fully cached pulses are assembled without upstream calls and don't need a slot
+            return BatchPulseItem(ticker=ticker, result=await get_pulse(ticker))
+        async with semaphore:
+            return BatchPulseItem(ticker=ticker, result=await get_pulse(ticker))
+    except HTTPException as e:
+        return BatchPulseItem(ticker=ticker, error=e.detail)
+    except Exception as e:
+        logger.error(f"Error generating market pulse for {ticker} in batch: {e}")
+        return BatchPulseItem(ticker=ticker, error=f"Internal server error: {str(e)}")
+
+@app.post("/api/v1/market-pulse/batch", response_model=BatchPulseResponse)
+async def get_market_pulse_batch(
+    request: BatchPulseRequest,
+    stream: bool = Query(False, description="Stream results as NDJSON as they complete")
+):
+    """
+    Get market pulse analysis for many tickers in one request
+    
+    Tickers are fanned out with bounded concurrency; each entry carries either a result or an error
+    """
+    # Deduplicate while keeping the caller's order
+    tickers = list(dict.fromkeys(t.upper().strip() for t in request.tickers))
+    if not tickers:
+        raise HTTPException(status_code=400, detail="No tickers provided")
+    if len(tickers) > BATCH_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"Too many tickers (max {BATCH_MAX_TICKERS})")
+    
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    if stream:
+        async def ndjson_lines():
+            for next_item in asyncio.as_completed([_batch_item(t, semaphore) for t in tickers]):
+                item = await next_item
+                yield item.model_dump_json(exclude_none=True) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
+    results = await asyncio.gather(*[_batch_item(t, semaphore) for t in tickers])
+    return BatchPulseResponse(
+        count=len(results),
+        errors=sum(1 for item in results if item.error),
+        results=results
+    )
+
+@app.get("/api/v1/sectors")
+async def list_sectors():
+    """Sectors in the symbol universe with their member counts"""
+    return {"sectors": [{"sector": name, "members": count} for name, count in sorted(symbol_index.list_sectors().items())]}
+
+@app.get("/api/v1/sector-pulse", response_model=SectorPulseResponse)
+async def get_sector_pulse(sector: str = Query(..., description="Sector name (e.g., Semiconductors); see /api/v1/sectors")):
+    """
+    Get an aggregate pulse for a sector
+    
+    Member momentum is computed in one batched pass from the per-ticker cache layers, then summarized by a
+    single LLM call. The result is cached; when a member ticker refreshes only that member is re-read
+    """
+    try:
+        return await sector_service.get_pulse(sector)
+    except HTTPException:
+        raise
+    except ProviderError as e:
+        logger.error(f"No data source available for sector {sector}: {e}")
+        raise HTTPException(status_code=503, detail=f"Upstream data unavailable: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error generating sector pulse for {sector}: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/api/v1/tickers/search")
+async def search_tickers(
+    q: str = Query(..., min_length=1, max_length=64, description="Symbol or company name prefix (e.g., AA, apple)"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of matches")
+):
+    """Autocomplete over the symbol universe: symbol prefix first, then company name and alias matches"""
+    return {"query": q, "results": symbol_index.search(q, limit)}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latencies, cache results, fallbacks, upstream and HTTP status codes"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+def circuit_breakers() -> List[CircuitBreaker]:
+    clients = (stock_service.finnhub, stock_service.alpha_vantage, news_service.gnews, news_service.newsapi)
+    return [client.breaker for client in clients] + [llm_service.breaker]
+
+def service_status() -> Dict[str, str]:
+    """Per data path: configured, degraded (some circuits open), unavailable (all open), or mock/fallback"""
+    llm_status = "fallback"
+    if gemini_api_key:
+        llm_status = "configured" if llm_service.breaker.available() else "unavailable"
+    return {
+        "stock_api": provider_status([client for _, client, _ in stock_service.providers()]),
+        "news_api": provider_status([client for _, client, _ in news_service.providers()]),
+        "llm_api": llm_status
+    }
+
+@app.get("/api/v1/ready")
+async def readiness_check():
+    """
+    Readiness probe: 503 when a data path can't be served
+    
+    That means prices or news have no upstream provider configured while mock data is disabled or
+    READINESS_REQUIRE_UPSTREAMS=true. Open circuits only make /api/v1/health report degraded: every replica
+    sees the same upstreams, so failing readiness on them would pull the whole service out of rotation
+    """
+    services = service_status()
+    require_upstreams = os.getenv("READINESS_REQUIRE_UPSTREAMS", "false").lower() == "true"
+    reasons = [
+        f"{name}: no upstream provider is configured"
+        for name in ("stock_api", "news_api")
+        if services[name] == "mock" and (require_upstreams or not ALLOW_MOCK_DATA)
+    ]
+    body = {
+        "ready": not reasons,
+        "reasons": reasons,
+        "services": services,
+        "circuit_breakers": {breaker.name: breaker.state for breaker in circuit_breakers()}
+    }
+    return JSONResponse(body, status_code=503 if reasons else 200)
 
 @app.get("/api/v1/health")
 async def health_check():
     """Detailed health check with service status"""
+    cache_stats = {layer.name: await layer.stats() for layer in cache_layers}
+    services = service_status()
     return {
-        "status": "healthy",
+        "status": "healthy" if all(status in ("configured", "mock", "fallback") for status in services.values()) else "degraded",
         "timestamp": datetime.now().isoformat(),
-        "services": {
-            "stock_api": "configured" if stock_service.finnhub_key or stock_service.alpha_vantage_key else "mock",
-            "news_api": "configured" if news_service.gnews_key or news_service.news_api_key else "mock", 
-            "llm_api": "configured" if gemini_api_key else "fallback"
+        "services": services,
+        "circuit_breakers": {breaker.name: breaker.stats() for breaker in circuit_breakers()},
+        "cache_size": sum(stats["size"] or 0 for stats in cache_stats.values()),
+        "cache_backend": cache_backend.name,
+        "cache": cache_stats,
+        "coalescing": {
+            "market_pulse": pulse_flight.stats(),
+            "stock": stock_service.flight.stats(),
+            "news": news_service.flight.stats(),
+            "analysis": llm_service.flight.stats()
+        },
+        "providers": {
+            client.name: client.stats()
+            for client in (stock_service.finnhub, stock_service.alpha_vantage, news_service.gnews, news_service.newsapi)
         },
-        "cache_size": len(cache)
+        "sources_served": {"stock": stock_service.source_counts, "news": news_service.source_counts},
+        "llm_batching": llm_service.batcher.stats(),
+        "llm_memo": llm_memo.stats(),
+        "llm_calls": llm_service.gate.stats(),
+        "fixtures": fixtures.stats(),
+        "response_cache": response_cache.stats(),
+        "websocket": broadcaster.stats(),
+        "symbols": symbol_index.stats(),
+        "sector_pulse": dict(sector_service.stats(), cache=await sector_cache.stats()),
+        "background_refresh": refresher.stats(),
+        "hot_tickers": hot_tickers.stats()
     }
 
+@app.get("/api/v1/startup")
+async def startup_report():
+    """Cold-start report: import cost per module, module load, time to ready and LLM warm-up (milliseconds)"""
+    return {
+        "imports_ms": IMPORT_TIMINGS,
+        "module_load_ms": STARTUP_TIMINGS.get("module_load_ms"),
+        "ready_ms": STARTUP_TIMINGS.get("ready_ms"),
+        "llm_warmup_ms": STARTUP_TIMINGS.get("llm_warmup_ms"),
+        "symbol_index_ms": symbol_index.load_ms,
+        "llm_ready": llm_service._model_loaded
+    }
+
+STARTUP_TIMINGS["module_load_ms"] = round((time.perf_counter() - MODULE_STARTED) * 1000, 1)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
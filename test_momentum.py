@@ -5,10 +5,41 @@ Unit tests for MarketPulse momentum calculation and core functions
 
 import sys
 import os
+import tempfile
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src', 'backend'))
+# Caches, the LLM memo and price history go to a throwaway directory, not the developer's data dir
+os.environ.setdefault("MARKETPULSE_DATA_DIR", tempfile.mkdtemp(prefix="marketpulse-test-"))
 
+import asyncio
+import contextlib
+import gzip
+import io
+import json
+import re
+import subprocess
+import threading
+import time
+import types
 import unittest
-from main import MomentumCalculator
+from unittest.mock import patch
+import aiohttp
+import numpy as np
+from aiohttp import web
+from starlette.requests import Request
+import benchmark
+import main
+import run_server
+from main import MomentumCalculator, MomentumEngine, SentimentScorer, SymbolIndex, SectorPulseService, CircuitBreaker, RequestDeadline, LLMBatcher, LLMCallGate, PulseSubscriber, PulseBroadcaster, classify_pulse
+from main import (
+    BackgroundRefresher, CacheLayer, Counter, FixtureStore, Histogram, HTTPClientManager, LLMResultMemo, MarketPulseResponse,
+    MemoryCacheBackend, MetricsRegistry, MomentumData, NewsService, PriceHistoryStore, ProviderClient, ProviderError,
+    RedisCacheBackend, ResponseCache, SingleFlight, SQLiteCacheBackend, StockDataService, REQUEST_DEADLINE_MS, cache_layers, llm_service
+)
+
+def run_async(coro, **overrides):
+    """Run coro to completion with the given main module globals (services, flags) swapped in meanwhile"""
+    with patch.multiple(main, **overrides):
+        return asyncio.run(coro)
 
 class TestMomentumCalculator(unittest.TestCase):
     """Test momentum calculation logic"""
@@ -41,6 +72,7 @@ class TestMomentumCalculator(unittest.TestCase):
         returns = [0.1, -0.1, 0.05, -0.05]  # Very small values
         score = self.calculator.calculate_momentum_score(returns)
         self.assertEqual(score, 0.0)  # Should round to 0
+        self.assertEqual(str(self.calculator.calculate_momentum_score([-0.001, -0.002])), "0.0")  # not "-0.0"
         
     def test_empty_returns(self):
         """Test edge case: empty returns array"""
@@ -61,6 +93,1560 @@ class TestMomentumCalculator(unittest.TestCase):
         # Should be rounded to 2 decimal places
         self.assertEqual(score, 1.79)  # (1.234567+2.345678)/2 = 1.7901225 ≈ 1.79
 
+class TestMomentumEngine(unittest.TestCase):
+    """Test the vectorized multi-ticker momentum engine"""
+    
+    def setUp(self):
+        self.engine = MomentumEngine(windows=(2, 3))
+    
+    def test_daily_returns(self):
+        """Test single-ticker returns match the per-day percentage change"""
+        returns = MomentumEngine.daily_returns([100.0, 102.0, 99.96])
+        self.assertEqual(returns, [2.0, -2.0])
+    
+    def test_matrix_statistics(self):
+        """Test every row of a price matrix is computed in one pass"""
+        prices = np.array([
+            [100.0, 101.0, 102.01, 103.0301],  # +1% every day
+            [100.0, 99.0, 98.01, 97.0299],     # -1% every day
+        ])
+        stats = self.engine.compute(prices)
+        np.testing.assert_allclose(stats["score"], [1.0, -1.0])
+        np.testing.assert_allclose(stats["momentum_3d"], [1.0, -1.0])
+        np.testing.assert_allclose(stats["volatility"], [0.0, 0.0], atol=1e-9)
+        self.assertEqual(list(stats["up_days"]), [3, 0])
+        self.assertEqual(list(stats["down_days"]), [0, 3])
+    
+    def test_ragged_history(self):
+        """Test NaN-padded shorter histories only fill the windows they cover"""
+        prices = np.array([
+            [100.0, 110.0, 99.0, 99.0],
+            [np.nan, np.nan, 100.0, 105.0],
+        ])
+        stats = self.engine.compute(prices)
+        self.assertEqual(list(stats["count"]), [3, 1])
+        self.assertAlmostEqual(stats["volatility_range"][0], 20.0)
+        self.assertAlmostEqual(stats["momentum_2d"][0], -5.0)
+        self.assertTrue(np.isnan(stats["momentum_2d"][1]))
+        self.assertAlmostEqual(stats["score"][1], 5.0)
+    
+    def test_summarize_matches_calculator(self):
+        """Test the single-ticker wrapper agrees with the engine"""
+        returns = [1.0, -2.0, 0.5, 1.5]
+        summary = self.engine.summarize(returns)
+        self.assertEqual(MomentumCalculator.calculate_momentum_score(returns), round(summary["score"], 2))
+        self.assertEqual((summary["up_days"], summary["down_days"]), (3, 1))
+        self.assertAlmostEqual(summary["volatility_range"], 3.5)
+
+class TestClassifyPulse(unittest.TestCase):
+    """Test the rule-based pulse classifier"""
+    
+    def test_rule(self):
+        """Test momentum calls, news confirmation and news overrides"""
+        scores = [1.0, 1.0, -1.0, 0.2, 0.2, -0.8, 0.0]
+        news = [0, -1, 0, 0, 3, -2, -2]
+        self.assertEqual(classify_pulse(scores, news).tolist(), [1, 0, -1, 0, 1, -1, -1])
+    
+    def test_threshold_grid_broadcast(self):
+        """Test a column of thresholds classifies every score at once"""
+        pulses = classify_pulse(np.array([[0.3, -0.7, 1.2]]), 0, np.array([[0.25], [1.0]]))
+        self.assertEqual(pulses.tolist(), [[1, -1, 1], [0, 0, 1]])
+
+class TestSentimentScorer(unittest.TestCase):
+    """Test the shared news sentiment scorer"""
+    
+    def setUp(self):
+        self.scorer = SentimentScorer()
+    
+    def test_word_boundaries(self):
+        """Test keywords don't match inside longer words"""
+        news = [{"title": "Analysts offer support", "description": "Rendered in markdown"}]
+        self.assertEqual(self.scorer.score_headlines(news), 0)
+    
+    def test_inflections_and_once_per_headline(self):
+        """Test inflected forms hit their stem and repeats count once"""
+        news = [
+            {"title": "Apple beats estimates, beat again", "description": "Revenue rises"},
+            {"title": "Guidance lowered on supply concerns", "description": None}
+        ]
+        matches = self.scorer.match_headlines(news)
+        self.assertEqual(matches[0]["positive"], ["beat", "revenue", "rise"])
+        self.assertEqual(matches[1]["negative"], ["concern", "lower"])
+        self.assertEqual(self.scorer.score_headlines(news), 1)
+    
+    def test_dropped_e_and_doubled_consonant(self):
+        """Test "rising" hits "rise" and "dropped"/"cutting" hit "drop"/"cut" without matching unrelated words"""
+        news = [
+            {"title": "Shares rising after launch", "description": ""},
+            {"title": "Stock dropped as company is cutting jobs", "description": "Rismo and droppers unchanged"}
+        ]
+        matches = self.scorer.match_headlines(news)
+        self.assertEqual(matches[0]["positive"], ["launch", "rise"])
+        self.assertEqual(matches[1]["negative"], ["cut", "drop"])
+    
+    def test_batch_matches_single(self):
+        """Test the batch API agrees with scoring each set separately"""
+        sets = [
+            [{"title": "Strong growth", "description": ""}],
+            [],
+            [{"title": "Shares drop", "description": "Loss widens"}, {"title": "New deal", "description": ""}]
+        ]
+        self.assertEqual(self.scorer.score_batch(sets), [self.scorer.score_headlines(s) for s in sets])
+        self.assertEqual(self.scorer.score_batch(sets), [2, 0, -1])
+    
+    def test_custom_lexicon(self):
+        """Test a configured lexicon replaces the default one"""
+        scorer = SentimentScorer({"positive": ["upgrade"], "negative": ["downgrade"]})
+        news = [{"title": "Broker upgrades stock after downgrade", "description": "strong quarter"}]
+        self.assertEqual(scorer.match_headlines(news)[0]["positive"], ["upgrade"])
+        self.assertEqual(scorer.score_headlines(news), 0)
+
+class TestSymbolIndex(unittest.TestCase):
+    """Test the symbol universe search index"""
+    
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w") as f:
+            f.write("symbol,name,sector,size,aliases\n"
+                    "AAPL,Apple Inc.,Technology,Large Cap,\n"
+                    "AA,Alcoa Corporation,Materials,,\n"
+                    "META,Meta Platforms Inc.,Social Media,Large Cap,facebook\n"
+                    "KO,Coca-Cola Company,Beverages,,coca cola\n")
+        self.index = SymbolIndex(self.path)
+    
+    def tearDown(self):
+        os.remove(self.path)
+    
+    def test_symbol_prefix_ranks_first(self):
+        """Test symbol prefixes come before name matches, in symbol order"""
+        symbols = [r["symbol"] for r in self.index.search("a")]
+        self.assertEqual(symbols[:2], ["AA", "AAPL"])
+        self.assertEqual(self.index.search("aa", limit=1)[0]["symbol"], "AA")
+    
+    def test_name_and_alias_matches(self):
+        """Test word prefixes, aliases and substrings of company names"""
+        self.assertEqual([r["symbol"] for r in self.index.search("apple")], ["AAPL"])
+        self.assertEqual([r["symbol"] for r in self.index.search("faceb")], ["META"])
+        self.assertEqual([r["symbol"] for r in self.index.search("coca co")], ["KO"])
+        self.assertEqual([r["symbol"] for r in self.index.search("latfor")], ["META"])
+        self.assertEqual(self.index.search("xyz"), [])
+    
+    def test_company_context(self):
+        """Test known tickers use the index and unknown ones get the generic context"""
+        self.assertEqual(self.index.company_context("AAPL")["sector"], "Technology")
+        self.assertEqual(self.index.company_context("AA")["size"], "Mid Cap")
+        self.assertEqual(self.index.company_context("ZZZZ"),
+                         {"name": "ZZZZ Corporation", "sector": "General Market", "size": "Mid Cap"})
+
+class TestSectorAggregate(unittest.TestCase):
+    """Test sector statistics built from member rows"""
+    
+    def test_breadth_and_movers(self):
+        """Test breadth, leaders/laggards and uneven return histories"""
+        rows = {
+            "AAA1": {"returns": [1.0, 2.0, 3.0, 2.0], "sentiment": 2, "pulse": "bullish"},
+            "BBB1": {"returns": [-1.0, -2.0], "sentiment": -1, "pulse": None},
+            "CCC1": {"returns": [0.5, -0.5, 0.0, 0.0], "sentiment": 0, "pulse": "neutral"}
+        }
+        stats = SectorPulseService._aggregate(rows)
+        self.assertEqual((stats["members"], stats["advancers"], stats["decliners"]), (3, 1, 1))
+        self.assertAlmostEqual(stats["avg_score"], round((2.0 - 1.5 + 0.0) / 3, 2))
+        self.assertEqual(stats["news_sentiment"], 1)
+        self.assertEqual(stats["pulse_counts"], {"bullish": 1, "neutral": 1, "bearish": 0})
+        self.assertEqual([m["ticker"] for m in stats["leaders"]], ["AAA1", "CCC1"])
+        self.assertEqual([m["ticker"] for m in stats["laggards"]], ["BBB1"])
+
+class TestSectorIncremental(unittest.TestCase):
+    """Test a cached sector pulse re-reads only the members whose cache layers were written since"""
+    
+    def test_only_dirty_members_refetched(self):
+        """Test refreshes mark their own sector, dirty members are refetched alone and failures keep the old row"""
+        sectors = main.symbol_index.list_sectors()
+        sector = next(name for name, count in sorted(sectors.items()) if count >= 4)
+        other = next(name for name in sorted(sectors) if name != sector)
+        service = SectorPulseService(CacheLayer("sector_test", MemoryCacheBackend(), 10, 900), max_members=4)
+        members = main.symbol_index.sector_members(sector.lower())[:4]
+        outsider = main.symbol_index.sector_members(other.lower())[0]
+        fetched, failing = [], set()
+        
+        async def fetch_member(ticker, semaphore):
+            fetched.append(ticker)
+            if ticker in failing:
+                return None
+            return [1.0, 2.0], [{"title": f"{ticker} beats estimates", "url": f"https://example.com/{ticker}"}], "bullish"
+        
+        async def summarize_sector(name, stats):
+            return {"pulse": "bullish", "explanation": "Broad strength.", "source": "rules"}
+        
+        async def run():
+            rounds = []
+            for dirty, fails in ((), ()), ((), ()), ((members[1], outsider, "NOSUCH"), ()), ((members[2],), (members[2],)):
+                for ticker in dirty:
+                    service.notify("prices", ticker)
+                failing.update(fails)
+                fetched.clear()
+                response = await service.get_pulse(sector)
+                rounds.append((list(fetched), response.stats["members"]))
+            return rounds
+        
+        service._fetch_member = fetch_member
+        with patch.object(llm_service, "summarize_sector", summarize_sector):
+            rounds = asyncio.run(run())
+        self.assertEqual(rounds, [(members, 4), ([], 4), ([members[1]], 4), ([members[2]], 4)])
+        stats = service.stats()
+        self.assertEqual((stats["builds"], stats["incremental_updates"], stats["members_refetched"]), (1, 2, 6))
+        self.assertEqual((stats["tracked_sectors"], stats["pending_members"]), (1, 0))
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the per-provider circuit breaker state machine"""
+    
+    def setUp(self):
+        self.breaker = CircuitBreaker("test")
+        self.breaker.min_calls = 4
+        self.breaker.failure_rate = 0.5
+        self.breaker.open_seconds = 60
+    
+    def test_opens_on_failure_rate(self):
+        """Test the breaker stays closed below the threshold and opens at it"""
+        for failed in (False, False, True):
+            self.breaker.settle(failed)
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.settle(True)
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+        self.assertFalse(self.breaker.available())
+    
+    def test_half_open_probe(self):
+        """Test one probe is admitted after the cool-down and its result decides"""
+        self.breaker.open_seconds = 0
+        for _ in range(4):
+            self.breaker.settle(True)
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertFalse(self.breaker.allow())
+        self.breaker.settle(True)
+        self.assertEqual((self.breaker.state, self.breaker.opened), ("open", 2))
+        self.assertTrue(self.breaker.allow())
+        self.breaker.settle(False)
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertEqual(self.breaker.stats()["calls_in_window"], 0)
+    
+    def test_readiness_requires_configured_upstreams(self):
+        """Test readiness fails on unconfigured upstreams only when real upstreams are required, never on open circuits"""
+        statuses = {"stock_api": "mock", "news_api": "unavailable", "llm_api": "fallback"}
+        with patch.dict(os.environ):
+            os.environ.pop("READINESS_REQUIRE_UPSTREAMS", None)
+            ready = run_async(main.readiness_check(), service_status=lambda: statuses, ALLOW_MOCK_DATA=True)
+            os.environ["READINESS_REQUIRE_UPSTREAMS"] = "true"
+            response = run_async(main.readiness_check(), service_status=lambda: statuses, ALLOW_MOCK_DATA=True)
+        self.assertEqual(ready.status_code, 200)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.body)["reasons"], ["stock_api: no upstream provider is configured"])
+
+class TestRequestDeadline(unittest.TestCase):
+    """Test the per-request latency budget"""
+    
+    def test_stage_shares(self):
+        """Test data stages end at their share and the LLM gets the rest"""
+        deadline = RequestDeadline(2.0)
+        self.assertLessEqual(deadline.time_left("prices"), 1.0)
+        self.assertGreater(deadline.time_left("prices"), 0.9)
+        self.assertGreater(deadline.time_left("analysis"), deadline.time_left("news"))
+        self.assertLessEqual(deadline.time_left("analysis"), 2.0)
+    
+    def _run_burst(self, build_seconds: float, budget: float, callers: int = 10):
+        """Fire concurrent get_pulse calls for one ticker against a stubbed build; returns (results, builds)"""
+        builds = []
+        pulse = MarketPulseResponse(
+            ticker="COAL", as_of="2025-01-07", momentum=MomentumData(returns=[0.5, 0.5], score=0.5),
+            news=[], pulse="neutral", llm_explanation="stub"
+        )
+        
+        async def build(ticker):
+            builds.append(ticker)
+            await asyncio.sleep(build_seconds)
+            return pulse
+        
+        async def burst():
+            return await asyncio.gather(*[main.get_pulse("COAL", RequestDeadline(budget)) for _ in range(callers)])
+        
+        return run_async(burst(), build_market_pulse=build), builds, pulse
+    
+    def test_concurrent_requests_share_one_build(self):
+        """Test concurrent callers with the default deadline coalesce onto a single build"""
+        results, builds, pulse = self._run_burst(0.05, REQUEST_DEADLINE_MS / 1000)
+        self.assertEqual(len(builds), 1)
+        self.assertTrue(all(result is pulse for result in results))
+    
+    def test_overrun_degrades_each_waiter(self):
+        """Test callers whose deadline passes get a degraded rule-based pulse while the build is still shared"""
+        results, builds, _ = self._run_burst(0.5, 0.05, callers=3)
+        self.assertEqual(len(builds), 1)
+        for result in results:
+            self.assertTrue(result.degraded)
+            self.assertEqual(result.degraded_stages, ["prices", "news"])
+            self.assertEqual(result.sources["analysis"], "rules")
+
+class TestMetrics(unittest.TestCase):
+    """Test the Prometheus histogram, the text exposition and per-route request labels"""
+    
+    def test_histogram_buckets(self):
+        """Test an observation lands in the first bucket whose bound is not below it, counted cumulatively"""
+        histogram = Histogram("t_seconds", "Test latency", ("stage",), buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value, stage="fetch")
+        samples = {(name, key[-1] if name.endswith("_bucket") else None): value for name, key, value in histogram.samples()}
+        self.assertEqual(samples[("t_seconds_bucket", "0.1")], 2)
+        self.assertEqual(samples[("t_seconds_bucket", "1.0")], 3)
+        self.assertEqual(samples[("t_seconds_bucket", "+Inf")], 4)
+        self.assertEqual(samples[("t_seconds_count", None)], 4)
+        self.assertAlmostEqual(samples[("t_seconds_sum", None)], 5.65)
+    
+    def test_render_text_format(self):
+        """Test HELP/TYPE headers, unlabelled samples, histogram le labels and label value escaping"""
+        registry = MetricsRegistry()
+        registry.counter("t_plain_total", "Unlabelled").inc()
+        registry.counter("t_total", "Labelled", ("path",)).inc(2, path='a"b\\c\nd')
+        registry.histogram("t_seconds", "Latency", ("stage",), buckets=(0.5,)).observe(0.2, stage="llm")
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:3], ["# HELP t_plain_total Unlabelled", "# TYPE t_plain_total counter", "t_plain_total 1"])
+        self.assertIn('t_total{path="a\\"b\\\\c\\nd"} 2', lines)
+        self.assertIn("# TYPE t_seconds histogram", lines)
+        self.assertIn('t_seconds_bucket{stage="llm",le="0.5"} 1', lines)
+        self.assertIn('t_seconds_bucket{stage="llm",le="+Inf"} 1', lines)
+        self.assertIn('t_seconds_count{stage="llm"} 1', lines)
+    
+    @staticmethod
+    async def get(path: str, query: str = "") -> tuple:
+        """Send one GET through the full ASGI app (middleware included) and return status and body"""
+        messages = []
+        scope = {
+            "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http", "path": path,
+            "raw_path": path.encode(), "root_path": "", "query_string": query.encode(), "headers": [],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80)
+        }
+        
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+        
+        async def send(message):
+            messages.append(message)
+        
+        await main.app(scope, receive, send)
+        body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+        return messages[0]["status"], body.decode()
+    
+    def test_requests_labelled_by_route_template(self):
+        """Test /metrics reports a request under its route template, never the raw path or query"""
+        registry = MetricsRegistry()
+        requests = registry.counter("marketpulse_http_requests_total", "Requests", ("method", "route", "status"))
+        latency = registry.histogram("marketpulse_http_request_seconds", "Latency", ("method", "route"))
+        
+        async def scrape():
+            await self.get("/api/v1/tickers/search", "q=AAPL")
+            await self.get("/no/such/page")
+            return await self.get("/metrics")
+        status, text = run_async(scrape(), metrics=registry, HTTP_REQUESTS=requests, HTTP_REQUEST_SECONDS=latency)
+        self.assertEqual(status, 200)
+        self.assertIn('marketpulse_http_requests_total{method="GET",route="/api/v1/tickers/search",status="200"} 1', text)
+        self.assertIn('marketpulse_http_requests_total{method="GET",route="unmatched",status="404"} 1', text)
+        self.assertIn('marketpulse_http_request_seconds_count{method="GET",route="/api/v1/tickers/search"} 1', text)
+        self.assertNotIn("AAPL", text)
+        self.assertNotIn("/no/such/page", text)
+
+class TestHTTPClientManager(unittest.TestCase):
+    """Test every provider call shares one pooled session"""
+    
+    def test_session_and_connection_reused(self):
+        """Test sequential GETs reuse one session and one keep-alive connection, and close() starts afresh"""
+        peers = []
+        
+        async def ping(request):
+            peers.append(request.transport.get_extra_info("peername"))
+            return web.json_response({"ok": True})
+        
+        async def run():
+            app = web.Application()
+            app.router.add_get("/ping", ping)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            url = f"http://127.0.0.1:{runner.addresses[0][1]}/ping"
+            http = HTTPClientManager()
+            http.limit_per_host = 5
+            try:
+                sessions = []
+                for _ in range(3):
+                    session = await http.get_session()
+                    sessions.append(session)
+                    async with session.get(url) as response:
+                        await response.json()
+                limits = (sessions[0].connector.limit, sessions[0].connector.limit_per_host)
+                await http.close()
+                reopened = await http.get_session()
+                return sessions, limits, reopened
+            finally:
+                await http.close()
+                await runner.cleanup()
+        
+        sessions, limits, reopened = asyncio.run(run())
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+        self.assertEqual(len(set(peers)), 1)
+        self.assertEqual(limits, (100, 5))
+        self.assertTrue(sessions[0].closed)
+        self.assertIsNot(reopened, sessions[0])
+
+class TestSingleFlight(unittest.TestCase):
+    """Test concurrent calls for one key share a single in-flight computation"""
+    
+    def test_concurrent_calls_coalesce(self):
+        """Test one call per key runs at a time and every waiter gets its result"""
+        flight = SingleFlight("test")
+        started = []
+        
+        async def load(key):
+            started.append(key)
+            await asyncio.sleep(0.01)
+            return key.lower()
+        
+        async def run():
+            results = await asyncio.gather(*[flight.do(key, lambda key=key: load(key)) for key in ("AAPL",) * 5 + ("MSFT",) * 2])
+            again = await flight.do("AAPL", lambda: load("AAPL"))
+            return results, again
+        
+        results, again = asyncio.run(run())
+        self.assertEqual(results, ["aapl"] * 5 + ["msft"] * 2)
+        self.assertEqual(again, "aapl")
+        self.assertEqual(started, ["AAPL", "MSFT", "AAPL"])
+        self.assertEqual(flight.stats(), {"calls": 3, "coalesced": 5, "in_flight": 0})
+    
+    def test_failure_shared_and_cancelled_waiter(self):
+        """Test an error reaches every waiter, and cancelling one waiter leaves the shared call running"""
+        flight = SingleFlight("test")
+        
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ProviderError("finnhub", "upstream down")
+        
+        async def slow():
+            await asyncio.sleep(0.02)
+            return "done"
+        
+        async def run():
+            errors = await asyncio.gather(flight.do("AAPL", fail), flight.do("AAPL", fail), return_exceptions=True)
+            impatient = asyncio.ensure_future(flight.do("MSFT", slow))
+            patient = asyncio.ensure_future(flight.do("MSFT", slow))
+            await asyncio.sleep(0)
+            impatient.cancel()
+            return errors, await patient, impatient.cancelled()
+        
+        errors, result, cancelled = asyncio.run(run())
+        self.assertTrue(all(isinstance(error, ProviderError) for error in errors))
+        self.assertEqual((result, cancelled), ("done", True))
+        self.assertEqual(flight.stats(), {"calls": 2, "coalesced": 2, "in_flight": 0})
+
+class TestCacheBackends(unittest.TestCase):
+    """Test the memory and SQLite cache backends behind the cache layers"""
+    
+    def backends(self):
+        path = os.path.join(tempfile.mkdtemp(prefix="marketpulse-cache-"), "cache.db")
+        return [MemoryCacheBackend(), SQLiteCacheBackend(path)]
+    
+    def run_each(self, scenario):
+        """Run scenario(backend) against every local backend"""
+        async def run(backend):
+            backend.register("prices", 10)
+            try:
+                await scenario(backend)
+            finally:
+                await backend.close()
+        
+        for backend in self.backends():
+            with self.subTest(backend=backend.name):
+                asyncio.run(run(backend))
+    
+    def test_per_entry_ttl(self):
+        """Test each entry expires on its own TTL"""
+        async def scenario(backend):
+            await backend.set("prices", "AAPL", {"close": 1}, 0.05)
+            await backend.set("prices", "MSFT", {"close": 2}, 60)
+            self.assertEqual(await backend.get("prices", "AAPL"), {"close": 1})
+            await asyncio.sleep(0.1)
+            self.assertIsNone(await backend.get("prices", "AAPL"))
+            self.assertEqual(await backend.get("prices", "MSFT"), {"close": 2})
+            self.assertEqual(await backend.size("prices"), 1)
+        
+        self.run_each(scenario)
+    
+    def test_set_if_absent(self):
+        """Test set_if_absent only wins on a missing or expired key"""
+        async def scenario(backend):
+            self.assertTrue(await backend.set_if_absent("prices", "lock:AAPL", "a", 0.05))
+            self.assertFalse(await backend.set_if_absent("prices", "lock:AAPL", "b", 0.05))
+            await asyncio.sleep(0.1)
+            self.assertTrue(await backend.set_if_absent("prices", "lock:AAPL", "b", 60))
+            await backend.delete("prices", "lock:AAPL")
+            self.assertTrue(await backend.set_if_absent("prices", "lock:AAPL", "c", 60))
+        
+        self.run_each(scenario)
+    
+    def test_stale_window(self):
+        """Test a layer keeps serving an entry as stale until its stale window also passes"""
+        async def scenario(backend):
+            layer = CacheLayer("news", backend, 10, 0.05, stale_ttl=0.1)
+            await layer.set("AAPL", ["headline"])
+            self.assertEqual(await layer.get("AAPL"), ["headline"])
+            await asyncio.sleep(0.07)
+            entry = await layer.get_entry("AAPL")
+            self.assertTrue(entry.stale)
+            self.assertEqual(entry.value, ["headline"])
+            self.assertIsNone(await layer.get("AAPL"))
+            await asyncio.sleep(0.1)
+            self.assertIsNone(await layer.get_entry("AAPL"))
+            self.assertEqual((layer.hits, layer.stale_hits, layer.misses), (1, 2, 1))
+        
+        self.run_each(scenario)
+    
+    def test_layers_keep_own_keys_and_ttls(self):
+        """Test layers sharing a backend keep separate keys, each stamped with its own, dynamic or explicit TTL"""
+        async def scenario(backend):
+            prices = CacheLayer("prices", backend, 10, 60, ttl_fn=lambda: 3600)
+            news = CacheLayer("news", backend, 10, 900)
+            await prices.set("AAPL", {"close": 1})
+            await news.set("AAPL", ["headline"])
+            await news.set("MSFT", ["fallback"], ttl=5)
+            self.assertEqual(await prices.get("AAPL"), {"close": 1})
+            self.assertEqual(await news.get("AAPL"), ["headline"])
+            self.assertIsNone(await prices.get("MSFT"))
+            entries = [await layer.peek(key) for layer, key in ((prices, "AAPL"), (news, "AAPL"), (news, "MSFT"))]
+            self.assertEqual([entry.ttl for entry in entries], [3600, 900, 5])
+            self.assertEqual((await prices.stats())["ttl"], 3600)
+        
+        self.run_each(scenario)
+    
+    def test_price_ttl_follows_market_hours(self):
+        """Test prices use PRICE_CACHE_TTL while the market is open and last until the next open once it closes"""
+        with patch.object(main, "seconds_until_market_open", return_value=0):
+            self.assertEqual(main.price_cache_ttl(), main.PRICE_CACHE_TTL)
+        with patch.object(main, "seconds_until_market_open", return_value=7200):
+            self.assertEqual(main.price_cache_ttl(), 7200)
+    
+    def test_lock_shared_across_processes(self):
+        """Test two SQLite backends on one file (two workers) contend for the same analysis lock"""
+        path = os.path.join(tempfile.mkdtemp(prefix="marketpulse-cache-"), "cache.db")
+        
+        async def run():
+            first, second = SQLiteCacheBackend(path), SQLiteCacheBackend(path)
+            try:
+                layers = [CacheLayer("analysis", backend, 10, 60) for backend in (first, second)]
+                acquired = [await layers[0].acquire("AAPL", 60), await layers[1].acquire("AAPL", 60)]
+                await layers[0].release("AAPL")
+                acquired.append(await layers[1].acquire("AAPL", 60))
+                await layers[0].set("AAPL", {"pulse": "bullish"})
+                return acquired, await layers[1].get("AAPL")
+            finally:
+                await first.close()
+                await second.close()
+        
+        acquired, value = asyncio.run(run())
+        self.assertEqual(acquired, [True, False, True])
+        self.assertEqual(value, {"pulse": "bullish"})
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    """Test stale cache entries are served immediately while one background refresh runs"""
+    
+    def run_with_service(self, scenario, fetch, max_concurrent: int = 20):
+        """Run scenario(service, refresher) against a news service with a 50ms TTL and a stubbed fetch"""
+        async def run():
+            layer = CacheLayer("news", MemoryCacheBackend(), 10, 0.05, stale_ttl=60)
+            service = NewsService(main.http_client, layer)
+            service._fetch_news = fetch
+            return await scenario(service, main.refresher)
+        
+        return run_async(run(), refresher=BackgroundRefresher(max_concurrent))
+    
+    def test_stale_hits_refresh_once(self):
+        """Test concurrent stale reads return the old value and share one refresh"""
+        fetches = []
+        
+        async def fetch(ticker):
+            fetches.append(ticker)
+            await asyncio.sleep(0.02)
+            return [{"title": f"v{len(fetches)}"}]
+        
+        async def scenario(service, refresher):
+            first = await service.get_news("AAPL")
+            await asyncio.sleep(0.07)
+            stale = await asyncio.gather(*[service.get_news("AAPL") for _ in range(5)])
+            in_flight = refresher.stats()["in_flight"]
+            await asyncio.sleep(0.05)
+            return first, stale, in_flight, await service.get_news("AAPL"), refresher.stats()
+        
+        first, stale, in_flight, refreshed, stats = self.run_with_service(scenario, fetch)
+        self.assertEqual(first, [{"title": "v1"}])
+        self.assertTrue(all(value == first for value in stale))
+        self.assertEqual(in_flight, 1)
+        self.assertEqual(refreshed, [{"title": "v2"}])
+        self.assertEqual(len(fetches), 2)
+        self.assertEqual((stats["scheduled"], stats["in_flight"]), (1, 0))
+    
+    def test_failed_refresh_keeps_stale_value(self):
+        """Test a refresh that raises is counted and the stale value keeps being served"""
+        fetches = []
+        
+        async def fetch(ticker):
+            fetches.append(ticker)
+            if len(fetches) > 1:
+                raise RuntimeError("upstream down")
+            return [{"title": "v1"}]
+        
+        async def scenario(service, refresher):
+            await service.get_news("AAPL")
+            await asyncio.sleep(0.07)
+            await service.get_news("AAPL")
+            await asyncio.sleep(0.01)
+            return await service.get_news("AAPL"), refresher.stats()
+        
+        value, stats = self.run_with_service(scenario, fetch)
+        self.assertEqual(value, [{"title": "v1"}])
+        self.assertEqual((stats["scheduled"], stats["failed"]), (2, 1))
+    
+    def test_refresh_pool_is_bounded(self):
+        """Test refreshes beyond the concurrency limit are skipped rather than queued"""
+        async def fetch(ticker):
+            await asyncio.sleep(0.02)
+            return [{"title": ticker}]
+        
+        async def scenario(service, refresher):
+            for ticker in ("AAPL", "MSFT", "NVDA"):
+                await service.get_news(ticker)
+            await asyncio.sleep(0.07)
+            values = [await service.get_news(ticker) for ticker in ("AAPL", "MSFT", "NVDA")]
+            stats = refresher.stats()
+            await refresher.close()
+            return values, stats
+        
+        values, stats = self.run_with_service(scenario, fetch, max_concurrent=2)
+        self.assertEqual(values, [[{"title": "AAPL"}], [{"title": "MSFT"}], [{"title": "NVDA"}]])
+        self.assertEqual((stats["scheduled"], stats["skipped"], stats["in_flight"]), (2, 1, 2))
+
+class FakeRedis:
+    """Minimal in-process Redis server (GET/SET with PX and NX/DEL) whose replies to GET can be delayed"""
+    
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.delays = {}
+        self.connections = 0
+    
+    def _expire(self):
+        now = asyncio.get_running_loop().time()
+        for key in [key for key, expires_at in self.expiry.items() if expires_at <= now]:
+            self.data.pop(key, None)
+            del self.expiry[key]
+    
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        return f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}/0"
+    
+    async def _serve(self, reader, writer):
+        self.connections += 1
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            args = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2].decode())
+            command = args[0].upper()
+            self._expire()
+            if command == "GET":
+                await asyncio.sleep(self.delays.get(args[1], 0))
+                value = self.data.get(args[1])
+                reply = b"$-1\r\n" if value is None else f"${len(value)}\r\n{value}\r\n".encode()
+            elif command == "SET":
+                if "NX" in args and args[1] in self.data:
+                    reply = b"$-1\r\n"
+                else:
+                    self.data[args[1]] = args[2]
+                    if "PX" in args:
+                        self.expiry[args[1]] = asyncio.get_running_loop().time() + int(args[args.index("PX") + 1]) / 1000
+                    reply = b"+OK\r\n"
+            elif command == "DEL":
+                reply = f":{sum(self.data.pop(key, None) is not None for key in args[1:])}\r\n".encode()
+            else:
+                reply = b"-ERR unknown command\r\n"
+            if writer.is_closing():
+                break  # the client dropped the connection while this reply was pending
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+    
+    def close(self):
+        self.server.close()
+
+class TestRedisCacheBackend(unittest.TestCase):
+    """Test the Redis backend against an in-process fake server"""
+    
+    def run_with_server(self, scenario):
+        async def run():
+            fake = FakeRedis()
+            backend = RedisCacheBackend(await fake.start())
+            try:
+                return await scenario(fake, backend)
+            finally:
+                await backend.close()
+                fake.close()
+        return asyncio.run(run())
+    
+    def test_cancelled_command_does_not_leak_reply(self):
+        """Test a GET cancelled between write and read doesn't hand its reply to the next command"""
+        async def scenario(fake, backend):
+            await backend.set("price", "AAPL", {"close": 1}, 60)
+            await backend.set("price", "MSFT", {"close": 2}, 60)
+            fake.delays[backend._key("price", "AAPL")] = 0.2
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(backend.get("price", "AAPL"), 0.05)
+            await asyncio.sleep(0.3)
+            return await backend.get("price", "MSFT"), fake.connections
+        
+        value, connections = self.run_with_server(scenario)
+        self.assertEqual(value, {"close": 2})
+        self.assertEqual(connections, 2)
+    
+    def test_prefixed_keys_and_expiry(self):
+        """Test keys carry the prefix and namespace, and entries expire on their TTL"""
+        async def scenario(fake, backend):
+            await backend.set("prices", "AAPL", {"close": 1}, 0.05)
+            keys = sorted(fake.data)
+            fresh = await backend.get("prices", "AAPL")
+            await asyncio.sleep(0.1)
+            return keys, fresh, await backend.get("prices", "AAPL")
+        
+        keys, fresh, expired = self.run_with_server(scenario)
+        self.assertEqual(keys, ["marketpulse:prices:AAPL"])
+        self.assertEqual(fresh, {"close": 1})
+        self.assertIsNone(expired)
+    
+    def test_lock_shared_across_processes(self):
+        """Test two backends (two workers) on one server contend for the same analysis lock"""
+        async def scenario(fake, backend):
+            other = RedisCacheBackend(f"redis://{backend.host}:{backend.port}/0")
+            try:
+                layers = [CacheLayer("analysis", worker, 10, 60) for worker in (backend, other)]
+                acquired = [await layers[0].acquire("AAPL", 60), await layers[1].acquire("AAPL", 60)]
+                await layers[0].release("AAPL")
+                acquired.append(await layers[1].acquire("AAPL", 60))
+                return acquired
+            finally:
+                await other.close()
+        
+        self.assertEqual(self.run_with_server(scenario), [True, False, True])
+
+class FakeHTTP:
+    """Stand-in for HTTPClientManager: every GET answers 200 with the next canned JSON body and records its params"""
+    
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+    
+    async def get_session(self):
+        return self
+    
+    def get(self, url, params=None):
+        self.requests.append(params)
+        return FakeHTTPResponse(json.dumps(self.responses.pop(0)))
+
+class FakeHTTPResponse:
+    """A 200 response with a JSON body, usable as an async context manager"""
+    
+    status = 200
+    headers = {}
+    
+    def __init__(self, body: str):
+        self.body = body
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def text(self):
+        return self.body
+    
+    async def json(self, **kwargs):
+        return json.loads(self.body)
+
+class TestPriceHistoryStore(unittest.TestCase):
+    """Test the per-ticker close history and the incremental provider fetches built on it"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = PriceHistoryStore(self.tmp.name)
+        self.day = PriceHistoryStore.to_day("2025-01-06")
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_append_merges_and_replaces(self):
+        """Test appends stay sorted by day and a re-fetched day replaces the stored close"""
+        self.assertEqual(len(self.store.read("AAPL")), 0)
+        self.assertIsNone(self.store.last_day("AAPL"))
+        day = self.day
+        self.store.append("AAPL", [day + 1, day], [101.0, 100.0])
+        history = self.store.append("AAPL", [day + 1, day + 2], [101.5, 102.0])
+        self.assertEqual(history["day"].tolist(), [day, day + 1, day + 2])
+        self.assertEqual(history["close"].tolist(), [100.0, 101.5, 102.0])
+        self.assertEqual(self.store.read("AAPL")["close"].tolist(), [100.0, 101.5, 102.0])
+        self.assertEqual(self.store.last_day("AAPL"), day + 2)
+        self.assertEqual(day, self.store.to_day(1736121600))
+    
+    def test_concurrent_appends_keep_every_day(self):
+        """Test appends racing on one ticker from worker threads lose no candles and leave no temp files"""
+        async def run():
+            await asyncio.gather(*[self.store.append_async("AAPL", [self.day + i], [100.0 + i]) for i in range(20)])
+        
+        asyncio.run(run())
+        self.assertEqual(self.store.read("AAPL")["day"].tolist(), [self.day + i for i in range(20)])
+        self.assertEqual(os.listdir(self.tmp.name), ["AAPL.npy"])
+    
+    def service(self, responses):
+        """Stock service on this store whose upstream GETs pop canned bodies and record their params"""
+        http = FakeHTTP(responses)
+        service = StockDataService(http, CacheLayer("price_test", MemoryCacheBackend(), 10, 60), self.store)
+        service.finnhub_key, service.alpha_vantage_key = "key", "key"
+        return service, http.requests
+    
+    def test_finnhub_fetches_from_last_stored_day(self):
+        """Test an unknown ticker is backfilled once and later fetches only ask for candles since the last day"""
+        day = self.day
+        responses = [
+            {"s": "ok", "t": [(day + i) * 86400 for i in range(3)], "c": [100.0, 101.0, 102.0]},
+            {"s": "ok", "t": [(day + 2) * 86400, (day + 3) * 86400], "c": [102.5, 103.0]}
+        ]
+        service, requests = self.service(responses)
+        asyncio.run(service._fetch_finnhub_data("AAPL"))
+        data = asyncio.run(service._fetch_finnhub_data("AAPL"))
+        self.assertGreaterEqual(requests[0]["to"] - requests[0]["from"], (service.backfill_days - 1) * 86400)
+        self.assertEqual(requests[1]["from"], (day + 2) * 86400)
+        self.assertEqual(self.store.read("AAPL")["close"].tolist(), [100.0, 101.0, 102.5, 103.0])
+        self.assertEqual(data["prices"], [100.0, 101.0, 102.5, 103.0])
+    
+    def test_alpha_vantage_merges_only_new_days(self):
+        """Test days before the last stored one in a compact series are not merged"""
+        day = self.day
+        self.store.append("AAPL", [day, day + 1, day + 2], [100.0, 101.0, 102.0])
+        series = {"Time Series (Daily)": {
+            "2025-01-05": {"4. close": "90"},
+            "2025-01-07": {"4. close": "95"},
+            "2025-01-08": {"4. close": "102.5"},
+            "2025-01-09": {"4. close": "103"}
+        }}
+        service, _ = self.service([series])
+        asyncio.run(service._fetch_alpha_vantage_data("AAPL"))
+        history = self.store.read("AAPL")
+        self.assertEqual(history["day"].tolist(), [day, day + 1, day + 2, day + 3])
+        self.assertEqual(history["close"].tolist(), [100.0, 101.0, 102.5, 103.0])
+
+class TestFixtureReplay(unittest.TestCase):
+    """Test recording upstream responses and replaying them without the network"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        # The record/replay test swaps the module's fixture store mid-scenario
+        self.addCleanup(setattr, main, "fixtures", main.fixtures)
+    
+    def test_record_then_replay(self):
+        """Test a recorded response replays through the same client after the upstream is gone"""
+        hits = []
+        
+        async def candles(request):
+            hits.append(request.query["symbol"])
+            return web.json_response({"s": "ok", "c": [100.0, 101.0]})
+        
+        async def run():
+            app = web.Application()
+            app.router.add_get("/stock/candle", candles)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            url = f"http://127.0.0.1:{runner.addresses[0][1]}/stock/candle"
+            http = HTTPClientManager()
+            client = ProviderClient("finnhub", http, rate_per_minute=60, burst=10)
+            try:
+                main.fixtures = FixtureStore("record", self.tmp.name)
+                recorded = await client.get_json(url, {"symbol": "AAPL"}, fixture_key="AAPL")
+            finally:
+                await http.close()
+                await runner.cleanup()
+            main.fixtures = FixtureStore("replay", self.tmp.name)
+            replayed = await client.get_json(url, {"symbol": "AAPL"}, fixture_key="AAPL")
+            return recorded, replayed
+        
+        recorded, replayed = asyncio.run(run())
+        self.assertEqual(recorded, {"s": "ok", "c": [100.0, 101.0]})
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(hits, ["AAPL"])
+        self.assertEqual(main.fixtures.stats()["replayed"], 1)
+    
+    def test_replay_date_and_missing_fixture(self):
+        """Test the newest recording wins unless REPLAY_DATE pins one, and a missing key fails like an outage"""
+        store = FixtureStore("replay", self.tmp.name)
+        for date, body in (("2025-01-06", "old"), ("2025-01-07", "new")):
+            store._write(store._path(date, "gnews", "AAPL"), {"latency": 0.0, "body": body})
+        pinned = FixtureStore("replay", self.tmp.name, replay_date="2025-01-06")
+        self.assertEqual(asyncio.run(store.replay("gnews", "AAPL")), "new")
+        self.assertEqual(asyncio.run(pinned.replay("gnews", "AAPL")), "old")
+        with self.assertRaises(ProviderError):
+            asyncio.run(pinned.replay("gnews", "MSFT"))
+        self.assertEqual((pinned.replayed, pinned.missing), (1, 1))
+
+class TestProviderFailover(unittest.TestCase):
+    """Test a 200 with a bad payload fails over to the next provider and counts against the circuit"""
+    
+    @staticmethod
+    def respond(client, body):
+        async def request(url, params, fixture_key):
+            return body
+        client._request = request
+    
+    def test_stock_bad_payload_uses_secondary(self):
+        """Test undecodable and misshapen Finnhub bodies both fall through to Alpha Vantage"""
+        series = {"Time Series (Daily)": {"2025-01-06": {"4. close": "100"}, "2025-01-07": {"4. close": "101"}}}
+        for bad_body in ("<html>gateway</html>", '{"s": "ok", "c": [1, 2]}'):
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = CacheLayer("price_test", MemoryCacheBackend(), 10, 60)
+                service = StockDataService(main.http_client, cache, PriceHistoryStore(tmp))
+                service.finnhub_key, service.alpha_vantage_key = "key", "key"
+                self.respond(service.finnhub, bad_body)
+                self.respond(service.alpha_vantage, json.dumps(series))
+                data = asyncio.run(service._fetch_stock_data("AAPL"))
+            self.assertEqual(data["source"], "alpha_vantage")
+            self.assertEqual(data["returns"], [1.0])
+            self.assertEqual(service.finnhub.breaker.stats()["calls_in_window"], 1)
+            self.assertEqual(service.finnhub.failures, 1)
+    
+    def test_news_bad_payload_uses_secondary(self):
+        """Test articles missing required fields fall through to NewsAPI"""
+        cache = CacheLayer("news_test", MemoryCacheBackend(), 10, 60)
+        service = NewsService(main.http_client, cache)
+        service.gnews_key, service.news_api_key = "key", "key"
+        self.respond(service.gnews, json.dumps({"articles": [{"description": "no title or url"}]}))
+        self.respond(service.newsapi, json.dumps({"articles": [{"title": "AAPL beats", "url": "https://example.com"}]}))
+        articles = asyncio.run(service._fetch_news("AAPL"))
+        self.assertEqual([(a["title"], a["source"]) for a in articles], [("AAPL beats", "newsapi")])
+        self.assertEqual(service.gnews.failures, 1)
+
+class TestLLMResultMemo(unittest.TestCase):
+    """Test the content-addressed LLM memo: what its key covers and how it evicts"""
+    
+    NEWS = [{"title": f"Headline {i}", "url": f"https://example.com/{i}"} for i in range(6)]
+    
+    def test_fingerprint_covers_prompt_inputs(self):
+        """Test the key ignores headline order, jitter below the rounding and headlines past the fifth"""
+        key = LLMResultMemo.fingerprint("AAPL", {"returns": [1.01, -0.52], "score": 0.244}, self.NEWS[:5])
+        same = [
+            LLMResultMemo.fingerprint("AAPL", {"returns": [0.98, -0.54], "score": 0.236}, self.NEWS[4::-1]),
+            LLMResultMemo.fingerprint("AAPL", {"returns": [1.01, -0.52], "score": 0.244}, self.NEWS)
+        ]
+        different = [
+            LLMResultMemo.fingerprint("MSFT", {"returns": [1.01, -0.52], "score": 0.244}, self.NEWS[:5]),
+            LLMResultMemo.fingerprint("AAPL", {"returns": [1.2, -0.52], "score": 0.244}, self.NEWS[:5]),
+            LLMResultMemo.fingerprint("AAPL", {"returns": [1.01, -0.52], "score": 0.26}, self.NEWS[:5]),
+            LLMResultMemo.fingerprint("AAPL", {"returns": [1.01, -0.52], "score": 0.244}, self.NEWS[1:6])
+        ]
+        self.assertEqual(same, [key, key])
+        self.assertEqual(len({key, *different}), 5)
+    
+    def test_lru_eviction_and_persistence(self):
+        """Test recently read entries survive eviction and entries persist across reopening the file"""
+        path = os.path.join(tempfile.mkdtemp(prefix="marketpulse-memo-"), "memo.db")
+        
+        async def run():
+            memo = LLMResultMemo(path, max_entries=3)
+            # Eviction runs every 50th write: fill 49, touch the oldest, then write the 50th
+            for i in range(49):
+                await memo.put(f"k{i}", {"pulse": "neutral", "i": i})
+            await memo.get("k0")
+            await memo.put("k49", {"pulse": "neutral", "i": 49})
+            await memo.close()
+            reopened = LLMResultMemo(path, max_entries=3)
+            try:
+                return {key: await reopened.get(key) for key in ("k0", "k1", "k47", "k48", "k49")}, reopened.stats()
+            finally:
+                await reopened.close()
+        
+        values, stats = asyncio.run(run())
+        self.assertEqual({key for key, value in values.items() if value is not None}, {"k0", "k48", "k49"})
+        self.assertEqual(values["k48"], {"pulse": "neutral", "i": 48})
+        self.assertEqual((stats["hits"], stats["misses"]), (3, 2))
+
+class TestLLMCallGate(unittest.TestCase):
+    """Test the LLM call gate's deadline, hedging, error accounting and slot ownership"""
+    
+    @staticmethod
+    def scripted(*delays):
+        """Return an async fn whose nth call sleeps delays[n] and then returns n"""
+        calls = []
+        
+        async def fn():
+            n = len(calls)
+            calls.append(n)
+            await asyncio.sleep(delays[n])
+            return n
+        return fn
+    
+    def hedged_gate(self):
+        gate = LLMCallGate(max_concurrency=2, timeout=1.0, hedge=True, hedge_min_samples=1)
+        gate._latencies.extend([0.01] * 5)
+        return gate
+    
+    def test_deadline_raises_timeout(self):
+        """Test a call past the deadline raises TimeoutError and frees its slot"""
+        gate = LLMCallGate(max_concurrency=2, timeout=0.05, hedge=False)
+        
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await gate.call(self.scripted(1.0))
+            await asyncio.sleep(0)
+            return gate.stats()
+        stats = asyncio.run(run())
+        self.assertEqual((stats["timeouts"], stats["errors"], stats["in_flight"]), (1, 0, 0))
+    
+    def test_hedge_wins(self):
+        """Test a slow primary is overtaken by the hedged duplicate"""
+        gate = self.hedged_gate()
+        result = asyncio.run(gate.call(self.scripted(0.5, 0)))
+        self.assertEqual(result, 1)
+        self.assertEqual((gate.hedges, gate.hedge_wins), (1, 1))
+    
+    def test_hedge_loses(self):
+        """Test the primary's answer is used when it finishes before the hedge"""
+        gate = self.hedged_gate()
+        result = asyncio.run(gate.call(self.scripted(0.03, 0.5)))
+        self.assertEqual(result, 0)
+        self.assertEqual((gate.hedges, gate.hedge_wins), (1, 0))
+    
+    def test_error_propagates(self):
+        """Test the call's own exception reaches the caller and is counted as an error"""
+        gate = LLMCallGate(max_concurrency=2, timeout=1.0, hedge=False)
+        
+        async def broken():
+            raise ValueError("bad request")
+        
+        with self.assertRaises(ValueError):
+            asyncio.run(gate.call(broken))
+        self.assertEqual((gate.errors, gate.timeouts, gate.in_flight), (1, 0, 0))
+    
+    def test_abandoned_thread_keeps_slot(self):
+        """Test a timed-out blocking call holds its slot until the thread returns"""
+        gate = LLMCallGate(max_concurrency=1, timeout=0.05, hedge=False)
+        
+        async def run():
+            with self.assertRaises(asyncio.TimeoutError):
+                await gate.call(lambda: gate.run_blocking(time.sleep, 0.3))
+            await asyncio.sleep(0)
+            abandoned = gate.stats()
+            gate.timeout = 1.0
+            waiting = asyncio.create_task(gate.call(self.scripted(0)))
+            await asyncio.sleep(0.01)
+            queued = gate.stats()
+            await waiting
+            return abandoned, queued, gate.stats()
+        try:
+            abandoned, queued, done = asyncio.run(run())
+        finally:
+            gate.close()
+        self.assertEqual((abandoned["in_flight"], abandoned["abandoned"]), (1, 1))
+        self.assertEqual((queued["queue_depth"], queued["in_flight"]), (1, 1))
+        self.assertEqual((done["queue_depth"], done["in_flight"], done["abandoned"]), (0, 0, 0))
+
+class TestLLMBatching(unittest.TestCase):
+    """Test splitting batched LLM output and recovering from failed batches"""
+    
+    MOMENTUM = {"returns": [0.4, -0.2, 0.6], "score": 0.27}
+    
+    def setUp(self):
+        self.service = llm_service
+    
+    def test_parse_misordered_sections(self):
+        """Test sections are matched by header, not by position"""
+        text = (
+            "=== MSFT ===\nPULSE: bearish\nEXPLANATION: Weak guidance.\n"
+            "=== AAPL ===\nPULSE: bullish\nEXPLANATION: Strong iPhone sales\nand buybacks."
+        )
+        parsed = self.service._parse_batch_llm_response(text, ["AAPL", "MSFT"])
+        self.assertEqual(parsed["AAPL"], {"pulse": "bullish", "explanation": "Strong iPhone sales and buybacks."})
+        self.assertEqual(parsed["MSFT"]["pulse"], "bearish")
+    
+    def test_parse_partial_and_malformed(self):
+        """Test missing, incomplete and unrequested sections leave only the affected tickers unparsed"""
+        text = (
+            "=== AAPL ===\nPULSE: bullish\nEXPLANATION: Up on earnings.\n"
+            "=== NVDA ===\nPULSE: bullish\nEXPLANATION: Not requested.\n"
+            "=== MSFT ===\nPULSE: bearish\n"
+        )
+        parsed = self.service._parse_batch_llm_response(text, ["AAPL", "MSFT", "TSLA"])
+        self.assertEqual(parsed["AAPL"]["pulse"], "bullish")
+        self.assertIsNone(parsed["MSFT"])
+        self.assertIsNone(parsed["TSLA"])
+        self.assertNotIn("NVDA", parsed)
+        self.assertEqual(self.service._parse_batch_llm_response("no headers at all", ["AAPL"]), {"AAPL": None})
+    
+    def test_raising_batch_resolves_every_waiter(self):
+        """Test a batch that raises answers each waiter with the rule-based analysis instead of hanging"""
+        batcher = LLMBatcher(self.service, max_batch=2, window=0.01)
+        
+        async def broken(requests):
+            raise RuntimeError("executor gone")
+        batcher._run_combined = broken
+        
+        async def submit_both():
+            return await asyncio.wait_for(asyncio.gather(
+                batcher.submit("AAPL", self.MOMENTUM, []), batcher.submit("MSFT", self.MOMENTUM, [])
+            ), 1)
+        results = asyncio.run(submit_both())
+        self.assertEqual([result["source"] for result in results], ["rules", "rules"])
+    
+    def run_combined(self, generate):
+        """Run a two-ticker combined call with the given _generate, recording which tickers were retried alone"""
+        retried = []
+        
+        async def analyze_single(ticker, momentum_data, news_data):
+            retried.append(ticker)
+            return {"pulse": "neutral", "explanation": "Retried.", "source": "gemini"}
+        
+        batcher = LLMBatcher(self.service, max_batch=2, window=0.01)
+        requests = [("AAPL", self.MOMENTUM, []), ("MSFT", self.MOMENTUM, [])]
+        with patch.object(self.service, "_generate", generate), patch.object(self.service, "_analyze_single", analyze_single):
+            results = asyncio.run(batcher._run_combined(requests))
+        return results, retried
+    
+    def test_failed_call_falls_back_without_retries(self):
+        """Test a transport or API error answers the whole batch with rule-based analysis and retries nothing"""
+        async def generate(prompt):
+            raise ConnectionError("connection reset")
+        
+        results, retried = self.run_combined(generate)
+        self.assertEqual([result["source"] for result in results], ["rules", "rules"])
+        self.assertEqual(retried, [])
+    
+    def test_unparsed_sections_retried_alone(self):
+        """Test only the tickers missing from a successful combined response are retried individually"""
+        async def generate(prompt):
+            return "=== AAPL ===\nPULSE: bullish\nEXPLANATION: Up on earnings."
+        
+        results, retried = self.run_combined(generate)
+        self.assertEqual([(result["pulse"], result["source"]) for result in results], [("bullish", "gemini"), ("neutral", "gemini")])
+        self.assertEqual(retried, ["MSFT"])
+
+class TestBatchPulse(unittest.TestCase):
+    """Test the batch endpoint's deduplication, bounded fan-out and per-ticker errors"""
+    
+    def run_batch(self, tickers, stream=False):
+        """Run the batch endpoint over a stub get_pulse; returns the response and the peak concurrency"""
+        active, peak = [0], [0]
+        
+        async def get_pulse(ticker):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            try:
+                await asyncio.sleep(0.01)
+                if ticker == "FAIL":
+                    raise main.HTTPException(status_code=503, detail="Upstream data unavailable")
+                return MarketPulseResponse(
+                    ticker=ticker, as_of="2025-01-07", momentum=MomentumData(returns=[0.5], score=0.5),
+                    news=[], pulse="neutral", llm_explanation="Flat."
+                )
+            finally:
+                active[0] -= 1
+        
+        async def run():
+            response = await main.get_market_pulse_batch(main.BatchPulseRequest(tickers=tickers), stream=stream)
+            if stream:
+                return [json.loads(line) async for line in response.body_iterator]
+            return response
+        
+        empty_layer = CacheLayer("batch_test", MemoryCacheBackend(), 10, 60)
+        result = run_async(run(), get_pulse=get_pulse, cache_layers=[empty_layer], BATCH_CONCURRENCY=2)
+        return result, peak[0]
+    
+    def test_bounded_fan_out(self):
+        """Test duplicates collapse, order is kept, at most BATCH_CONCURRENCY tickers run and failures stay per ticker"""
+        response, peak = self.run_batch(["aapl", "AAPL ", "MSFT", "FAIL", "NVDA", "TSLA"])
+        self.assertEqual([item.ticker for item in response.results], ["AAPL", "MSFT", "FAIL", "NVDA", "TSLA"])
+        self.assertEqual((response.count, response.errors), (5, 1))
+        self.assertEqual(response.results[2].error, "Upstream data unavailable")
+        self.assertEqual(peak, 2)
+    
+    def test_stream_and_limits(self):
+        """Test NDJSON streaming yields one line per ticker, and empty or oversized batches are rejected"""
+        lines, peak = self.run_batch(["AAPL", "MSFT", "FAIL"], stream=True)
+        self.assertEqual(sorted(line["ticker"] for line in lines), ["AAPL", "FAIL", "MSFT"])
+        self.assertEqual([line["error"] for line in lines if "error" in line], ["Upstream data unavailable"])
+        self.assertEqual(peak, 2)
+        for tickers, limit in (([], 10), (["AAPL", "MSFT"], 1)):
+            with self.assertRaises(main.HTTPException) as raised:
+                run_async(main.get_market_pulse_batch(main.BatchPulseRequest(tickers=tickers)), BATCH_MAX_TICKERS=limit)
+            self.assertEqual(raised.exception.status_code, 400)
+
+class TestResponseCache(unittest.TestCase):
+    """Test the encoded pulse response cache: ETags, 304s and content negotiation"""
+    
+    def setUp(self):
+        self.cache = ResponseCache(10)
+        
+        async def freshness(ticker):
+            return 60.0
+        self.cache.freshness = freshness
+    
+    @staticmethod
+    def pulse(explanation: str = "Momentum and headlines both point up. " * 20, degraded: bool = False):
+        return MarketPulseResponse(
+            ticker="AAPL", as_of="2025-01-07", momentum=MomentumData(returns=[0.5, 0.5], score=0.5),
+            news=[], pulse="bullish", llm_explanation=explanation, degraded=degraded
+        )
+    
+    @staticmethod
+    def request(**headers):
+        raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+        return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+    
+    def test_etag_not_modified(self):
+        """Test matching strong, weak and wildcard validators get a 304 and anything else the body"""
+        entry = asyncio.run(self.cache.encode("AAPL", self.pulse()))
+        for if_none_match in (entry.etag, f'"stale", W/{entry.etag}', "*"):
+            response = self.cache.respond(self.request(if_none_match=if_none_match), entry)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response.headers["etag"], entry.etag)
+            self.assertEqual(response.body, b"")
+        response = self.cache.respond(self.request(if_none_match='"stale"'), entry)
+        self.assertEqual((response.status_code, response.body), (200, entry.body))
+        self.assertEqual(self.cache.stats()["not_modified"], 3)
+        self.assertIs(self.cache.get("AAPL"), entry)
+    
+    def test_gzip_negotiation(self):
+        """Test gzip is served only to clients that accept it and only above the size threshold"""
+        entry = asyncio.run(self.cache.encode("AAPL", self.pulse()))
+        response = self.cache.respond(self.request(accept_encoding="deflate, GZIP;q=0.8"), entry)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(gzip.decompress(response.body), entry.body)
+        for accept_encoding in ("", "identity", "gzip;q=0"):
+            response = self.cache.respond(self.request(accept_encoding=accept_encoding), entry)
+            self.assertNotIn("content-encoding", response.headers)
+            self.assertEqual(response.body, entry.body)
+        small = asyncio.run(self.cache.encode("MSFT", self.pulse("Flat.")))
+        self.assertEqual(small.encoded, {})
+    
+    def test_encode_once_and_skip_degraded(self):
+        """Test one pulse object is encoded once and a degraded pulse is never cached"""
+        pulse = self.pulse()
+        entry = asyncio.run(self.cache.encode("AAPL", pulse))
+        self.assertIs(asyncio.run(self.cache.encode("AAPL", pulse)), entry)
+        self.assertIn("max-age=", self.cache.respond(self.request(), entry).headers["cache-control"])
+        degraded = asyncio.run(self.cache.encode("NVDA", self.pulse(degraded=True)))
+        self.assertEqual(self.cache.respond(self.request(), degraded).headers["cache-control"], "no-cache")
+        self.assertIsNone(self.cache.get("NVDA"))
+
+class FakeWebSocket:
+    """Records sent messages; optionally fails every send"""
+    
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.sent = []
+        self.closed_with = None
+    
+    async def send_text(self, message: str):
+        if self.fail:
+            raise RuntimeError("socket gone")
+        self.sent.append(message)
+    
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+class TestPulseBroadcast(unittest.TestCase):
+    """Test WebSocket outbox bounds, failed sends and cross-worker refresh detection"""
+    
+    def test_control_backlog_is_capped(self):
+        """Test unsent control replies are capped, dropping the oldest"""
+        async def scenario():
+            websocket = FakeWebSocket()
+            subscriber = PulseSubscriber(websocket, send_timeout=1, max_pending_control=3)
+            for i in range(5):
+                subscriber.send_control({"type": "pong", "n": i})
+            subscriber.offer("AAPL", "pulse")
+            self.assertEqual(len(subscriber._outbox), 4)
+            self.assertEqual(subscriber.dropped, 2)
+            sender = asyncio.ensure_future(subscriber.send_loop())
+            await asyncio.sleep(0.01)
+            sender.cancel()
+            return websocket.sent
+        
+        sent = asyncio.run(scenario())
+        self.assertEqual([json.loads(m)["n"] for m in sent[:3]], [2, 3, 4])
+        self.assertEqual(sent[3], "pulse")
+    
+    def test_failed_send_closes_connection(self):
+        """Test a send error ends the sender and closes the socket instead of leaking the subscriber"""
+        websocket = FakeWebSocket(fail=True)
+        subscriber = PulseSubscriber(websocket, send_timeout=1, max_pending_control=10)
+        subscriber.send_control({"type": "pong"})
+        asyncio.run(asyncio.wait_for(subscriber.send_loop(), 1))
+        self.assertEqual(websocket.closed_with, 1011)
+    
+    def test_shared_cache_writes_are_published(self):
+        """Test a layer written by another worker (straight to the backend) marks the ticker for publishing"""
+        async def write_elsewhere(ticker):
+            for layer in cache_layers:
+                await layer.backend.set(layer.name, ticker, {"value": {}, "stored_at": time.time(), "ttl": 60}, 60)
+        
+        async def scenario():
+            broadcaster = PulseBroadcaster()
+            broadcaster.poll_interval = 0.01
+            broadcaster.subscribe(PulseSubscriber(FakeWebSocket(), 1, 10), ["POLL"])
+            await write_elsewhere("POLL")
+            poller = asyncio.ensure_future(broadcaster.poll_shared())
+            await asyncio.sleep(0.05)
+            self.assertEqual(broadcaster._dirty, set())
+            await write_elsewhere("POLL")
+            await asyncio.sleep(0.05)
+            poller.cancel()
+            return broadcaster._dirty
+        
+        self.assertEqual(asyncio.run(scenario()), {"POLL"})
+
+class FakeStreamingModel:
+    """Gemini stand-in streaming a fixed answer in chunks, or failing"""
+    
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.calls = 0
+    
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        
+        class Chunk:
+            def __init__(self, text):
+                self.text = text
+        
+        async def chunks():
+            for text in ("PULSE: bullish\nEXPLANATION: Strong ", "earnings ", "momentum."):
+                await asyncio.sleep(0.01)
+                yield Chunk(text)
+        return chunks()
+
+class TestStreamingAnalysis(unittest.TestCase):
+    """Test streamed analyses share the analysis flight and don't pin rule-based stand-ins"""
+    
+    MOMENTUM = {"returns": [0.4, -0.2, 0.6], "score": 0.27}
+    
+    def run_with_model(self, model, scenario):
+        original = llm_service.model
+        llm_service.model = model
+        try:
+            return asyncio.run(scenario(llm_service))
+        finally:
+            llm_service.model = original
+    
+    @staticmethod
+    async def collect(service, ticker):
+        updates = [update async for update in service.stream_analysis(ticker, TestStreamingAnalysis.MOMENTUM, [])]
+        return "".join(u["delta"] for u in updates if "delta" in u), updates[-1]["final"]
+    
+    def test_concurrent_streams_share_one_call(self):
+        """Test concurrent streams and a plain request for one ticker make a single LLM call"""
+        model = FakeStreamingModel()
+        
+        async def scenario(service):
+            leader = asyncio.ensure_future(self.collect(service, "STRM"))
+            await asyncio.sleep(0)
+            return await asyncio.gather(
+                leader, self.collect(service, "STRM"), service.get_analysis("STRM", self.MOMENTUM, [])
+            )
+        
+        (deltas, final), (_, joined), plain = self.run_with_model(model, scenario)
+        self.assertEqual(model.calls, 1)
+        self.assertEqual(deltas, "Strong earnings momentum.")
+        self.assertEqual(final["source"], "gemini")
+        self.assertEqual(joined, final)
+        self.assertEqual(plain, final)
+    
+    def test_failed_stream_caches_fallback_briefly(self):
+        """Test a rule-based stand-in for a failed stream is cached for the short fallback TTL"""
+        async def scenario(service):
+            _, final = await self.collect(service, "SFAIL")
+            return final, await service.cache.peek("SFAIL"), service.fallback_ttl
+        
+        final, entry, fallback_ttl = self.run_with_model(FakeStreamingModel(fail=True), scenario)
+        self.assertEqual(final["source"], "rules")
+        self.assertEqual(entry.ttl, fallback_ttl)
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test the benchmark's stub upstreams, load driver and result arithmetic"""
+    
+    def test_summary_math(self):
+        """Test nearest-rank percentiles, request-weighted merging of rounds and relative changes"""
+        values = [0.01 * i for i in range(1, 101)]
+        self.assertEqual((benchmark.percentile(values, 50), benchmark.percentile(values, 99)), (0.5, 0.99))
+        self.assertEqual(benchmark.percentile([], 95), 0.0)
+        rounds = [
+            {"requests": 30, "errors": 1, "degraded": 0, "status_codes": {"200": 29, "500": 1}, "duration_s": 1.0,
+             "latency_ms": {"p50": 10.0, "p95": 20.0, "p99": 30.0, "max": 40.0}},
+            {"requests": 10, "errors": 0, "degraded": 2, "status_codes": {"200": 10}, "duration_s": 1.0,
+             "latency_ms": {"p50": 50.0, "p95": 60.0, "p99": 70.0, "max": 80.0}}
+        ]
+        merged = benchmark.merge_summaries(rounds)
+        self.assertEqual((merged["requests"], merged["errors"], merged["degraded"]), (40, 1, 2))
+        self.assertEqual(merged["status_codes"], {"200": 39, "500": 1})
+        self.assertEqual(merged["throughput_rps"], 20.0)
+        self.assertEqual(merged["latency_ms"], {"p50": 20.0, "p95": 30.0, "p99": 40.0, "max": 80.0})
+        self.assertEqual((benchmark.pct_change(200, 150), benchmark.pct_change(0, 1)), ("-25.0%", "n/a"))
+    
+    def test_stubs_and_driver(self):
+        """Test the stubs answer like the real APIs and the driver tallies statuses and degraded responses"""
+        async def pulse(request):
+            ticker = request.query["ticker"]
+            if ticker == "ERR":
+                raise web.HTTPInternalServerError()
+            return web.json_response({"ticker": ticker, "degraded": ticker == "OLD"})
+        
+        async def run():
+            stubs = benchmark.StubUpstreams(latency_ms=0, llm_latency_ms=0, error_rate=0)
+            stub_url = await stubs.start()
+            app = web.Application()
+            app.router.add_get("/api/v1/market-pulse", pulse)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            try:
+                async with aiohttp.ClientSession() as session:
+                    # 2025-01-06 is a Monday: a full week has five trading days
+                    week = {"symbol": "AAPL", "from": "1736121600", "to": str(1736121600 + 6 * 86400)}
+                    async with session.get(f"{stub_url}/finnhub/stock/candle", params=week) as response:
+                        candles = await response.json()
+                    prompt = "=== AAPL ===\n...\n=== MSFT ===\n..."
+                    async with session.post(f"{stub_url}/gemini/generate", json={"prompt": prompt}) as response:
+                        answer = (await response.json())["text"]
+                    summary = await benchmark.drive(session, f"http://127.0.0.1:{runner.addresses[0][1]}", ["AAPL", "OLD", "ERR"], 2)
+                return candles, answer, dict(stubs.calls), summary
+            finally:
+                await runner.cleanup()
+                await stubs.stop()
+        
+        candles, answer, calls, summary = asyncio.run(run())
+        self.assertEqual((candles["s"], len(candles["c"]), len(candles["t"])), ("ok", 5, 5))
+        self.assertEqual(candles["c"], benchmark.StubUpstreams._closes("AAPL", 5))
+        self.assertEqual(re.findall(r"^=== (\w+) ===$", answer, re.MULTILINE), ["AAPL", "MSFT"])
+        self.assertEqual(calls, {"finnhub": 1, "gemini": 1})
+        self.assertEqual((summary["requests"], summary["errors"], summary["degraded"]), (3, 1, 1))
+        self.assertEqual(summary["status_codes"], {"200": 2, "500": 1})
+
+class TestLazyStartup(unittest.TestCase):
+    """Test the Gemini SDK stays out of the import path and is loaded once, off the event loop"""
+    
+    def test_import_skips_gemini_sdk(self):
+        """Test importing the backend with a Gemini key set does not import the SDK, and the startup report is filled in"""
+        code = "import sys, main; print('google.generativeai' in sys.modules)"
+        env = dict(os.environ, GEMINI_API_KEY="test-key", PYTHONPATH=os.pathsep.join(sys.path))
+        result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], "False", result.stderr)
+        report = asyncio.run(main.startup_report())
+        self.assertTrue({"fastapi", "numpy", "aiohttp"} <= set(report["imports_ms"]))
+        self.assertGreater(report["module_load_ms"], 0)
+    
+    def test_warm_up_builds_model_once_off_loop(self):
+        """Test warm-up imports the SDK and builds the model on a worker thread, and later uses reuse it"""
+        built = []
+        sdk = types.ModuleType("google.generativeai")
+        sdk.configure = lambda api_key: None
+        sdk.GenerativeModel = lambda name: built.append((name, threading.current_thread() is threading.main_thread())) or name
+        google = types.ModuleType("google")
+        google.generativeai = sdk
+        service = main.LLMService(CacheLayer("analysis_test", MemoryCacheBackend(), 10, 60), main.llm_memo)
+        self.addCleanup(service.gate.close)
+        
+        async def run():
+            await service.warm_up()
+            return await service.ensure_model()
+        
+        with patch.dict(sys.modules, {"google": google, "google.generativeai": sdk}), \
+                patch.dict(main.STARTUP_TIMINGS), patch.dict(main.IMPORT_TIMINGS), patch.object(main, "gemini_api_key", "test-key"):
+            model = asyncio.run(run())
+            timings = dict(main.STARTUP_TIMINGS), dict(main.IMPORT_TIMINGS)
+        self.assertEqual(built, [("gemini-1.5-flash", False)])
+        self.assertEqual((model, service.model), ("gemini-1.5-flash", "gemini-1.5-flash"))
+        self.assertIn("llm_warmup_ms", timings[0])
+        self.assertIn("google.generativeai", timings[1])
+
+class TestProductionServer(unittest.TestCase):
+    """Test run_server.py's worker sizing from CPU affinity and cgroup quotas, and its --prod command"""
+    
+    @staticmethod
+    def cgroup_files(files):
+        """Patch run_server's open() to serve only the given {path: content} files"""
+        def fake_open(path, *args, **kwargs):
+            if path not in files:
+                raise FileNotFoundError(path)
+            return io.StringIO(files[path])
+        return patch.object(run_server, "open", fake_open, create=True)
+    
+    def test_cgroup_cpu_limit(self):
+        """Test cgroup v2 quotas win over v1, and "max", -1 or missing files mean no limit"""
+        cases = [
+            ({"/sys/fs/cgroup/cpu.max": "200000 100000\n"}, 2.0),
+            ({"/sys/fs/cgroup/cpu.max": "max 100000\n"}, None),
+            ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "150000\n", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n"}, 1.5),
+            ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1\n", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n"}, None),
+            ({"/sys/fs/cgroup/cpu.max": "garbage"}, None),
+            ({}, None)
+        ]
+        for files, expected in cases:
+            with self.subTest(files=files), self.cgroup_files(files):
+                self.assertEqual(run_server.cgroup_cpu_limit(), expected)
+    
+    def test_available_cpus(self):
+        """Test the affinity mask is capped by the quota, rounding down but never below one worker"""
+        for limit, expected in ((None, 8), (2.5, 2), (0.5, 1)):
+            with patch.object(run_server.os, "sched_getaffinity", lambda pid: set(range(8)), create=True), \
+                    patch.object(run_server, "cgroup_cpu_limit", return_value=limit):
+                self.assertEqual(run_server.available_cpus(), expected)
+    
+    def production_command(self, argv, modules=()):
+        """Parse argv and build the --prod command with only the given optional modules installed"""
+        env = {"CACHE_BACKEND": "sqlite"}
+        defaults = {"WEB_CONCURRENCY": "0", "MAX_REQUESTS": "10000", "MAX_REQUESTS_JITTER": "1000", "GRACEFUL_TIMEOUT": "30"}
+        with patch.dict(os.environ, defaults), patch.object(sys, "argv", ["run_server.py", *argv]), \
+                patch.object(run_server, "installed", lambda module: module in modules), \
+                patch.object(run_server, "available_cpus", return_value=4), \
+                contextlib.redirect_stdout(io.StringIO()):
+            command = run_server.production_command(run_server.parse_args(), env)
+        return command, env
+    
+    def test_production_command(self):
+        """Test worker count, graceful drain and the uvicorn or gunicorn command line"""
+        command, env = self.production_command(["--prod", "--graceful-timeout", "20"])
+        self.assertEqual(command[1:4], ["-m", "uvicorn", "main:app"])
+        self.assertEqual(command[command.index("--workers") + 1], "4")
+        self.assertEqual(command[command.index("--loop") + 1], "asyncio")
+        self.assertNotIn("--max-requests", command)
+        self.assertEqual(env["SHUTDOWN_DRAIN_TIMEOUT"], "15")
+        
+        command, env = self.production_command(["--prod", "--workers", "3", "--max-requests", "500"], modules=("gunicorn",))
+        self.assertEqual(command[1:4], ["-m", "gunicorn", "main:app"])
+        self.assertEqual(command[command.index("--workers") + 1], "3")
+        self.assertEqual(command[command.index("--max-requests") + 1], "500")
+        self.assertEqual(command[command.index("--graceful-timeout") + 1], "30")
+
 class TestDataValidation(unittest.TestCase):
     """Test data validation and edge cases"""
     
@@ -90,6 +1676,33 @@ def run_tests():
     
     # Add test cases
     suite.addTest(loader.loadTestsFromTestCase(TestMomentumCalculator))
+    suite.addTest(loader.loadTestsFromTestCase(TestMomentumEngine))
+    suite.addTest(loader.loadTestsFromTestCase(TestClassifyPulse))
+    suite.addTest(loader.loadTestsFromTestCase(TestSentimentScorer))
+    suite.addTest(loader.loadTestsFromTestCase(TestSymbolIndex))
+    suite.addTest(loader.loadTestsFromTestCase(TestSectorAggregate))
+    suite.addTest(loader.loadTestsFromTestCase(TestSectorIncremental))
+    suite.addTest(loader.loadTestsFromTestCase(TestCircuitBreaker))
+    suite.addTest(loader.loadTestsFromTestCase(TestRequestDeadline))
+    suite.addTest(loader.loadTestsFromTestCase(TestMetrics))
+    suite.addTest(loader.loadTestsFromTestCase(TestHTTPClientManager))
+    suite.addTest(loader.loadTestsFromTestCase(TestSingleFlight))
+    suite.addTest(loader.loadTestsFromTestCase(TestCacheBackends))
+    suite.addTest(loader.loadTestsFromTestCase(TestStaleWhileRevalidate))
+    suite.addTest(loader.loadTestsFromTestCase(TestRedisCacheBackend))
+    suite.addTest(loader.loadTestsFromTestCase(TestPriceHistoryStore))
+    suite.addTest(loader.loadTestsFromTestCase(TestFixtureReplay))
+    suite.addTest(loader.loadTestsFromTestCase(TestProviderFailover))
+    suite.addTest(loader.loadTestsFromTestCase(TestLLMResultMemo))
+    suite.addTest(loader.loadTestsFromTestCase(TestLLMCallGate))
+    suite.addTest(loader.loadTestsFromTestCase(TestLLMBatching))
+    suite.addTest(loader.loadTestsFromTestCase(TestBatchPulse))
+    suite.addTest(loader.loadTestsFromTestCase(TestResponseCache))
+    suite.addTest(loader.loadTestsFromTestCase(TestPulseBroadcast))
+    suite.addTest(loader.loadTestsFromTestCase(TestStreamingAnalysis))
+    suite.addTest(loader.loadTestsFromTestCase(TestBenchmarkSuite))
+    suite.addTest(loader.loadTestsFromTestCase(TestLazyStartup))
+    suite.addTest(loader.loadTestsFromTestCase(TestProductionServer))
     suite.addTest(loader.loadTestsFromTestCase(TestDataValidation))
     
     # Run with verbose output